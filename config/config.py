@@ -1,8 +1,32 @@
 import yaml
 
-with open("config/config.yaml", "r") as f:
+CONFIG_PATH = "config/config.yaml"
+
+with open(CONFIG_PATH, "r") as f:
     _config = yaml.safe_load(f)
 
 
 def get_config():
     return _config
+
+
+def reload_config():
+    """Reads config/config.yaml again.
+
+    The dict get_config returns is updated in place, so every module holding it sees the new
+    values, and the next `get_analysis_config` compiles them. If the file cannot be read or
+    parsed, the config is left as it was.
+
+    Returns:
+        dict: The config.
+
+    Raises:
+        ValueError: If the file does not hold a mapping of config values.
+    """
+    with open(CONFIG_PATH, "r") as f:
+        config = yaml.safe_load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"'{CONFIG_PATH}' does not hold a mapping of config values.")
+    _config.clear()
+    _config.update(config)
+    return _config
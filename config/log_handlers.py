@@ -0,0 +1,52 @@
+import logging
+from logging.handlers import QueueListener
+
+# The most records the listener handles before flushing its handlers
+MAX_BATCH_RECORDS = 1000
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """A FileHandler that leaves flushing to its LogListener, which flushes once per batch."""
+
+    def flush(self):
+        pass
+
+    def flush_buffer(self):
+        super().flush()
+
+    def close(self):
+        self.flush_buffer()
+        super().close()
+
+
+class LogListener(QueueListener):
+    """A QueueListener that flushes its handlers once per batch of records instead of per record.
+
+    The handlers are flushed once the queue is empty or MAX_BATCH_RECORDS records have been
+    handled since the last flush, so a burst of records is a few large writes instead of one write
+    per record. Reading the queue is left to QueueListener.
+    """
+
+    def __init__(self, record_queue, *handlers):
+        super().__init__(record_queue, *handlers, respect_handler_level=True)
+        self._unflushed = 0
+
+    def handle(self, record):
+        super().handle(record)
+        self._unflushed += 1
+        if self._unflushed >= MAX_BATCH_RECORDS or self.queue.empty():
+            self.flush()
+
+    def stop(self):
+        super().stop()
+        # The last batch is not flushed by handle when the sentinel is still queued behind it
+        self.flush()
+
+    def flush(self):
+        self._unflushed = 0
+        for handler in self.handlers:
+            try:
+                getattr(handler, "flush_buffer", handler.flush)()
+            except (OSError, ValueError):
+                # Like logging.shutdown, ignore streams that were closed from under us
+                pass
@@ -1,6 +1,14 @@
+import atexit
 import json
 import logging.config
+import multiprocessing
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from config.log_handlers import LogListener
 
 # set the default encoding to UTF-8
 sys.stdout.reconfigure(encoding="utf-8")
@@ -8,6 +16,88 @@ sys.stdout.reconfigure(encoding="utf-8")
 with open("config/log_config.json", "rt") as f:
     config = json.load(f)
 
+if multiprocessing.parent_process() is not None:
+    # A spawned worker imports this again. It must not truncate the parent's log files, and
+    # forward_worker_logs sends its records to the parent anyway.
+    for handler_config in config["handlers"].values():
+        if "filename" in handler_config:
+            handler_config.update(mode="a", delay=True)
+
 logging.config.dictConfig(config)
 
 logger = logging.getLogger("logger")
+
+# The logger's handlers only run on the listener's thread. The logger itself only puts records
+# on the queue, so logging never blocks on I/O.
+_handlers = logger.handlers[:]
+_records = queue.SimpleQueue()
+logger.handlers = [QueueHandler(_records)]
+_listener = LogListener(_records, *_handlers)
+_listener.start()
+
+# Records from pool workers come through a multiprocessing queue, created on first use
+_worker_records: Optional[multiprocessing.Queue] = None
+_worker_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def worker_log_queue() -> multiprocessing.Queue:
+    """Gets the queue worker processes send their log records to, for `forward_worker_logs`.
+
+    Its records are handed on to this process's handlers on a background thread.
+
+    Returns:
+        multiprocessing.Queue: The queue to pass to each worker.
+    """
+    global _worker_records, _worker_listener
+    with _lock:
+        if _worker_records is None:
+            _worker_records = multiprocessing.Queue()
+            _worker_listener = QueueListener(_worker_records, QueueHandler(_records))
+            _worker_listener.start()
+            # multiprocessing closes its queues at exit, so this must be stopped before that
+            atexit.register(_stop_worker_listener)
+    return _worker_records
+
+
+def forward_worker_logs(record_queue: multiprocessing.Queue):
+    """Sends a worker process's log records to the parent process. Use it as a pool initializer.
+
+    A forked worker would otherwise put its records on a queue no listener reads, and a spawned
+    one would write to the log files alongside the parent.
+
+    Args:
+        record_queue (multiprocessing.Queue): The parent's `worker_log_queue()`.
+    """
+    logger.handlers = [QueueHandler(record_queue)]
+
+
+def flush_logs():
+    """Waits until every record logged so far, by this process or its workers, is written."""
+    with _lock:
+        # A stopped listener handles everything queued before it stopped
+        for listener in (_worker_listener, _listener):
+            if listener is not None:
+                listener.stop()
+                listener.start()
+
+
+def _stop_worker_listener():
+    global _worker_listener
+    with _lock:
+        if _worker_listener is not None:
+            _worker_listener.stop()
+            _worker_listener = None
+
+
+def stop_logging():
+    """Writes every queued record and stops the listeners. Called at exit."""
+    global _listener
+    _stop_worker_listener()
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(stop_logging)
@@ -6,66 +6,220 @@ import datetime
 import os
 import subprocess
 import time
-
-from musemapalyzr.difficulty_calculation import calculate_difficulty
+from typing import Callable, List, Optional
+
+from config.config import CONFIG_PATH, get_config, reload_config
+from musemapalyzr import note_cache
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.catalog import MapCatalog
+from musemapalyzr.corpus_pack import CorpusPack
+from musemapalyzr.corpus_runner import DEFAULT_CHUNK_SIZE, run_corpus
+from musemapalyzr.difficulty_export import DifficultyExport, export_name, export_row
 from musemapalyzr.entities import MuseSwiprMap
+from musemapalyzr.result_cache import RESULT_CACHE_PATH, ResultCache
+from musemapalyzr.watcher import (
+    DEFAULT_DEBOUNCE_SECS,
+    DEFAULT_POLL_INTERVAL,
+    ChangeSet,
+    MapWatcher,
+)
 
 DATA_DIR = "data"
 
 OUTPUT_DIR = "difficulty_exports"
 
+# The export watch_and_export_difficulties keeps up to date
+WATCH_EXPORT_FILENAME = "watch_difficulties_data.txt"
+# How often, at most, the watched export is rewritten while maps are being scored
+WATCH_FLUSH_SECS = 1.0
 
-def calculate_and_export_filtered_difficulties(string):
-    all_files = os.listdir(DATA_DIR)
-    filtered = []
+# Build with `python -m musemapalyzr.corpus_pack data corpus.mspk`
+PACK_PATH = "corpus.mspk"
+
+
+def calculate_and_export_filtered_difficulties(
+    string, map_filter: Optional[Callable[[MuseSwiprMap], bool]] = None
+):
     # get only files with string in it
-    for f in all_files:
-        if string.lower() in f.lower():
-            filtered.append(f)
+    with MapCatalog() as catalog:
+        catalog.refresh(DATA_DIR)
+        filtered = [os.path.basename(entry.path) for entry in catalog.search(string)]
+
+    if map_filter is not None:
+        filtered = _filter_maps(filtered, map_filter)
 
     _process_difficulties(filtered)
 
 
-def _process_difficulties(files, output_notes=False):
+def _filter_maps(files, map_filter: Callable[[MuseSwiprMap], bool]):
+    """Keeps the files whose map passes `map_filter`.
+
+    The maps are loaded lazily, so a filter on the title, sample rate, note count or duration
+    never loads any notes.
+    """
+    kept = []
+    for filename in files:
+        try:
+            m_map = MuseSwiprMap.from_koreograph_asset(f"{DATA_DIR}/{filename}", lazy=True)
+        except Exception as e:
+            logger.error(f"ERROR reading the header of '{filename}': {e}")
+            continue
+        if map_filter(m_map):
+            kept.append(filename)
+    return kept
+
+
+def _process_difficulties(
+    files,
+    output_notes=False,
+    pack: Optional[CorpusPack] = None,
+    max_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_result_cache: bool = True,
+):
     now = datetime.datetime.now()
+    pack_path = pack.pack_path if pack is not None else None
+    cache = ResultCache(RESULT_CACHE_PATH) if use_result_cache else None
     with open(
         f"{OUTPUT_DIR}/{now.strftime('%Y-%m-%d_%H-%M-%S')}_difficulties_data.txt",
         "w",
         encoding="utf-8",
     ) as f:
-        for filename in files:
-            try:
-                char = "\\"
-                m_map = MuseSwiprMap.from_koreograph_asset(f"{DATA_DIR}/{filename}")
-                name = filename.split(char)[-1].split(".asset")[0]
-                logger.info(f"Processing: '{filename}'")
-                with open(
-                    f"analysis/{name}",
-                    "w",
-                    encoding="utf-8",
-                ) as outfile:
-                    weight_results = calculate_difficulty(
-                        m_map.notes, outfile=outfile, sample_rate=m_map.sample_rate
-                    )
-                    f.write(
-                        f"{filename.split(char)[-1].split('.asset')[0]}||{weight_results.weighted_difficulty:.2f}||{weight_results.weighting:.2f}||{weight_results.difficulty:.2f}\n"
-                    )
-                if output_notes:
-                    m_map.output_notes(f"{name}.txt")
-            except Exception as e:
-                logger.error(f"ERROR parsing a file: {e}")
+        results = run_corpus(
+            files, DATA_DIR, pack_path, output_notes, max_workers, chunk_size, cache
+        )
+        for result in results:
+            if result.error is not None:
+                logger.error(f"ERROR parsing a file: {result.error}")
                 continue
+            name = export_name(result.filename)
+            _write_density_curve(name, result.density_curve)
+            f.write(export_row(name, result.weighting))
+
+    if cache is not None:
+        _log_cache_stats(cache)
+        cache.close()
+    note_cache.prune()
+
+
+def _write_density_curve(name: str, density_curve):
+    with open(
+        f"analysis/{name}",
+        "w",
+        encoding="utf-8",
+    ) as outfile:
+        for s in density_curve:
+            outfile.write(f"{s}\n")
+
+
+def _log_cache_stats(cache: ResultCache):
+    stats = cache.stats()
+    logger.info(
+        f"Result cache: {stats.hits} hits, {stats.misses} misses "
+        f"({stats.hit_rate:.0%} hit rate), {stats.entries} results cached"
+    )
+
 
+def calculate_and_export_all_difficulties(
+    pack_path: Optional[str] = None, max_workers: Optional[int] = None
+):
+    if pack_path is not None:
+        with CorpusPack(pack_path) as pack:
+            _process_difficulties(pack.names(), pack=pack, max_workers=max_workers)
+        return
 
-def calculate_and_export_all_difficulties():
     # get a list of all files in the directory
     all_files = os.listdir(DATA_DIR)
 
-    _process_difficulties(all_files)
+    _process_difficulties(all_files, max_workers=max_workers)
+
+
+def watch_and_export_difficulties(
+    max_workers: Optional[int] = None,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    debounce_secs: float = DEFAULT_DEBOUNCE_SECS,
+):
+    """Keeps a difficulty export up to date while maps are added, edited and removed.
+
+    Every map is exported first, mostly from the result cache. Then whenever `DATA_DIR` changes,
+    once the changes stop for debounce_secs, only the changed maps are re-scored, and every map
+    when config/config.yaml changes. Each updated row is written to the export as its map is
+    scored. Stop it with Ctrl+C.
+    """
+    export = DifficultyExport(f"{OUTPUT_DIR}/{WATCH_EXPORT_FILENAME}")
+    watcher = MapWatcher(DATA_DIR, CONFIG_PATH, poll_interval, debounce_secs)
+    logger.info(f"Watching '{DATA_DIR}' and '{CONFIG_PATH}', exporting to '{export.path}'")
+
+    # Rows of maps removed while this was not running
+    for name in set(export.names()) - {export_name(filename) for filename in watcher.filenames}:
+        export.remove(name)
+    try:
+        _export_maps(watcher.filenames, watcher.data_dir, export, max_workers)
+        while True:
+            _apply_changes(watcher.wait_for_changes(), watcher, export, max_workers)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+    finally:
+        export.flush()
+
+
+def _apply_changes(
+    changes: ChangeSet, watcher: MapWatcher, export: DifficultyExport, max_workers: Optional[int]
+):
+    for filename in changes.removed:
+        export.remove(export_name(filename))
+    files = changes.changed
+    if changes.config_changed and _reload_config():
+        logger.info("The config changed, re-scoring every map")
+        files = watcher.filenames
+    logger.info(f"Re-scoring {len(files)} maps, {len(changes.removed)} removed")
+    _export_maps(files, watcher.data_dir, export, max_workers)
+
+
+def _reload_config() -> bool:
+    # Keeps the previous config if the new one cannot be read or compiled, so a half-saved
+    # config.yaml is picked up on its next save instead of stopping the watch
+    previous = dict(get_config())
+    try:
+        reload_config()
+        get_analysis_config()
+    except Exception as e:
+        logger.error(f"ERROR reloading '{CONFIG_PATH}', keeping the previous config: {e}")
+        config = get_config()
+        config.clear()
+        config.update(previous)
+        return False
+    return True
+
+
+def _export_maps(
+    files: List[str], data_dir: str, export: DifficultyExport, max_workers: Optional[int]
+):
+    if files:
+        # Opened for each batch, so the results are keyed by the config as it is now
+        with ResultCache(RESULT_CACHE_PATH) as cache:
+            last_flush = time.monotonic()
+            for result in run_corpus(files, data_dir, max_workers=max_workers, cache=cache):
+                name = export_name(result.filename)
+                if result.error is not None:
+                    logger.error(f"ERROR parsing '{result.filename}': {result.error}")
+                    # Its old row would be the scores of content that no longer exists
+                    export.remove(name)
+                    continue
+                _write_density_curve(name, result.density_curve)
+                export.update(name, result.weighting)
+                if time.monotonic() - last_flush >= WATCH_FLUSH_SECS:
+                    export.flush()
+                    last_flush = time.monotonic()
+            _log_cache_stats(cache)
+        # Every edit of a map leaves its old note cache files behind
+        note_cache.prune()
+    export.flush()
 
 
 def run_bottle_neck_analysis():
-    cProfile.run("calculate_and_export_all_difficulties()", "profile_stats")
+    # In this process, so the profile sees the scoring rather than the pool
+    cProfile.run("calculate_and_export_all_difficulties(max_workers=1)", "profile_stats")
     subprocess.run(["snakeviz", "profile_stats"])
 
 
@@ -75,6 +229,7 @@ if __name__ == "__main__":
     string = "big black"
 
     # calculate_and_export_filtered_difficulties(string)
+    # watch_and_export_difficulties()
     calculate_and_export_all_difficulties()
 
     end_time = time.time()
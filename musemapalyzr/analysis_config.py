@@ -0,0 +1,173 @@
+import functools
+import math
+from dataclasses import dataclass, field
+from fractions import Fraction
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from config.config import get_config
+from musemapalyzr.constants import DEFAULT_SAMPLE_RATE, LONG_INTERVAL, MED_INTERVAL, SHORT_INTERVAL
+
+conf = get_config()
+
+# (lower_bound, upper_bound, lower_clamp, upper_clamp), in the order the pattern_multipliers
+# functions take them. The circle multipliers only take the two bounds.
+Curve = Tuple[float, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class AnalysisConfig:
+    """The config, compiled once for one sample rate.
+
+    Every millisecond tolerance and NPS threshold is converted to a whole number of samples, so
+    the hot paths only compare integer time differences. Build it with `get_analysis_config`,
+    which caches one per (config, sample rate).
+
+    A pair of notes `time_difference` samples apart is:
+        - a stream (Zig Zag/Single Streams) if it is <= max_stream_time_difference
+        - a Short Interval if it is <= max_short_interval_time_difference
+        - a Medium Interval if it is <= max_med_interval_time_difference
+        - a Long Interval otherwise
+    """
+
+    sample_rate: int
+    # The (key, value) pairs of the config this was compiled from
+    settings: Tuple[Tuple[str, object], ...] = field(repr=False)
+
+    # Segments
+    segment_tolerance: int
+    max_stream_time_difference: int
+    max_short_interval_time_difference: int
+    max_med_interval_time_difference: int
+
+    # Density
+    sample_window_secs: float
+    moving_avg_window: int
+
+    # Pattern weighting
+    pattern_tolerance: int
+    pattern_weighting_top_percentage: float
+    pattern_weighting_top_weight: float
+    pattern_weighting_bottom_weight: float
+    default_variation_weighting: float
+    default_pattern_weighting: float
+    short_int_debuff: float
+    med_int_debuff: float
+    long_int_debuff: float
+    extra_int_end_debuff: float
+
+    # Other pattern
+    other_switch_multiplier: float
+    other_short_int_multiplier: float
+    other_med_int_multiplier: float
+    other_long_int_multiplier: float
+
+    # Multiplier curves
+    nothing_but_theory_curve: Curve
+    varying_streams_curve: Curve
+    zig_zag_curve: Curve
+    even_circle_curve: Curve
+    skewed_circle_curve: Curve
+    stream_curve: Curve
+    pattern_stream_length_curve: Curve
+    zig_zag_length_curve: Curve
+    four_stack_curve: Curve
+    three_stack_curve: Curve
+    two_stack_curve: Curve
+    varying_stacks_curve: Curve
+
+    # The debuff of each interval kind, shared read-only by every Pattern
+    interval_debuffs: Mapping[int, float] = field(init=False, compare=False, hash=False)
+
+    def __post_init__(self):
+        interval_debuffs = {
+            SHORT_INTERVAL: self.short_int_debuff,
+            MED_INTERVAL: self.med_int_debuff,
+            LONG_INTERVAL: self.long_int_debuff,
+        }
+        object.__setattr__(self, "interval_debuffs", MappingProxyType(interval_debuffs))
+
+    def with_sample_rate(self, sample_rate: int) -> "AnalysisConfig":
+        """Gets this config compiled for another sample rate."""
+        if sample_rate == self.sample_rate:
+            return self
+        return _compile(self.settings, sample_rate)
+
+    def __reduce__(self):
+        # Pickled as what it was compiled from, so worker processes compile (and cache) their own
+        return _compile, (self.settings, self.sample_rate)
+
+
+def get_analysis_config(
+    sample_rate: int = DEFAULT_SAMPLE_RATE, settings: Optional[dict] = None
+) -> AnalysisConfig:
+    """Gets the compiled config for a sample rate, compiling it on first use.
+
+    Args:
+        sample_rate (int, optional): The sample rate of the map. Defaults to DEFAULT_SAMPLE_RATE.
+        settings (dict, optional): The config to compile. Defaults to config/config.yaml.
+
+    Returns:
+        AnalysisConfig: The compiled config.
+    """
+    if settings is None:
+        settings = conf
+    return _compile(tuple(sorted(settings.items())), sample_rate)
+
+
+def _max_time_difference(sample_rate: int, notes_per_second) -> int:
+    # sample_rate / time_difference >= nps  <=>  time_difference <= sample_rate / nps
+    return math.floor(Fraction(sample_rate) / Fraction(notes_per_second))
+
+
+def _ms_to_samples(milliseconds, sample_rate: int) -> int:
+    # Time differences are whole samples, so flooring keeps every `<= tolerance` check the same
+    return math.floor(Fraction(milliseconds) * sample_rate / 1000)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(settings: Tuple[Tuple[str, object], ...], sample_rate: int) -> AnalysisConfig:
+    s = dict(settings)
+
+    def curve(name: str, clamped: bool = True) -> Curve:
+        bounds = (s[f"{name}_low_bound"], s[f"{name}_up_bound"])
+        if clamped:
+            return bounds + (s[f"{name}_low_clamp"], s[f"{name}_up_clamp"])
+        return bounds
+
+    return AnalysisConfig(
+        sample_rate=sample_rate,
+        settings=settings,
+        segment_tolerance=_ms_to_samples(s["segment_tolerance_ms"], sample_rate),
+        max_stream_time_difference=_max_time_difference(sample_rate, s["short_interval_nps"]),
+        max_short_interval_time_difference=_max_time_difference(sample_rate, s["med_interval_nps"]),
+        max_med_interval_time_difference=_max_time_difference(sample_rate, s["long_interval_nps"]),
+        sample_window_secs=s["sample_window_secs"],
+        moving_avg_window=s["moving_avg_window"],
+        pattern_tolerance=_ms_to_samples(s["pattern_tolerance_ms"], sample_rate),
+        pattern_weighting_top_percentage=s["get_pattern_weighting_top_percentage"],
+        pattern_weighting_top_weight=s["get_pattern_weighting_top_weight"],
+        pattern_weighting_bottom_weight=s["get_pattern_weighting_bottom_weight"],
+        default_variation_weighting=s["default_variation_weighting"],
+        default_pattern_weighting=s["default_pattern_weighting"],
+        short_int_debuff=s["short_int_debuff"],
+        med_int_debuff=s["med_int_debuff"],
+        long_int_debuff=s["long_int_debuff"],
+        extra_int_end_debuff=s["extra_int_end_debuff"],
+        other_switch_multiplier=s["other_switch_multiplier"],
+        other_short_int_multiplier=s["other_short_int_multiplier"],
+        other_med_int_multiplier=s["other_med_int_multiplier"],
+        other_long_int_multiplier=s["other_long_int_multiplier"],
+        nothing_but_theory_curve=curve("nothing_but_theory"),
+        varying_streams_curve=curve("varying_streams"),
+        zig_zag_curve=curve("zig_zag"),
+        even_circle_curve=curve("even_circle", clamped=False),
+        skewed_circle_curve=curve("skewed_circle", clamped=False),
+        stream_curve=curve("stream"),
+        pattern_stream_length_curve=curve("pattern_stream_length"),
+        zig_zag_length_curve=curve("zig_zag_length"),
+        four_stack_curve=curve("four_stack"),
+        three_stack_curve=curve("three_stack"),
+        two_stack_curve=curve("two_stack"),
+        varying_stacks_curve=curve("varying_stacks"),
+    )
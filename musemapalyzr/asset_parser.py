@@ -0,0 +1,108 @@
+import json
+import re
+from array import array
+from collections import namedtuple
+from typing import List, Tuple
+
+KoreographyData = namedtuple(
+    "KoreographyData", ["title", "sample_rate", "tempo_sections", "tracks"]
+)
+TempoSections = namedtuple("TempoSections", ["start_samples", "samples_per_beat"])
+
+# The Koreography's title is the one and only key of the top level object.
+_TITLE_PATTERN = re.compile(rb'\A\s*\{\s*"((?:[^"\\]|\\.)*)"\s*:')
+_SAMPLE_RATE_PATTERN = re.compile(rb'"mSampleRate"\s*:\s*(-?\d+(?:\.\d+)?)')
+_TEMPO_SECTIONS_PATTERN = re.compile(rb'"mTempoSections"\s*:')
+_TRACKS_PATTERN = re.compile(rb'"mTracks"\s*:')
+_SECTION_START_PATTERN = re.compile(rb'"startSample"\s*:\s*(-?\d+)')
+_SAMPLES_PER_BEAT_PATTERN = re.compile(
+    rb'"samplesPerBeat"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)'
+)
+_EVENT_ID_PATTERN = re.compile(rb'"mEventID"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_START_SAMPLE_PATTERN = re.compile(rb'"mStartSample"\s*:\s*(-?\d+)')
+_END_SAMPLE_PATTERN = re.compile(rb'"mEndSample"\s*:\s*(-?\d+)')
+
+
+def _decode_json_string(raw: bytes) -> str:
+    return json.loads(b'"' + raw + b'"')
+
+
+def extract_koreography(buffer: bytes) -> KoreographyData:
+    """Pulls the fields needed for analysis out of a Koreography asset without parsing the JSON.
+
+    Only the title, `mSampleRate`, each tempo section's `startSample` and `samplesPerBeat`,
+    and each track's `mEventID` and `mStartSample`s are read. Everything else (the payload
+    padding, ES3's duplicated `_ES3Ref` keys...) is skipped over by the regex engine, so no
+    object tree is ever built.
+
+    ES3 always writes a track's `mEventID` before its `mEventList`, so every event between one
+    `mEventID` and the next belongs to the first one.
+
+    Args:
+        buffer (bytes): The raw UTF-8 contents of the .asset file.
+
+    Returns:
+        KoreographyData: The title, sample rate, tempo sections and a list of
+            (event ID, start samples) tracks.
+
+    Raises:
+        ValueError: If the buffer is not a Koreography asset or an event has a duration.
+    """
+    title_match = _TITLE_PATTERN.match(buffer)
+    if title_match is None:
+        raise ValueError("Could not find the Koreography title.")
+    title = _decode_json_string(title_match.group(1))
+
+    sample_rate_match = _SAMPLE_RATE_PATTERN.search(buffer)
+    if sample_rate_match is None:
+        raise ValueError(f"Could not find mSampleRate for '{title}'.")
+    sample_rate = int(float(sample_rate_match.group(1)))
+
+    event_id_matches = list(_EVENT_ID_PATTERN.finditer(buffer))
+    tempo_sections = _extract_tempo_sections(buffer, title)
+    tracks: List[Tuple[str, array]] = []
+    for i, event_id_match in enumerate(event_id_matches):
+        start = event_id_match.end()
+        end = event_id_matches[i + 1].start() if i + 1 < len(event_id_matches) else len(buffer)
+
+        start_samples = _START_SAMPLE_PATTERN.findall(buffer, start, end)
+        end_samples = _END_SAMPLE_PATTERN.findall(buffer, start, end)
+        if start_samples != end_samples:
+            raise ValueError(f"'{title}' has events where mStartSample != mEndSample.")
+
+        event_id = _decode_json_string(event_id_match.group(1))
+        tracks.append((event_id, array("q", map(int, start_samples))))
+
+    return KoreographyData(
+        title=title, sample_rate=sample_rate, tempo_sections=tempo_sections, tracks=tracks
+    )
+
+
+def _extract_tempo_sections(buffer: bytes, title: str) -> TempoSections:
+    tempo_sections_match = _TEMPO_SECTIONS_PATTERN.search(buffer)
+    if tempo_sections_match is None:
+        return TempoSections(array("q"), array("d"))
+    start = tempo_sections_match.end()
+    tracks_match = _TRACKS_PATTERN.search(buffer, start)
+    end = tracks_match.start() if tracks_match is not None else len(buffer)
+
+    start_samples = _SECTION_START_PATTERN.findall(buffer, start, end)
+    samples_per_beat = _SAMPLES_PER_BEAT_PATTERN.findall(buffer, start, end)
+    if len(start_samples) != len(samples_per_beat):
+        raise ValueError(f"'{title}' has incomplete tempo sections.")
+    return TempoSections(
+        array("q", map(int, start_samples)), array("d", map(float, samples_per_beat))
+    )
+
+
+def read_koreography_asset(koreograph_asset_filename: str) -> KoreographyData:
+    """Reads a Koreography .asset file and extracts it with `extract_koreography`.
+
+    Args:
+        koreograph_asset_filename (str): The path to the .asset file.
+
+    Returns:
+        KoreographyData: The extracted Koreography.
+    """
+    with open(koreograph_asset_filename, "rb") as f:
+        return extract_koreography(f.read())
@@ -0,0 +1,359 @@
+from typing import Dict, List, Optional, Sequence, Type
+
+import numpy as np
+
+import config.logging_config as logging_config
+from musemapalyzr.analysis_config import AnalysisConfig
+from musemapalyzr.constants import (
+    EVEN_CIRCLES,
+    FOUR_STACK,
+    INTERVAL_MASK,
+    LONG_INTERVAL,
+    MED_INTERVAL,
+    NOTHING_BUT_THEORY,
+    OTHER,
+    SHORT_INTERVAL,
+    SINGLE_STREAMS,
+    SKEWED_CIRCLES,
+    SLOW_STRETCH,
+    SWITCH,
+    THREE_STACK,
+    TWO_STACK,
+    VARYING_STACKS,
+    ZIG_ZAG,
+)
+from musemapalyzr.entities import NoteArray, Segment
+from musemapalyzr.pattern_multipliers import curve_values
+from musemapalyzr.pattern_views import PatternScorer, PatternView, view_length
+from musemapalyzr.utils import PatternScore, weighted_averages_of_values
+from patterns.even_circles import EvenCirclesGroup
+from patterns.nothing_but_theory import NothingButTheoryGroup
+from patterns.other import OtherPattern
+from patterns.pattern import Pattern
+from patterns.skewed_circles import SkewedCirclesGroup
+from patterns.slow_stretch import SlowStretchPattern
+from patterns.varying_stacks import VaryingStacksPattern
+
+logger = logging_config.logger
+
+# The Pattern classes the batch scorer knows the strategies of. Views of any other pattern name
+# or class are scored one by one with their Pattern.
+BATCH_PATTERN_CLASSES: Dict[str, Type[Pattern]] = {
+    EVEN_CIRCLES: EvenCirclesGroup,
+    SKEWED_CIRCLES: SkewedCirclesGroup,
+    VARYING_STACKS: VaryingStacksPattern,
+    NOTHING_BUT_THEORY: NothingButTheoryGroup,
+    SLOW_STRETCH: SlowStretchPattern,
+    OTHER: OtherPattern,
+}
+
+# The multiplier curve of the first segment of each pattern that has one
+_PATTERN_CURVES = {
+    EVEN_CIRCLES: "even_circle_curve",
+    SKEWED_CIRCLES: "skewed_circle_curve",
+    VARYING_STACKS: "varying_stacks_curve",
+    NOTHING_BUT_THEORY: "nothing_but_theory_curve",
+}
+
+# The multiplier curve of each segment kind in an Other pattern
+_OTHER_SEGMENT_CURVES = {
+    ZIG_ZAG: "zig_zag_curve",
+    TWO_STACK: "two_stack_curve",
+    THREE_STACK: "three_stack_curve",
+    FOUR_STACK: "four_stack_curve",
+    SINGLE_STREAMS: "stream_curve",
+}
+
+# Every segment kind is below this, so per-kind values can be looked up in an array
+_KIND_LIMIT = 1 << 10
+
+
+def _grouped_entropy(groups: np.ndarray, keys: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    # The entropy of the keys of each group, with totals[g] as the number of keys of group g
+    if len(groups) == 0:
+        return np.zeros(len(totals))
+    pairs, counts = np.unique(groups * (keys.max() + 1) + keys, return_counts=True)
+    pair_groups = pairs // (keys.max() + 1)
+    p = counts / totals[pair_groups]
+    return -np.bincount(pair_groups, weights=p * np.log2(p), minlength=len(totals))
+
+
+class SegmentTable:
+    """The columns of a map's segments, built once and indexed by every pattern.
+
+    Attributes:
+        kinds (np.ndarray): The kind of each segment.
+        notes_per_second (np.ndarray): The notes_per_second of each segment.
+        note_counts (np.ndarray): The number of notes in each segment.
+        note_starts (np.ndarray): Where the notes of each segment start in sample_times and lanes.
+        sample_times (np.ndarray): The sample time of every note of every segment, in order.
+        lanes (np.ndarray): The lane of every note of every segment, in order.
+    """
+
+    def __init__(self, segments: Sequence[Segment]):
+        self.kinds = np.array([segment.kind for segment in segments], dtype=np.int64)
+        self.notes_per_second = np.array(
+            [segment.notes_per_second for segment in segments], dtype=np.float64
+        )
+        self.note_counts = np.array([len(segment.notes) for segment in segments], dtype=np.int64)
+        self.note_starts = np.cumsum(self.note_counts) - self.note_counts
+        sample_times = [np.zeros(0, dtype=np.int64)]
+        lanes = [np.zeros(0, dtype=np.uint8)]
+        for segment in segments:
+            notes = segment.notes
+            if not isinstance(notes, NoteArray):
+                notes = NoteArray(
+                    [note.lane for note in notes], [note.sample_time for note in notes]
+                )
+            sample_times.append(notes.sample_times)
+            lanes.append(notes.lanes)
+        self.sample_times = np.concatenate(sample_times)
+        self.lanes = np.concatenate(lanes).astype(np.int64)
+
+
+class BatchPatternScorer:
+    """Scores all the PatternViews of a map at once, as PatternScorer does one by one.
+
+    Every view's segments become rows of one table, and each step of
+    `Pattern.calc_pattern_difficulty` is a grouped reduction over it: the kind entropies, interval
+    and switch debuffs, the multiplier curves and the weighted average of each Other pattern's
+    segment multipliers. The results match PatternScorer to within floating-point rounding.
+    """
+
+    def __init__(self, pattern_classes: Dict[str, Type[Pattern]], config: AnalysisConfig):
+        self.config = config
+        self._scorer = PatternScorer(pattern_classes, config)
+        self._batch_names = {
+            name
+            for name, pattern_class in pattern_classes.items()
+            if BATCH_PATTERN_CLASSES.get(name) is pattern_class
+        }
+        # The (variation_weighting, pattern_weighting) of each pattern name
+        self._weightings = {}
+        for name in self._batch_names:
+            pattern = pattern_classes[name](name, [], config=config)
+            self._weightings[name] = (pattern.variation_weighting, pattern.pattern_weighting)
+
+    def score_all(
+        self,
+        views: Sequence[PatternView],
+        segments: Sequence[Segment],
+        table: Optional[SegmentTable] = None,
+    ) -> List[PatternScore]:
+        """Scores every view that has segments, like `PatternScorer.score_all`.
+
+        Args:
+            views (Sequence[PatternView]): The views to score, in order.
+            segments (Sequence[Segment]): The segments the views index.
+            table (SegmentTable, optional): The table of the segments. Defaults to a new one.
+
+        Returns:
+            List[PatternScore]: The score of each view that has segments.
+        """
+        views = [view for view in views if view.spans]
+        batched = [view for view in views if view.pattern_name in self._batch_names]
+        if table is None:
+            table = SegmentTable(segments)
+        scores = iter(self._score_batch(batched, table))
+        return [
+            (
+                next(scores)
+                if view.pattern_name in self._batch_names
+                else self._scorer.score(view, segments)
+            )
+            for view in views
+        ]
+
+    def _score_batch(self, views: List[PatternView], table: SegmentTable) -> List[PatternScore]:
+        if not views:
+            return []
+        config = self.config
+        names = [view.pattern_name for view in views]
+        lengths = np.array([view_length(view) for view in views], dtype=np.int64)
+        n_patterns = len(views)
+
+        # One row per segment of each pattern
+        index = np.fromiter(
+            (i for view in views for start, end in view.spans for i in range(start, end)),
+            dtype=np.int64,
+            count=int(lengths.sum()),
+        )
+        pattern = np.repeat(np.arange(n_patterns), lengths)
+        starts = np.cumsum(lengths) - lengths
+        position = np.arange(len(index)) - starts[pattern]
+        is_end = (position == 0) | (position == lengths[pattern] - 1)
+        kinds = table.kinds[index]
+        is_interval = kinds & INTERVAL_MASK != 0
+
+        # Every note of each pattern, once. Consecutive segments share a note, and a merged
+        # pattern can have a segment twice.
+        note_counts = table.note_counts[index]
+        note_rows = np.repeat(np.arange(len(index)), note_counts)
+        row_starts = np.cumsum(note_counts) - note_counts
+        notes = (
+            table.note_starts[index][note_rows] + np.arange(len(note_rows)) - row_starts[note_rows]
+        )
+        sample_limit = table.sample_times[notes].max() + 1
+        keys, first = np.unique(
+            pattern[note_rows] * sample_limit + table.sample_times[notes], return_index=True
+        )
+        note_patterns = keys // sample_limit
+        note_lanes = table.lanes[notes[first]]
+        total_notes = np.bincount(note_patterns, minlength=n_patterns)
+
+        variation = self._default_variations(pattern, kinds, is_interval, is_end, lengths)
+        selected = np.array([name == NOTHING_BUT_THEORY for name in names])
+        if selected.any():
+            variation[selected] = self._nothing_but_theory_variations(
+                pattern, kinds, index, table, lengths
+            )[selected]
+        selected = np.array([name == SLOW_STRETCH for name in names])
+        if selected.any():
+            variation[selected] = self._slow_stretch_variations(
+                note_patterns, note_lanes, total_notes
+            )[selected]
+        selected = np.array(
+            [name in (EVEN_CIRCLES, SKEWED_CIRCLES, VARYING_STACKS) for name in names]
+        )
+        variation[selected] = np.maximum(1, variation[selected])
+
+        multiplier = np.ones(n_patterns)
+        first_nps = table.notes_per_second[index[starts]]
+        for name, curve_name in _PATTERN_CURVES.items():
+            selected = np.array([n == name for n in names])
+            if selected.any():
+                multiplier[selected] = curve_values(curve_name, first_nps[selected], config)
+        others = np.flatnonzero(np.array([n == OTHER for n in names]))
+        if len(others):
+            multiplier[others] = self._other_multipliers(others, pattern, index, kinds, table)
+
+        variation_weightings = np.array([self._weightings[n][0] for n in names])
+        pattern_weightings = np.array([self._weightings[n][1] for n in names])
+        scores = variation_weightings * variation + pattern_weightings * multiplier
+        has_interval = np.bincount(pattern, weights=is_interval, minlength=n_patterns) > 0
+        return [
+            PatternScore(name, float(score), bool(interval), int(notes))
+            for name, score, interval, notes in zip(names, scores, has_interval, total_notes)
+        ]
+
+    def _default_variations(self, pattern, kinds, is_interval, is_end, lengths) -> np.ndarray:
+        # DefaultCalcVariationScore: intervals at either end only debuff, the others count as
+        # one kind of segment
+        n_patterns = len(lengths)
+        counted = ~(is_interval & is_end)
+        entropy = _grouped_entropy(
+            pattern[counted],
+            np.where(is_interval, INTERVAL_MASK, kinds)[counted],
+            np.bincount(pattern[counted], minlength=n_patterns),
+        )
+
+        debuffs = np.zeros(_KIND_LIMIT)
+        for kind, debuff in self.config.interval_debuffs.items():
+            debuffs[kind] = debuff
+        row_debuffs = debuffs[kinds] * np.where(is_end, self.config.extra_int_end_debuff, 1)
+        interval_counts = np.bincount(pattern, weights=is_interval, minlength=n_patterns)
+        debuff_totals = np.bincount(pattern, weights=row_debuffs, minlength=n_patterns)
+        has_intervals = interval_counts > 0
+        entropy[has_intervals] *= debuff_totals[has_intervals] / interval_counts[has_intervals]
+
+        entropy = self._switch_debuffs(pattern, kinds, lengths, entropy)
+        return np.where(entropy == 0, 1, entropy)
+
+    def _nothing_but_theory_variations(self, pattern, kinds, index, table, lengths) -> np.ndarray:
+        # Segments are told apart by kind and note count, and intervals are not debuffs
+        keys = kinds * (table.note_counts.max() + 1) + table.note_counts[index]
+        entropy = _grouped_entropy(pattern, keys, lengths)
+        return np.maximum(1, self._switch_debuffs(pattern, kinds, lengths, entropy))
+
+    def _slow_stretch_variations(self, note_patterns, note_lanes, total_notes) -> np.ndarray:
+        # The entropy of the lanes of the unique notes
+        n_lanes = note_lanes.max() + 1
+        lane_counts = np.bincount(
+            note_patterns * n_lanes + note_lanes, minlength=len(total_notes) * n_lanes
+        ).reshape(len(total_notes), n_lanes)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = lane_counts / total_notes[:, None]
+            entropy = -np.where(p > 0, p * np.log2(p), 0).sum(axis=1)
+        return np.where(entropy.astype(np.int64) == 0, 1, entropy)
+
+    def _switch_debuffs(self, pattern, kinds, lengths, entropy) -> np.ndarray:
+        # Pattern._calc_switch_debuff
+        switch_counts = np.bincount(pattern, weights=kinds == SWITCH, minlength=len(lengths))
+        debuffs = np.where(lengths < 4, 0.7, np.where(switch_counts / lengths < 0.5, 0.8, 0.9))
+        return np.where((entropy > 1) & (switch_counts > 0), entropy * debuffs, entropy)
+
+    def _other_multipliers(self, others, pattern, index, kinds, table) -> np.ndarray:
+        # OtherCalcPatternMultiplier: the weighted average of the multiplier of each segment
+        config = self.config
+        rows = np.flatnonzero(np.isin(pattern, others))
+        row_kinds = kinds[rows]
+        multipliers = np.ones(len(rows))
+        for kind, multiplier in [
+            (SWITCH, config.other_switch_multiplier),
+            (SHORT_INTERVAL, config.other_short_int_multiplier),
+            (MED_INTERVAL, config.other_med_int_multiplier),
+            (LONG_INTERVAL, config.other_long_int_multiplier),
+        ]:
+            multipliers[row_kinds == kind] = multiplier
+        for kind, curve_name in _OTHER_SEGMENT_CURVES.items():
+            selected = row_kinds == kind
+            if selected.any():
+                nps = table.notes_per_second[index[rows[selected]]]
+                multipliers[selected] = curve_values(curve_name, nps, config)
+
+        known = np.isin(row_kinds, [SWITCH, SHORT_INTERVAL, MED_INTERVAL, LONG_INTERVAL])
+        known |= np.isin(row_kinds, list(_OTHER_SEGMENT_CURVES))
+        if not known.all():
+            logger.warning(f"WARNING: Did not recognise segment kinds: {set(row_kinds[~known])}")
+
+        # rows are in pattern order, so each Other's multipliers are one slice
+        splits = np.cumsum(np.bincount(pattern[rows])[others])[:-1]
+        return weighted_averages_of_values(np.split(multipliers, splits))
+
+
+def batch_multiply_pattern_scores(
+    pattern_scores: Sequence[PatternScore], config: AnalysisConfig
+) -> np.ndarray:
+    """`multiply_pattern_scores` with the chunks found and multiplied as arrays.
+
+    A pattern with an interval ends the chunk before it and is dropped, unless that chunk is
+    empty. So in a run of such patterns every other one is dropped.
+
+    Args:
+        pattern_scores (Sequence[PatternScore]): The scores of the patterns, in order.
+        config (AnalysisConfig): The compiled config.
+
+    Returns:
+        np.ndarray: The multiplied scores.
+    """
+    n = len(pattern_scores)
+    if n == 0:
+        return np.zeros(0)
+    has_interval = np.array([ps.has_interval for ps in pattern_scores], dtype=bool)
+    positions = np.arange(n)
+
+    # The first position of the run of patterns with an interval each pattern is in
+    run_starts = np.where(
+        has_interval & ~np.concatenate([[False], has_interval[:-1]]), positions, 0
+    )
+    run_starts = np.maximum.accumulate(run_starts)
+    # The first of a run is dropped unless it starts the map, then every other one after it
+    offsets = positions - run_starts + (run_starts > 0)
+    dropped = has_interval & (offsets % 2 == 1)
+    kept = ~dropped
+
+    chunks = np.cumsum(dropped)[kept]
+    notes = np.array([ps.total_notes for ps in pattern_scores], dtype=np.float64)[kept]
+    scores = np.array([ps.score for ps in pattern_scores], dtype=np.float64)[kept]
+    chunk_sizes = np.bincount(chunks)
+    chunk_notes = np.bincount(chunks, weights=notes)
+    multipliers = np.where(
+        chunk_sizes > 2,
+        curve_values("pattern_stream_length_curve", chunk_notes, config),
+        1,
+    )
+    # Pattern names are never the ZIG_ZAG kind, so every score is multiplied
+    not_zig_zag = np.array(
+        [ps.pattern_name != ZIG_ZAG for ps, keep in zip(pattern_scores, kept) if keep], dtype=bool
+    )
+    return np.where(not_zig_zag, scores * multipliers[chunks], scores)
@@ -0,0 +1,254 @@
+import os
+import sqlite3
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+import config.logging_config as logging_config
+from musemapalyzr.analysis_config import AnalysisConfig, get_analysis_config
+from musemapalyzr.density import note_density
+from musemapalyzr.entities import MuseSwiprMap, NoteArray
+
+logger = logging_config.logger
+
+CATALOG_PATH = "corpus_catalog.sqlite"
+
+CatalogEntry = namedtuple(
+    "CatalogEntry",
+    [
+        "path",
+        "size",
+        "mtime_ns",
+        "content_hash",
+        "title",
+        "artist",
+        "difficulty",
+        "sample_rate",
+        "note_count",
+        "duration",
+        "peak_nps",
+    ],
+)
+
+# Bump when the table or how an entry is computed changes, the catalog is then rebuilt
+_SCHEMA_VERSION = 2
+_COLUMNS = ", ".join(CatalogEntry._fields)
+_SCHEMA = """
+CREATE TABLE maps (
+    path TEXT PRIMARY KEY,
+    search_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    title TEXT NOT NULL,
+    artist TEXT,
+    difficulty TEXT,
+    sample_rate INTEGER NOT NULL,
+    note_count INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    peak_nps REAL NOT NULL
+);
+CREATE INDEX maps_artist ON maps (artist COLLATE NOCASE);
+CREATE INDEX maps_difficulty ON maps (difficulty COLLATE NOCASE);
+CREATE INDEX maps_note_count ON maps (note_count);
+CREATE INDEX maps_peak_nps ON maps (peak_nps);
+CREATE TABLE settings (
+    name TEXT PRIMARY KEY,
+    value NOT NULL
+);
+"""
+
+
+def parse_map_filename(filename: str) -> Tuple[Optional[str], Optional[str]]:
+    """Gets the artist and difficulty out of a map's filename.
+
+    Maps are named "Artist - Song - Difficulty.asset". Song titles can contain " - " too, so
+    the artist is the first part and the difficulty the last.
+
+    Args:
+        filename (str): The filename of the map.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: The artist and difficulty, None when missing.
+    """
+    name = os.path.basename(filename)
+    if name.endswith(".asset"):
+        name = name[: -len(".asset")]
+    parts = [part.strip() for part in name.split(" - ")]
+    artist = parts[0] or None
+    difficulty = (parts[-1] or None) if len(parts) > 2 else None
+    return artist, difficulty
+
+
+def peak_notes_per_second(notes: NoteArray, sample_rate: int, sample_window_secs: float) -> float:
+    """Gets the highest note density of a map over any sample_window_secs section."""
+    return note_density(notes, sample_window_secs, sample_rate).peak_nps
+
+
+class MapCatalog:
+    """A SQLite catalog of the maps in a data directory.
+
+    `refresh` compares the size and mtime of every file with its entry, so only new and changed
+    maps are loaded. Queries then never touch the maps themselves.
+
+    The entries' peak NPS depends on the config's sample_window_secs, so the catalog stores the
+    window its entries were built with. When config is compiled with another one, every entry
+    is rebuilt on the next refresh.
+    """
+
+    def __init__(self, db_path: str = CATALOG_PATH, config: Optional[AnalysisConfig] = None):
+        self.db_path = db_path
+        self.config = config if config is not None else get_analysis_config()
+        self._connection = sqlite3.connect(db_path)
+        self._create_schema()
+        self._check_sample_window()
+
+    def _create_schema(self):
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        if version == _SCHEMA_VERSION:
+            return
+        if version != 0:
+            logger.info(f"Rebuilding the map catalog '{self.db_path}' (v{version})")
+        with self._connection:
+            self._connection.execute("DROP TABLE IF EXISTS maps")
+            self._connection.execute("DROP TABLE IF EXISTS settings")
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def _check_sample_window(self):
+        sample_window_secs = self.config.sample_window_secs
+        row = self._connection.execute(
+            "SELECT value FROM settings WHERE name = 'sample_window_secs'"
+        ).fetchone()
+        if row is not None and row[0] == sample_window_secs:
+            return
+        if row is not None:
+            logger.info(
+                f"Rebuilding the map catalog '{self.db_path}' for a {sample_window_secs}s "
+                f"sample window (was {row[0]}s)"
+            )
+        with self._connection:
+            self._connection.execute("DELETE FROM maps")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO settings VALUES ('sample_window_secs', ?)",
+                (sample_window_secs,),
+            )
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def refresh(self, data_dir: str) -> Tuple[int, int]:
+        """Brings the catalog up to date with the .asset files in data_dir.
+
+        Args:
+            data_dir (str): The directory of the maps.
+
+        Returns:
+            Tuple[int, int]: How many entries were added or updated, and how many were removed.
+        """
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self._connection.execute(
+                "SELECT path, size, mtime_ns FROM maps WHERE path LIKE ? ESCAPE '\\'",
+                (_like_prefix(os.path.join(data_dir, "")),),
+            )
+        }
+
+        updated = []
+        with os.scandir(data_dir) as dir_entries:
+            for dir_entry in dir_entries:
+                if not dir_entry.name.endswith(".asset") or not dir_entry.is_file():
+                    continue
+                path = os.path.join(data_dir, dir_entry.name)
+                stat = dir_entry.stat()
+                if known.pop(path, None) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                try:
+                    updated.append(_catalog_entry(path, stat, self.config.sample_window_secs))
+                except Exception as e:
+                    logger.error(f"ERROR cataloguing '{path}': {e}")
+
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO maps (search_name, {_COLUMNS}) "
+                f"VALUES (?, {', '.join('?' * len(CatalogEntry._fields))})",
+                [(os.path.basename(entry.path).lower(), *entry) for entry in updated],
+            )
+            self._connection.executemany(
+                "DELETE FROM maps WHERE path = ?", [(path,) for path in known]
+            )
+        if updated or known:
+            logger.info(f"Map catalog: {len(updated)} updated, {len(known)} removed")
+        return len(updated), len(known)
+
+    def search(
+        self,
+        text: str = "",
+        artist: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        min_peak_nps: Optional[float] = None,
+        max_peak_nps: Optional[float] = None,
+    ) -> List[CatalogEntry]:
+        """Finds the catalogued maps matching every given filter.
+
+        Args:
+            text (str, optional): Only maps with this in their filename, ignoring case.
+            artist (str, optional): Only maps by this artist, ignoring case.
+            difficulty (str, optional): Only maps of this difficulty, ignoring case.
+            min_peak_nps (float, optional): Only maps with at least this peak NPS.
+            max_peak_nps (float, optional): Only maps with at most this peak NPS.
+
+        Returns:
+            List[CatalogEntry]: The matching maps, sorted by path.
+        """
+        conditions = []
+        params = []
+        if text:
+            conditions.append("instr(search_name, ?) > 0")
+            params.append(text.lower())
+        if artist is not None:
+            conditions.append("artist = ? COLLATE NOCASE")
+            params.append(artist)
+        if difficulty is not None:
+            conditions.append("difficulty = ? COLLATE NOCASE")
+            params.append(difficulty)
+        if min_peak_nps is not None:
+            conditions.append("peak_nps >= ?")
+            params.append(min_peak_nps)
+        if max_peak_nps is not None:
+            conditions.append("peak_nps <= ?")
+            params.append(max_peak_nps)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connection.execute(
+            f"SELECT {_COLUMNS} FROM maps {where} ORDER BY path", params
+        )
+        return [CatalogEntry(*row) for row in rows]
+
+
+def _like_prefix(prefix: str) -> str:
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def _catalog_entry(path: str, stat: os.stat_result, sample_window_secs: float) -> CatalogEntry:
+    m_map = MuseSwiprMap.from_koreograph_asset(path)
+    artist, difficulty = parse_map_filename(path)
+    return CatalogEntry(
+        path=path,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        content_hash=m_map.content_hash,
+        title=m_map.title,
+        artist=artist,
+        difficulty=difficulty,
+        sample_rate=m_map.sample_rate,
+        note_count=m_map.note_count,
+        duration=m_map.duration,
+        peak_nps=peak_notes_per_second(m_map.notes, m_map.sample_rate, sample_window_secs),
+    )
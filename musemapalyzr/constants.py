@@ -1,19 +1,62 @@
+from enum import IntFlag
+
 from config.config import get_config
 
 conf = get_config()
 
 DEFAULT_SAMPLE_RATE = 44100  # time_s * TIME_CONVERSION = sample_time
 
-SWITCH = "Switch"
-ZIG_ZAG = "Zig Zag"
-TWO_STACK = "2-Stack"
-THREE_STACK = "3-Stack"
-FOUR_STACK = "4-Stack"
-SINGLE_STREAMS = "Single Streams"
 
-SHORT_INTERVAL = "Short Interval"
-MED_INTERVAL = "Medium Interval"
-LONG_INTERVAL = "Long Interval"
+class SegmentKind(IntFlag):
+    """The kind of a Segment. Each kind is one bit so that classes of kinds are masks."""
+
+    SWITCH = 1 << 0
+    ZIG_ZAG = 1 << 1
+    TWO_STACK = 1 << 2
+    THREE_STACK = 1 << 3
+    FOUR_STACK = 1 << 4
+    SINGLE_STREAMS = 1 << 5
+    SHORT_INTERVAL = 1 << 6
+    MED_INTERVAL = 1 << 7
+    LONG_INTERVAL = 1 << 8
+    OTHER = 1 << 9
+
+
+# Plain ints so the hot paths never go through the enum machinery
+SWITCH = SegmentKind.SWITCH.value
+ZIG_ZAG = SegmentKind.ZIG_ZAG.value
+TWO_STACK = SegmentKind.TWO_STACK.value
+THREE_STACK = SegmentKind.THREE_STACK.value
+FOUR_STACK = SegmentKind.FOUR_STACK.value
+SINGLE_STREAMS = SegmentKind.SINGLE_STREAMS.value
+
+SHORT_INTERVAL = SegmentKind.SHORT_INTERVAL.value
+MED_INTERVAL = SegmentKind.MED_INTERVAL.value
+LONG_INTERVAL = SegmentKind.LONG_INTERVAL.value
+
+OTHER_SEGMENT = SegmentKind.OTHER.value
+
+# Segment kind masks
+N_STACK_MASK = TWO_STACK | THREE_STACK | FOUR_STACK
+INTERVAL_MASK = SHORT_INTERVAL | MED_INTERVAL | LONG_INTERVAL
+STREAM_LIKE_MASK = ZIG_ZAG | SINGLE_STREAMS  # Segments of notes faster than short_interval_nps
+
+# Short Single Streams are renamed to the N-Stack of their length
+N_STACK_BY_NOTE_COUNT = {2: TWO_STACK, 3: THREE_STACK, 4: FOUR_STACK}
+
+# Only to be used when reporting, e.g. logs and exports
+SEGMENT_NAMES = {
+    SWITCH: "Switch",
+    ZIG_ZAG: "Zig Zag",
+    TWO_STACK: "2-Stack",
+    THREE_STACK: "3-Stack",
+    FOUR_STACK: "4-Stack",
+    SINGLE_STREAMS: "Single Streams",
+    SHORT_INTERVAL: "Short Interval",
+    MED_INTERVAL: "Medium Interval",
+    LONG_INTERVAL: "Long Interval",
+    OTHER_SEGMENT: "Other",
+}
 
 SLOW_STRETCH = "Slow Stretch"
 EVEN_CIRCLES = "Even Circles"
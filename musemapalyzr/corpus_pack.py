@@ -0,0 +1,224 @@
+import argparse
+import lzma
+import os
+import struct
+import threading
+import zipfile
+import zlib
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import config.logging_config as logging_config
+from musemapalyzr.note_cache import asset_hash
+
+logger = logging_config.logger
+
+PackEntry = namedtuple("PackEntry", ["offset", "compressed_size", "size", "content_hash"])
+
+ZLIB = "zlib"
+LZMA = "lzma"
+_CODECS = {
+    ZLIB: (1, lambda raw: zlib.compress(raw, 9), zlib.decompress),
+    LZMA: (2, lzma.compress, lzma.decompress),
+}
+_CODEC_NAMES = {codec_id: name for name, (codec_id, _, _) in _CODECS.items()}
+
+_MAGIC = b"MSPK"
+_VERSION = 1
+# magic, version, codec, entry count, index offset
+_HEADER = struct.Struct("<4sHBIQ")
+# name length (bytes), payload offset, compressed size, size, asset hash
+_INDEX_ENTRY = struct.Struct("<HQQQ16s")
+
+
+def write_pack(pack_path: str, assets: Iterable[Tuple[str, bytes]], codec: str = ZLIB) -> int:
+    """Writes a corpus pack: every asset compressed on its own, followed by an index.
+
+    Each asset is compressed separately, so a reader can decompress any one of them without
+    touching the rest. The index at the end of the file maps each name to its payload's offset
+    and sizes, and to the asset's hash, which is the key of its note cache file.
+
+    Args:
+        pack_path (str): Where to write the pack.
+        assets (Iterable[Tuple[str, bytes]]): (name, raw contents) of each asset.
+        codec (str, optional): ZLIB or LZMA. Defaults to ZLIB.
+
+    Returns:
+        int: The number of assets written.
+
+    Raises:
+        ValueError: If the codec is unknown or two assets have the same name.
+    """
+    if codec not in _CODECS:
+        raise ValueError(f"Unknown codec '{codec}', expected one of {list(_CODECS)}.")
+    codec_id, compress, _ = _CODECS[codec]
+
+    index: Dict[str, PackEntry] = {}
+    temp_path = f"{pack_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            for name, raw in assets:
+                if name in index:
+                    raise ValueError(f"The pack already has an asset named '{name}'.")
+                payload = compress(raw)
+                index[name] = PackEntry(f.tell(), len(payload), len(raw), asset_hash(raw))
+                f.write(payload)
+
+            index_offset = f.tell()
+            for name, entry in index.items():
+                name_bytes = name.encode("utf-8")
+                f.write(
+                    _INDEX_ENTRY.pack(
+                        len(name_bytes),
+                        entry.offset,
+                        entry.compressed_size,
+                        entry.size,
+                        bytes.fromhex(entry.content_hash),
+                    )
+                )
+                f.write(name_bytes)
+
+            f.seek(0)
+            f.write(_HEADER.pack(_MAGIC, _VERSION, codec_id, len(index), index_offset))
+        os.replace(temp_path, pack_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return len(index)
+
+
+def _directory_assets(data_dir: str) -> Iterator[Tuple[str, bytes]]:
+    for filename in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, filename)
+        if filename.endswith(".asset") and os.path.isfile(path):
+            with open(path, "rb") as f:
+                yield filename, f.read()
+
+
+def _zip_assets(zip_path: str) -> Iterator[Tuple[str, bytes]]:
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in sorted(archive.infolist(), key=lambda info: info.filename):
+            filename = info.filename.rsplit("/", 1)[-1]
+            if not info.is_dir() and filename.endswith(".asset"):
+                yield filename, archive.read(info)
+
+
+def import_corpus(source: str, pack_path: str, codec: str = ZLIB) -> int:
+    """Builds a corpus pack from a directory of .asset files or a zip of them.
+
+    Assets are named by their filename, so a pack built from `data/` holds the same names as
+    `os.listdir("data")`. Folders inside a zip are flattened.
+
+    Args:
+        source (str): A directory or a zip file.
+        pack_path (str): Where to write the pack.
+        codec (str, optional): ZLIB or LZMA. Defaults to ZLIB.
+
+    Returns:
+        int: The number of assets imported.
+    """
+    if os.path.isdir(source):
+        assets = _directory_assets(source)
+    elif zipfile.is_zipfile(source):
+        assets = _zip_assets(source)
+    else:
+        raise ValueError(f"'{source}' is neither a directory nor a zip file.")
+
+    count = write_pack(pack_path, assets, codec)
+    logger.info(f"Packed {count} assets from '{source}' into '{pack_path}' ({codec})")
+    return count
+
+
+class CorpusPack:
+    """Reads assets out of a corpus pack written by `write_pack`.
+
+    Only the header and index are read when the pack is opened. `read` then seeks straight to
+    one payload and decompresses just that asset. `read` can be called from several threads at
+    once.
+    """
+
+    def __init__(self, pack_path: str):
+        self.pack_path = pack_path
+        self._file = open(pack_path, "rb")
+        # Each read seeks the one shared file, so a seek and its read must not interleave
+        self._lock = threading.Lock()
+        try:
+            self._read_index()
+        except Exception:
+            self._file.close()
+            raise
+
+    def _read_index(self):
+        header = self._file.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise ValueError(f"'{self.pack_path}' is not a corpus pack.")
+        magic, version, codec_id, entry_count, index_offset = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION or codec_id not in _CODEC_NAMES:
+            raise ValueError(f"'{self.pack_path}' is not a corpus pack this version can read.")
+        self.codec = _CODEC_NAMES[codec_id]
+        self._decompress = _CODECS[self.codec][2]
+
+        self._file.seek(index_offset)
+        index = self._file.read()
+        self.entries: Dict[str, PackEntry] = {}
+        position = 0
+        for _ in range(entry_count):
+            name_length, offset, compressed_size, size, content_hash = _INDEX_ENTRY.unpack_from(
+                index, position
+            )
+            position += _INDEX_ENTRY.size
+            name = index[position : position + name_length].decode("utf-8")
+            position += name_length
+            self.entries[name] = PackEntry(offset, compressed_size, size, content_hash.hex())
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def names(self) -> List[str]:
+        return list(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def read(self, name: str) -> bytes:
+        """Decompresses one asset.
+
+        Args:
+            name (str): The name of the asset.
+
+        Returns:
+            bytes: The raw contents of the asset.
+
+        Raises:
+            KeyError: If the pack has no asset with that name.
+        """
+        entry = self.entries[name]
+        with self._lock:
+            self._file.seek(entry.offset)
+            payload = self._file.read(entry.compressed_size)
+        raw = self._decompress(payload)
+        if len(raw) != entry.size:
+            raise ValueError(f"'{name}' in '{self.pack_path}' is corrupt.")
+        return raw
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a corpus of .asset files.")
+    parser.add_argument("source", help="A directory of .asset files or a zip of them")
+    parser.add_argument("pack_path", help="Where to write the pack")
+    parser.add_argument("--codec", choices=list(_CODECS), default=ZLIB)
+    args = parser.parse_args()
+    import_corpus(args.source, args.pack_path, args.codec)
@@ -0,0 +1,203 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import config.logging_config as logging_config
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.corpus_pack import CorpusPack
+from musemapalyzr.difficulty_calculation import score_map
+from musemapalyzr.difficulty_export import export_name
+from musemapalyzr.entities import MuseSwiprMap
+from musemapalyzr.note_cache import file_content_hash
+from musemapalyzr.result_cache import ResultCache
+from musemapalyzr.utils import MapScore
+
+logger = logging_config.logger
+
+# How many maps are sent to a worker at a time
+DEFAULT_CHUNK_SIZE = 4
+
+# What a worker sends back for a map: its Weighting and density curve, or the error that stopped
+# it (with weighting and density_curve None), and the asset_hash of the contents it scored (None
+# if it could not load them)
+MapResult = namedtuple(
+    "MapResult", ["filename", "weighting", "density_curve", "error", "content_hash"]
+)
+
+# The corpus pack a worker reads its maps from, opened once by _init_worker
+_pack: Optional[CorpusPack] = None
+
+
+def _init_worker(log_queue, pack_path: Optional[str]):
+    global _pack
+    logging_config.forward_worker_logs(log_queue)
+    # Compile the config once, so every map after the first starts scoring straight away
+    get_analysis_config()
+    if pack_path is not None:
+        _pack = CorpusPack(pack_path)
+
+
+def _score_in_worker(filename: str, data_dir: str, output_notes: bool) -> MapResult:
+    return score_file(filename, data_dir, _pack, output_notes)
+
+
+def score_file(
+    filename: str,
+    data_dir: str,
+    pack: Optional[CorpusPack] = None,
+    output_notes: bool = False,
+) -> MapResult:
+    """Loads and scores one map of a corpus.
+
+    Args:
+        filename (str): The asset's filename in data_dir, or its name in the pack.
+        data_dir (str): The directory of the assets.
+        pack (CorpusPack, optional): The pack to load the map from instead. Defaults to None.
+        output_notes (bool, optional): Whether to write the map's notes to "{name}.txt".
+            Defaults to False.
+
+    Returns:
+        MapResult: The map's scores, or the error if it could not be loaded or scored.
+    """
+    try:
+        if pack is not None:
+            m_map = MuseSwiprMap.from_corpus_pack(pack, filename)
+        else:
+            m_map = MuseSwiprMap.from_koreograph_asset(f"{data_dir}/{filename}")
+        logger.info(f"Processing: '{filename}'")
+        weighting, density_curve = score_map(m_map.notes, sample_rate=m_map.sample_rate)
+        if output_notes:
+            m_map.output_notes(f"{export_name(filename)}.txt")
+    except Exception as e:
+        return MapResult(filename, None, None, str(e), None)
+    return MapResult(filename, weighting, density_curve, None, m_map.content_hash)
+
+
+def run_corpus(
+    files: Iterable[str],
+    data_dir: str,
+    pack_path: Optional[str] = None,
+    output_notes: bool = False,
+    max_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cache: Optional[ResultCache] = None,
+) -> Iterator[MapResult]:
+    """Scores the maps of a corpus across a pool of worker processes.
+
+    The maps are sent to the workers chunk_size at a time. Each worker loads the config (and, with
+    a pack, opens it) once, and sends back only a MapResult per map, never its Patterns. The
+    results come back in the order of files, whichever worker finishes first.
+
+    With max_workers 1 the maps are scored one by one in this process, with no pool at all.
+
+    With a cache, only the maps it has no result for are scored, each distinct asset once, and
+    their results are added to it. It is not used with output_notes, which needs every map loaded.
+
+    Args:
+        files (Iterable[str]): The filenames in data_dir, or the names in the pack.
+        data_dir (str): The directory of the assets.
+        pack_path (str, optional): The corpus pack to load the maps from instead.
+            Defaults to None.
+        output_notes (bool, optional): Whether to write each map's notes to "{name}.txt".
+            Defaults to False.
+        max_workers (int, optional): The number of worker processes. Defaults to the CPU count.
+        chunk_size (int, optional): How many maps are sent to a worker at a time.
+            Defaults to DEFAULT_CHUNK_SIZE.
+        cache (ResultCache, optional): The cache of results. Defaults to None.
+
+    Yields:
+        MapResult: The result of each map, in the order of files.
+
+    Raises:
+        ValueError: If max_workers or chunk_size is less than 1.
+    """
+    if max_workers is not None and max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, not {max_workers}.")
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, not {chunk_size}.")
+
+    files: List[str] = list(files)
+    if cache is None or output_notes:
+        yield from _score_corpus(files, data_dir, pack_path, output_notes, max_workers, chunk_size)
+        return
+
+    content_hashes = _content_hashes(files, data_dir, pack_path)
+    cached = cache.get_many(h for h in content_hashes if h is not None)
+    # The first filename of each map to score, by its hash. A file that could not be hashed is
+    # scored by itself, by its filename, so its error is reported.
+    misses: Dict[str, str] = {}
+    for filename, content_hash in zip(files, content_hashes):
+        if content_hash not in cached:
+            misses.setdefault(content_hash or filename, filename)
+
+    results = zip(
+        misses,
+        _score_corpus(list(misses.values()), data_dir, pack_path, False, max_workers, chunk_size),
+    )
+    scored: Dict[str, MapResult] = {}
+    for filename, content_hash in zip(files, content_hashes):
+        if content_hash in cached:
+            weighting, density_curve = cached[content_hash]
+            yield MapResult(filename, weighting, density_curve, None, content_hash)
+            continue
+        key = content_hash or filename
+        # The misses come back in the order they first appear in files
+        while key not in scored:
+            miss_key, result = next(results)
+            scored[miss_key] = result
+            # Cached under the hash of what was scored, not miss_key: the file may have been
+            # rewritten since it was hashed for the lookup
+            if result.error is None and result.content_hash is not None:
+                cache.put(result.content_hash, MapScore(result.weighting, result.density_curve))
+        yield scored[key]._replace(filename=filename)
+
+
+def _content_hashes(
+    files: List[str], data_dir: str, pack_path: Optional[str]
+) -> List[Optional[str]]:
+    # The asset_hash of each file, None if it could not be read
+    if pack_path is not None:
+        with CorpusPack(pack_path) as pack:
+            return [
+                pack.entries[name].content_hash if name in pack.entries else None for name in files
+            ]
+
+    content_hashes = []
+    for filename in files:
+        try:
+            content_hashes.append(file_content_hash(f"{data_dir}/{filename}"))
+        except OSError:
+            content_hashes.append(None)
+    return content_hashes
+
+
+def _score_corpus(
+    files: List[str],
+    data_dir: str,
+    pack_path: Optional[str],
+    output_notes: bool,
+    max_workers: Optional[int],
+    chunk_size: int,
+) -> Iterator[MapResult]:
+    if max_workers == 1:
+        pack = CorpusPack(pack_path) if pack_path is not None else None
+        try:
+            for filename in files:
+                yield score_file(filename, data_dir, pack, output_notes)
+        finally:
+            if pack is not None:
+                pack.close()
+        return
+
+    with ProcessPoolExecutor(
+        max_workers,
+        initializer=_init_worker,
+        initargs=(logging_config.worker_log_queue(), pack_path),
+    ) as executor:
+        yield from executor.map(
+            _score_in_worker,
+            files,
+            [data_dir] * len(files),
+            [output_notes] * len(files),
+            chunksize=chunk_size,
+        )
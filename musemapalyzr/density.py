@@ -0,0 +1,216 @@
+from collections import namedtuple
+from typing import List, Optional, Union
+
+import numpy as np
+
+from musemapalyzr.constants import DEFAULT_SAMPLE_RATE
+from musemapalyzr.entities import Note, NoteArray
+
+NoteDensity = namedtuple(
+    "NoteDensity", ["section_counts", "lane_section_counts", "moving_averages", "peak_nps"]
+)
+
+
+def _as_arrays(notes: Union[List[Note], NoteArray]):
+    if isinstance(notes, NoteArray):
+        return notes.lanes, notes.sample_times
+    lanes = np.array([note.lane for note in notes], dtype=np.int64)
+    sample_times = np.array([note.sample_time for note in notes], dtype=np.int64)
+    return lanes, sample_times
+
+
+def section_indices(sample_times: np.ndarray, section_threshold) -> np.ndarray:
+    """Gets the section of `create_sections` each sample time falls in."""
+    return ((sample_times - sample_times.min()) // section_threshold).astype(np.int64)
+
+
+def moving_averages(section_counts: np.ndarray, window_size: int) -> np.ndarray:
+    """The `moving_average_note_density` of section counts, from one cumulative sum.
+
+    The window of each section is itself and up to window_size - 1 sections before it.
+    """
+    cumulative = np.concatenate(([0], np.cumsum(section_counts)))
+    ends = np.arange(1, len(section_counts) + 1)
+    starts = np.maximum(ends - window_size, 0)
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+
+def note_density(
+    notes: Union[List[Note], NoteArray],
+    section_threshold_seconds=1,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    moving_avg_window: int = 5,
+) -> NoteDensity:
+    """Measures how dense a map is over time, without building any sections.
+
+    Gives the same numbers as `create_sections` followed by `moving_average_note_density`: the
+    notes are counted per section with one `bincount`, and the moving average comes from a
+    cumulative sum. The notes are not modified, and do not need to be sorted.
+
+    Args:
+        notes (Union[List[Note], NoteArray]): The notes of the map.
+        section_threshold_seconds (int, optional): The length of the sections in seconds.
+            Defaults to 1.
+        sample_rate (int, optional): The sample rate of the map. Defaults to DEFAULT_SAMPLE_RATE.
+        moving_avg_window (int, optional): How many sections each moving average spans.
+            Defaults to 5.
+
+    Returns:
+        NoteDensity: The notes in each section, the notes of each lane in each section
+            (lane by section), the moving averages and the peak notes per second.
+    """
+    lanes, sample_times = _as_arrays(notes)
+    if len(sample_times) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return NoteDensity(empty, np.zeros((0, 0), dtype=np.int64), np.zeros(0), 0.0)
+
+    section_threshold = section_threshold_seconds * sample_rate
+    indices = section_indices(sample_times, section_threshold)
+    num_sections = int(indices.max()) + 1
+
+    num_lanes = int(lanes.max()) + 1
+    lane_section_counts = np.bincount(
+        lanes.astype(np.int64) * num_sections + indices, minlength=num_lanes * num_sections
+    ).reshape(num_lanes, num_sections)
+    section_counts = lane_section_counts.sum(axis=0)
+
+    return NoteDensity(
+        section_counts=section_counts,
+        lane_section_counts=lane_section_counts,
+        moving_averages=moving_averages(section_counts, moving_avg_window),
+        peak_nps=float(section_counts.max() / section_threshold_seconds),
+    )
+
+
+def section_boundaries(num_sections: int, section_threshold) -> np.ndarray:
+    """Gets the first offset (from the first note) of each section of `section_indices`.
+
+    Section k holds the offsets from boundaries[k] up to, not including, boundaries[k + 1]. With
+    a fractional section_threshold the boundaries are the same whole samples floor division
+    puts the notes in.
+    """
+    k = np.arange(num_sections + 1)
+    boundaries = np.ceil(k * section_threshold).astype(np.int64)
+    # ceil(k * threshold) can be a sample off of where the floor division changes section
+    boundaries -= (boundaries - 1) // section_threshold >= k
+    boundaries += boundaries // section_threshold < k
+    return boundaries
+
+
+class DensityPyramid:
+    """Cumulative note counts of a map at several resolutions.
+
+    Built once per map, it answers the density of any section length and moving average window
+    without going back to the notes:
+
+        - Level j counts the notes of each lane before every multiple of
+          base_samples * 2 ** j samples (from the first note). Each level is every other entry
+          of the level below it.
+        - The notes in a section are the difference of two cumulative counts. A section length
+          that is a multiple of a level's width is answered from the coarsest such level.
+        - Any other section length is answered by binary searching the sorted note offsets,
+          which are kept as the finest level of the pyramid.
+
+    Either way the counts are exactly those of `create_sections`.
+    """
+
+    def __init__(
+        self,
+        notes: Union[List[Note], NoteArray],
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        base_window_secs: float = 0.05,
+    ):
+        lanes, sample_times = _as_arrays(notes)
+        self.sample_rate = sample_rate
+        self.base_samples = max(1, int(base_window_secs * sample_rate))
+
+        self.num_notes = len(sample_times)
+        self.num_lanes = int(lanes.max()) + 1 if self.num_notes else 0
+        offsets = sample_times - sample_times.min() if self.num_notes else sample_times
+        self.span = int(offsets.max()) if self.num_notes else 0
+
+        # The sorted offsets of each lane
+        self.lane_offsets = [np.sort(offsets[lanes == lane]) for lane in range(self.num_lanes)]
+
+        # levels[j][lane, i] is how many notes of the lane are before i * widths[j]. The last
+        # entry of every level is the lane's total, which is also the count past the last note.
+        num_bins = self.span // self.base_samples + 1
+        base_counts = np.bincount(
+            lanes.astype(np.int64) * num_bins + offsets // self.base_samples,
+            minlength=self.num_lanes * num_bins,
+        ).reshape(self.num_lanes, num_bins)
+        cumulative = np.zeros((self.num_lanes, num_bins + 1), dtype=np.int64)
+        np.cumsum(base_counts, axis=1, out=cumulative[:, 1:])
+
+        self.widths = [self.base_samples]
+        self.levels = [cumulative]
+        while self.widths[-1] * 2 <= self.span:
+            self.widths.append(self.widths[-1] * 2)
+            coarser = self.levels[-1][:, :-1:2]
+            self.levels.append(np.concatenate((coarser, cumulative[:, -1:]), axis=1))
+
+    def _level_for(self, section_threshold) -> Optional[int]:
+        # The coarsest level whose width divides the section length, None when none does
+        if section_threshold != int(section_threshold):
+            return None
+        multiple, remainder = divmod(int(section_threshold), self.base_samples)
+        if remainder or multiple == 0:
+            return None
+        # The widths double, so this is how many times 2 divides the multiple
+        return min((multiple & -multiple).bit_length() - 1, len(self.levels) - 1)
+
+    def lane_section_counts(self, section_threshold_seconds=1) -> np.ndarray:
+        """Gets the notes of each lane in each section, as `note_density` counts them.
+
+        Args:
+            section_threshold_seconds (int, optional): The length of the sections in seconds.
+                Defaults to 1.
+
+        Returns:
+            np.ndarray: The counts, lane by section.
+        """
+        if self.num_notes == 0:
+            return np.zeros((0, 0), dtype=np.int64)
+        section_threshold = section_threshold_seconds * self.sample_rate
+        num_sections = int(self.span // section_threshold) + 1
+
+        level = self._level_for(section_threshold)
+        if level is not None:
+            step = int(section_threshold) // self.widths[level]
+            cumulative = self.levels[level]
+            # Entries past the last note hold every note
+            entries = np.minimum(np.arange(num_sections + 1) * step, cumulative.shape[1] - 1)
+            cumulative = cumulative[:, entries]
+        else:
+            boundaries = section_boundaries(num_sections, section_threshold)
+            cumulative = np.stack(
+                [np.searchsorted(offsets, boundaries, side="left") for offsets in self.lane_offsets]
+            )
+        return np.diff(cumulative, axis=1)
+
+    def section_counts(self, section_threshold_seconds=1) -> np.ndarray:
+        """Gets the notes in each section, as `note_density` counts them."""
+        return self.lane_section_counts(section_threshold_seconds).sum(axis=0)
+
+    def density(self, section_threshold_seconds=1, moving_avg_window: int = 5) -> NoteDensity:
+        """Gets the same NoteDensity as `note_density` would for these notes.
+
+        Args:
+            section_threshold_seconds (int, optional): The length of the sections in seconds.
+                Defaults to 1.
+            moving_avg_window (int, optional): How many sections each moving average spans.
+                Defaults to 5.
+
+        Returns:
+            NoteDensity: The density of the map.
+        """
+        if self.num_notes == 0:
+            return note_density([], section_threshold_seconds, self.sample_rate)
+        lane_section_counts = self.lane_section_counts(section_threshold_seconds)
+        section_counts = lane_section_counts.sum(axis=0)
+        return NoteDensity(
+            section_counts=section_counts,
+            lane_section_counts=lane_section_counts,
+            moving_averages=moving_averages(section_counts, moving_avg_window),
+            peak_nps=float(section_counts.max() / section_threshold_seconds),
+        )
@@ -1,53 +1,69 @@
-from typing import List, Tuple
+from concurrent.futures import Executor
+from typing import List, Optional, Tuple, Union
 
 import config.logging_config as logging_config
-from config.config import get_config
+from musemapalyzr import tracing
+from musemapalyzr.analysis_config import AnalysisConfig, get_analysis_config
+from musemapalyzr.batch_scoring import BatchPatternScorer, batch_multiply_pattern_scores
 from musemapalyzr.constants import DEFAULT_SAMPLE_RATE, ZIG_ZAG
-from musemapalyzr.entities import Note, Segment
-from musemapalyzr.map_pattern_analysis import Mapalyzr
+from musemapalyzr.density import note_density
+from musemapalyzr.entities import Note, NoteArray, Segment
+from musemapalyzr.map_pattern_analysis import AUTOMATON_ENGINE, Mapalyzr
+from musemapalyzr.parallel_patterns import parallel_pattern_scores
 from musemapalyzr.pattern_multipliers import pattern_stream_length_multiplier
+from musemapalyzr.pattern_views import PatternScorer
+from musemapalyzr.tracing import ChunkMultiplied
 from musemapalyzr.utils import (
+    VECTORISED_ENGINE,
+    MapScore,
     PatternScore,
     Weighting,
     analyse_segments,
-    create_sections,
-    moving_average_note_density,
     weighted_average_of_values,
 )
 from patterns.pattern import Pattern
 
 logger = logging_config.logger
-conf = get_config()
 
 
-def apply_multiplier_to_pattern_chunk(chunk: List[PatternScore]) -> List[float]:
+def apply_multiplier_to_pattern_chunk(
+    chunk: List[PatternScore], config: Optional[AnalysisConfig] = None
+) -> List[float]:
     """Multiplies the PatternScores in the chunk by the multiplier calculated by the total notes in the chunk
 
     Args:
         chunk (List[PatternScore]): The list of PatternScores to multiply
-        pattern_score (PatternScore): The PatternScore that will be used to calculate the multiplier
+        config (AnalysisConfig, optional): The compiled config. Defaults to the default config.
 
     Returns:
         List[float]: A list that just contains the multiplied scores
     """
+    if config is None:
+        config = get_analysis_config()
     total_notes = sum([ps.total_notes for ps in chunk])
 
     multiplier = 1
     if len(chunk) > 2:
-        multiplier = pattern_stream_length_multiplier(total_notes)
+        multiplier = pattern_stream_length_multiplier(
+            total_notes, *config.pattern_stream_length_curve
+        )
     multiplied = [
         c_ps.score * multiplier if c_ps.pattern_name != ZIG_ZAG else c_ps.score for c_ps in chunk
     ]
-    logger.debug(f"Applying multiplier ({multiplier}x) - Chunk ({total_notes} notes): {chunk}")
+    if __debug__ and tracing.sink is not None:
+        tracing.sink.emit(ChunkMultiplied(len(chunk), total_notes, multiplier))
 
     return multiplied
 
 
-def calculate_scores_from_patterns(patterns: List[Pattern]) -> List[float]:
+def calculate_scores_from_patterns(
+    patterns: List[Pattern], config: Optional[AnalysisConfig] = None
+) -> List[float]:
     """Calculates the difficulty scores for a list of patterns and returns a list of scores.
 
     Args:
         patterns (List[Pattern]): A list of patterns to calculate scores for.
+        config (AnalysisConfig, optional): The compiled config. Defaults to the default config.
 
     Returns:
         List[float]: A list of difficulty scores for the input patterns.
@@ -65,24 +81,47 @@ def calculate_scores_from_patterns(patterns: List[Pattern]) -> List[float]:
                 )
             )
 
+    return multiply_pattern_scores(pattern_scores, config)
+
+
+def multiply_pattern_scores(
+    pattern_scores: List[PatternScore], config: Optional[AnalysisConfig] = None
+) -> List[float]:
+    """Applies the length multiplier to each chunk of PatternScores between intervals.
+
+    Args:
+        pattern_scores (List[PatternScore]): The scores of the patterns, in order.
+        config (AnalysisConfig, optional): The compiled config. Defaults to the default config.
+
+    Returns:
+        List[float]: The multiplied scores.
+    """
     scores = []
     chunk = []
     for pattern_score in pattern_scores:
         if pattern_score.has_interval and chunk:
-            multiplied = apply_multiplier_to_pattern_chunk(chunk)
+            multiplied = apply_multiplier_to_pattern_chunk(chunk, config)
             scores += multiplied
             chunk = []
         else:
             chunk.append(pattern_score)
 
     if chunk:
-        multiplied = apply_multiplier_to_pattern_chunk(chunk)
+        multiplied = apply_multiplier_to_pattern_chunk(chunk, config)
         scores += multiplied
 
     return scores
 
 
-def get_pattern_weighting(notes: List[Note], sample_rate: int = DEFAULT_SAMPLE_RATE) -> float:
+def get_pattern_weighting(
+    notes: Union[List[Note], NoteArray],
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    segment_engine: str = VECTORISED_ENGINE,
+    config: Optional[AnalysisConfig] = None,
+    pattern_engine: str = AUTOMATON_ENGINE,
+    executor: Optional[Executor] = None,
+    batch_scoring: bool = False,
+) -> float:
     """Calculates the overall weighting of pattern difficulty
 
     Gets the Pattern's difficulty which accounts for:
@@ -92,40 +131,128 @@ def get_pattern_weighting(notes: List[Note], sample_rate: int = DEFAULT_SAMPLE_R
     Then gets the average of them.
 
     Args:
-        note (List[Note]): A list of Notes in order of occurrence
+        notes (Union[List[Note], NoteArray]): The Notes in order of occurrence
         sample_rate (int): The sample rate of the map. Defaults to DEFAULT_SAMPLE_RATE.
+        segment_engine (str): The `analyse_segments` engine. Defaults to VECTORISED_ENGINE.
+        config (AnalysisConfig, optional): The compiled config. Defaults to the config compiled
+            for sample_rate.
+        pattern_engine (str): The `Mapalyzr` engine. Defaults to AUTOMATON_ENGINE.
+        executor (Executor, optional): If given, the AUTOMATON_ENGINE identifies and scores
+            Patterns in chunks on this pool (see `parallel_pattern_scores`). Defaults to None.
+        batch_scoring (bool): If True, the AUTOMATON_ENGINE scores all the Patterns at once with
+            a BatchPatternScorer, which matches the default to within floating-point rounding.
+            Defaults to False.
 
     Returns:
         float: The pattern weighting
     """
-    mpg = Mapalyzr()
-    segments = analyse_segments(notes, sample_rate)
-    patterns = mpg.identify_patterns(segments)
-
-    scores = calculate_scores_from_patterns(patterns)
+    if config is None:
+        config = get_analysis_config(sample_rate)
+    mpg = Mapalyzr(config, pattern_engine)
+    segments = analyse_segments(notes, config.sample_rate, segment_engine, config)
+    if pattern_engine == AUTOMATON_ENGINE and executor is not None:
+        pattern_scores = parallel_pattern_scores(segments, config, executor).pattern_scores
+        scores = multiply_pattern_scores(pattern_scores, config)
+    elif pattern_engine == AUTOMATON_ENGINE and batch_scoring:
+        views = mpg.identify_pattern_views(segments)
+        pattern_scores = BatchPatternScorer(mpg.pattern_classes, config).score_all(views, segments)
+        scores = batch_multiply_pattern_scores(pattern_scores, config)
+    elif pattern_engine == AUTOMATON_ENGINE:
+        # Patterns stay views into the segments, scored with one Pattern per pattern name
+        views = mpg.identify_pattern_views(segments)
+        pattern_scores = PatternScorer(mpg.pattern_classes, config).score_all(views, segments)
+        scores = multiply_pattern_scores(pattern_scores, config)
+    else:
+        patterns = mpg.identify_patterns(segments)
+        scores = calculate_scores_from_patterns(patterns, config)
 
     # Gets the average difficulty score across all the Patterns
     difficulty = weighted_average_of_values(
         scores,
-        top_percentage=conf["get_pattern_weighting_top_percentage"],
-        top_weight=conf["get_pattern_weighting_top_weight"],
-        bottom_weight=conf["get_pattern_weighting_bottom_weight"],
+        top_percentage=config.pattern_weighting_top_percentage,
+        top_weight=config.pattern_weighting_top_weight,
+        bottom_weight=config.pattern_weighting_bottom_weight,
     )
     logger.debug(f"{'WEIGHTED Average Difficulty Score:':>25} {difficulty}")
 
     return difficulty
 
 
-def calculate_difficulty(notes, outfile=None, sample_rate: int = DEFAULT_SAMPLE_RATE) -> Weighting:
-    sections = create_sections(notes, conf["sample_window_secs"], sample_rate)
-
-    moving_avg = moving_average_note_density(sections, conf["moving_avg_window"])
+def calculate_difficulty(
+    notes: Union[List[Note], NoteArray],
+    outfile=None,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    segment_engine: str = VECTORISED_ENGINE,
+    config: Optional[AnalysisConfig] = None,
+    pattern_engine: str = AUTOMATON_ENGINE,
+    executor: Optional[Executor] = None,
+    batch_scoring: bool = False,
+) -> Weighting:
+    if config is None:
+        config = get_analysis_config(sample_rate)
+    if not isinstance(notes, NoteArray):
+        notes = NoteArray.from_notes(notes)
+    moving_avg = _density_curve(notes, config)
     if outfile:
         for s in moving_avg:
             outfile.write(f"{s}\n")
+    return _weigh(
+        notes, moving_avg, config, segment_engine, pattern_engine, executor, batch_scoring
+    )
+
+
+def score_map(
+    notes: Union[List[Note], NoteArray],
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    config: Optional[AnalysisConfig] = None,
+) -> MapScore:
+    """`calculate_difficulty`, returning the density curve it would write instead.
+
+    Args:
+        notes (Union[List[Note], NoteArray]): The Notes in order of occurrence
+        sample_rate (int): The sample rate of the map. Defaults to DEFAULT_SAMPLE_RATE.
+        config (AnalysisConfig, optional): The compiled config. Defaults to the config compiled
+            for sample_rate.
+
+    Returns:
+        MapScore: The Weighting and the note density moving averages.
+    """
+    if config is None:
+        config = get_analysis_config(sample_rate)
+    if not isinstance(notes, NoteArray):
+        notes = NoteArray.from_notes(notes)
+    moving_avg = _density_curve(notes, config)
+    weighting = _weigh(notes, moving_avg, config, VECTORISED_ENGINE, AUTOMATON_ENGINE, None, False)
+    return MapScore(weighting, moving_avg)
+
+
+def _density_curve(notes: NoteArray, config: AnalysisConfig) -> List[float]:
+    density = note_density(
+        notes, config.sample_window_secs, config.sample_rate, config.moving_avg_window
+    )
+    return density.moving_averages.tolist()
+
+
+def _weigh(
+    notes: NoteArray,
+    moving_avg: List[float],
+    config: AnalysisConfig,
+    segment_engine: str,
+    pattern_engine: str,
+    executor: Optional[Executor],
+    batch_scoring: bool,
+) -> Weighting:
     difficulty = weighted_average_of_values(moving_avg)
 
-    weighting = get_pattern_weighting(notes)
+    # Patterns have always been weighted at the default sample rate
+    weighting = get_pattern_weighting(
+        notes,
+        segment_engine=segment_engine,
+        config=config.with_sample_rate(DEFAULT_SAMPLE_RATE),
+        pattern_engine=pattern_engine,
+        executor=executor,
+        batch_scoring=batch_scoring,
+    )
     weighted_difficulty = weighting * difficulty
     logger.info(
         f"Final Weighting: {weighting:<10.5f}| Base Difficulty: {difficulty:<10.5f}| Weighted Difficulty: {weighted_difficulty:<10.5f}"
@@ -0,0 +1,91 @@
+import os
+from typing import Dict, List
+
+import config.logging_config as logging_config
+from musemapalyzr.utils import Weighting
+
+logger = logging_config.logger
+
+
+def export_name(filename: str) -> str:
+    """Gets the name a map is exported under: its filename without the directory or ".asset"."""
+    return filename.split("\\")[-1].split(".asset")[0]
+
+
+def export_row(name: str, weighting: Weighting) -> str:
+    """Formats a map's line of the difficulty export.
+
+    Args:
+        name (str): The map's `export_name`.
+        weighting (Weighting): The map's scores.
+
+    Returns:
+        str: "name||weighted difficulty||weighting||difficulty", with a newline.
+    """
+    return (
+        f"{name}||{weighting.weighted_difficulty:.2f}||{weighting.weighting:.2f}"
+        f"||{weighting.difficulty:.2f}\n"
+    )
+
+
+class DifficultyExport:
+    """A difficulty export that is kept up to date one map at a time.
+
+    The rows already in the file are read back, so a restart carries on from it. `flush` writes
+    the rows to a temporary file and renames it over the export, so a reader never sees a
+    half-written export. Rows are sorted by name.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rows: Dict[str, str] = {}
+        self._dirty = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._rows[line.split("||", 1)[0]] = line
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def names(self) -> List[str]:
+        return sorted(self._rows)
+
+    def update(self, name: str, weighting: Weighting):
+        row = export_row(name, weighting)
+        if self._rows.get(name) != row:
+            self._rows[name] = row
+            self._dirty = True
+
+    def remove(self, name: str):
+        if self._rows.pop(name, None) is not None:
+            self._dirty = True
+
+    def flush(self) -> bool:
+        """Writes the export if a row changed since it was last written.
+
+        If it cannot be written, the error is logged and the rows stay unwritten, so the next
+        flush tries again.
+
+        Returns:
+            bool: Whether it was written.
+        """
+        if not self._dirty:
+            return False
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for name in sorted(self._rows):
+                    f.write(self._rows[name])
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not write the difficulty export '{self.path}': {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+        self._dirty = False
+        return True
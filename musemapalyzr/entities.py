@@ -1,8 +1,14 @@
-import json
-from typing import List, Union
+import os
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 import config.logging_config as logging_config
-from musemapalyzr.constants import DEFAULT_SAMPLE_RATE
+from musemapalyzr import note_cache
+from musemapalyzr.asset_parser import TempoSections, extract_koreography
+from musemapalyzr.constants import DEFAULT_SAMPLE_RATE, SEGMENT_NAMES
+from musemapalyzr.corpus_pack import CorpusPack
+from musemapalyzr.tempo import TempoIndex
 
 logger = logging_config.logger
 
@@ -18,16 +24,91 @@ class Note:
         return f"{self.lane},{self.sample_time}"
 
 
+class NoteArray:
+    """The notes of a map, sorted by sample time, held as two contiguous arrays.
+
+    Indexing with an int gives a `Note`, slicing gives a NoteArray view over the same memory.
+    """
+
+    __slots__ = ("lanes", "sample_times")
+
+    def __init__(self, lanes, sample_times):
+        self.lanes: np.ndarray = np.asarray(lanes, dtype=np.uint8)
+        self.sample_times: np.ndarray = np.asarray(sample_times, dtype=np.int64)
+        if self.lanes.shape != self.sample_times.shape:
+            raise ValueError(
+                f"Got {len(self.lanes)} lanes for {len(self.sample_times)} sample times."
+            )
+
+    @classmethod
+    def from_notes(cls, notes: List[Note]) -> "NoteArray":
+        """Creates a NoteArray from a list of Notes, sorting them by sample time."""
+        notes = sorted(notes, key=lambda note: note.sample_time)
+        return cls([note.lane for note in notes], [note.sample_time for note in notes])
+
+    @classmethod
+    def from_tracks(cls, tracks: Iterable[Tuple[int, Sequence[int]]]) -> "NoteArray":
+        """Merges the event lists of each lane into one NoteArray sorted by sample time.
+
+        The tracks are concatenated and stably argsorted. Each track is already a sorted run,
+        so timsort only merges the runs: a k-way merge in O(n log k). Notes on the same sample
+        keep the order of their tracks.
+
+        Args:
+            tracks (Iterable[Tuple[int, Sequence[int]]]): (lane, start samples) for each track.
+
+        Returns:
+            NoteArray: The merged notes.
+        """
+        lanes = []
+        sample_times = []
+        for lane, start_samples in tracks:
+            track_sample_times = np.asarray(start_samples, dtype=np.int64)
+            lanes.append(np.full(len(track_sample_times), lane, dtype=np.uint8))
+            sample_times.append(track_sample_times)
+        if not sample_times:
+            return cls([], [])
+
+        lanes = np.concatenate(lanes)
+        sample_times = np.concatenate(sample_times)
+        order = np.argsort(sample_times, kind="stable")
+        return cls(lanes[order], sample_times[order])
+
+    def to_notes(self) -> List[Note]:
+        return [
+            Note(lane, sample_time)
+            for lane, sample_time in zip(self.lanes.tolist(), self.sample_times.tolist())
+        ]
+
+    def __len__(self) -> int:
+        return len(self.sample_times)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return NoteArray(self.lanes[index], self.sample_times[index])
+        return Note(int(self.lanes[index]), int(self.sample_times[index]))
+
+    def __iter__(self) -> Iterator[Note]:
+        # One Note at a time, so iterating never holds a Note per note
+        for lane, sample_time in zip(self.lanes.tolist(), self.sample_times.tolist()):
+            yield Note(lane, sample_time)
+
+    def __repr__(self) -> str:
+        return f"NoteArray({len(self)} notes)"
+
+
 class Segment:
+    """A run of notes of one kind. `notes` is a NoteArray view when it was analysed from one."""
+
     def __init__(
         self,
-        segment_name,
-        notes: List[Note],
+        kind: int,
+        notes: Union[List[Note], NoteArray],
         required_notes: int = 0,
         time_difference=None,
         sample_rate: int = DEFAULT_SAMPLE_RATE,
     ):
-        self.segment_name = segment_name
+        self.kind = kind
         self.notes = notes
         self.required_notes = required_notes
         self.time_difference = time_difference
@@ -35,7 +116,6 @@ class Segment:
 
         if self.time_difference is None and len(self.notes) > 1:
             self.time_difference = abs(self.notes[1].sample_time - self.notes[0].sample_time)
-            logger.debug(f"Auto setting time difference to: {self.time_difference}")
 
     @property
     def notes_per_second(self):
@@ -43,6 +123,11 @@ class Segment:
             return 0
         return self.sample_rate / self.time_difference
 
+    @property
+    def segment_name(self) -> str:
+        """The display name of the Segment's kind. Use `kind` for any logic."""
+        return SEGMENT_NAMES.get(self.kind, str(self.kind))
+
     def __repr__(self) -> str:
         return f"{self.segment_name} {len(self.notes)} {self.time_difference}"
 
@@ -50,38 +135,231 @@ class Segment:
 class MuseSwiprMap:
     def __init__(self):
         self.title = None
-        self.temp_sections = None
+        self.tempo_sections = None
         self.tracks = None
         self.notes = None
         self.sample_rate = None
+        # The `note_cache.asset_hash` of the .asset file the map was loaded from
+        self.content_hash: Optional[str] = None
+
+        self._tempo_index = None
+        self._density_pyramid = None
+        # Set on lazily loaded maps: where the notes still have to be loaded from
+        self._asset_path: Optional[str] = None
+        self._header: Optional[note_cache.MapHeader] = None
+
+    @property
+    def notes(self) -> NoteArray:
+        """The notes of the map. A lazily loaded map loads them on first access."""
+        if self._notes is None and self._header is not None:
+            self._load_notes()
+        return self._notes
+
+    @notes.setter
+    def notes(self, notes: NoteArray):
+        self._notes = notes
+
+    @property
+    def tempo_sections(self) -> TempoSections:
+        """The tempo sections of the map. A lazily loaded map loads them with its notes."""
+        if self._tempo_sections is None and self._header is not None:
+            self._load_notes()
+        return self._tempo_sections
+
+    @tempo_sections.setter
+    def tempo_sections(self, tempo_sections: TempoSections):
+        self._tempo_sections = tempo_sections
+
+    @property
+    def notes_loaded(self) -> bool:
+        return self._notes is not None
+
+    @property
+    def note_count(self) -> int:
+        if not self.notes_loaded and self._header is not None:
+            return self._header.note_count
+        return len(self.notes)
+
+    @property
+    def first_sample(self) -> int:
+        """The sample time of the first note, 0 if the map has no notes."""
+        if not self.notes_loaded and self._header is not None:
+            return self._header.first_sample
+        return int(self.notes.sample_times[0]) if len(self.notes) else 0
+
+    @property
+    def last_sample(self) -> int:
+        """The sample time of the last note, 0 if the map has no notes."""
+        if not self.notes_loaded and self._header is not None:
+            return self._header.last_sample
+        return int(self.notes.sample_times[-1]) if len(self.notes) else 0
+
+    @property
+    def duration(self) -> float:
+        """The seconds from the first note to the last."""
+        return (self.last_sample - self.first_sample) / self.sample_rate
+
+    @property
+    def tempo_index(self) -> TempoIndex:
+        """The beat grid of the map, built from its tempo sections on first use."""
+        if self._tempo_index is None:
+            self._tempo_index = TempoIndex(*self.tempo_sections)
+        return self._tempo_index
+
+    @property
+    def density_pyramid(self):
+        """The DensityPyramid of the map's notes, built on first use."""
+        if self._density_pyramid is None:
+            # density builds on NoteArray, so it can only be imported once this module is
+            from musemapalyzr.density import DensityPyramid
+
+            self._density_pyramid = DensityPyramid(self.notes, self.sample_rate)
+        return self._density_pyramid
+
+    @classmethod
+    def from_koreograph_asset(
+        cls, koreograph_asset_filename: str, use_cache: bool = True, lazy: bool = False
+    ):
+        """Loads a map from a Koreography .asset file.
+
+        The parsed notes are cached under `note_cache.NOTE_CACHE_DIR`, keyed by the hash of the
+        asset's contents. An unchanged asset is loaded straight from the cache.
+
+        A lazy load only reads the map's cached header: its title, sample rate, note count and
+        first and last sample. The asset itself is not opened, and the notes are only loaded
+        when `notes` is first accessed. Listing and filtering a corpus this way reads a few
+        bytes per map. If there is no cached header yet, the map is loaded in full.
+
+        Args:
+            koreograph_asset_filename (str): The path to the .asset file.
+            use_cache (bool, optional): Whether to read and write the note cache. Defaults to True.
+            lazy (bool, optional): Whether to defer loading the notes. Needs `use_cache`.
+                Defaults to False.
+
+        Returns:
+            MuseSwiprMap: The loaded map.
+        """
+        header_cache_path = None
+        if use_cache:
+            header_cache_path = note_cache.header_path(koreograph_asset_filename)
+            if lazy:
+                header = note_cache.load_header(header_cache_path)
+                if header is not None:
+                    return cls._from_header(koreograph_asset_filename, header)
+
+        with open(koreograph_asset_filename, "rb") as f:
+            raw = f.read()
+
+        content_hash = note_cache.asset_hash(raw)
+        muse_map = cls._from_asset_contents(content_hash, lambda: raw, use_cache)
+        if not use_cache:
+            return muse_map
+
+        if not os.path.exists(header_cache_path):
+            note_cache.store_header(
+                header_cache_path,
+                note_cache.MapHeader(
+                    title=muse_map.title,
+                    sample_rate=muse_map.sample_rate,
+                    note_count=muse_map.note_count,
+                    first_sample=muse_map.first_sample,
+                    last_sample=muse_map.last_sample,
+                    content_hash=content_hash,
+                ),
+            )
+        return muse_map
 
     @classmethod
-    def from_koreograph_asset(cls, koreograph_asset_filename: str):
+    def from_corpus_pack(cls, pack: CorpusPack, name: str, use_cache: bool = True):
+        """Loads a map out of a corpus pack.
+
+        The pack's index holds each asset's hash, so a map in the note cache is loaded without
+        decompressing its asset at all.
+
+        Args:
+            pack (CorpusPack): The opened corpus pack.
+            name (str): The name of the asset in the pack.
+            use_cache (bool, optional): Whether to read and write the note cache. Defaults to True.
+
+        Returns:
+            MuseSwiprMap: The loaded map.
+        """
+        content_hash = pack.entries[name].content_hash
+        return cls._from_asset_contents(content_hash, lambda: pack.read(name), use_cache)
+
+    @classmethod
+    def _from_asset_contents(
+        cls, content_hash: str, read_raw: Callable[[], bytes], use_cache: bool
+    ) -> "MuseSwiprMap":
+        # read_raw is only called when the notes are not cached
+        cache_path = note_cache.notes_path(content_hash) if use_cache else None
+        cached = note_cache.load_notes(cache_path) if use_cache else None
+        if cached is not None:
+            muse_map = cls._from_cached_notes(cached)
+        else:
+            muse_map = cls._from_raw_asset(read_raw())
+            if use_cache:
+                note_cache.store_notes(
+                    cache_path,
+                    muse_map.title,
+                    muse_map.sample_rate,
+                    muse_map.notes.lanes,
+                    muse_map.notes.sample_times,
+                    muse_map.tempo_sections,
+                )
+        muse_map.content_hash = content_hash
+        return muse_map
+
+    @classmethod
+    def _from_raw_asset(cls, raw: bytes):
         muse_map = cls()
-        data = None
-        with open(f"{koreograph_asset_filename}", "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = extract_koreography(raw)
 
-        muse_map.title = list(data.keys())[0]
-        muse_map.tempo_sections = data[muse_map.title]["value"]["mTempoSections"]
-        muse_map.tracks = data[muse_map.title]["value"]["mTracks"]
-        muse_map.notes = []
+        muse_map.title = data.title
+        muse_map.tempo_sections = data.tempo_sections
+        muse_map.tracks = data.tracks
 
-        muse_map.sample_rate = int(data[muse_map.title]["value"]["mSampleRate"])
+        muse_map.sample_rate = data.sample_rate
 
         muse_map._parse_notes()
         return muse_map
 
+    @classmethod
+    def _from_cached_notes(cls, cached: note_cache.CachedNotes):
+        muse_map = cls()
+        muse_map.title = cached.title
+        muse_map.sample_rate = cached.sample_rate
+        muse_map.tempo_sections = cached.tempo_sections
+        muse_map.notes = NoteArray(cached.lanes, cached.sample_times)
+        return muse_map
+
+    @classmethod
+    def _from_header(cls, koreograph_asset_filename: str, header: note_cache.MapHeader):
+        muse_map = cls()
+        muse_map.title = header.title
+        muse_map.sample_rate = header.sample_rate
+        muse_map.content_hash = header.content_hash
+        muse_map._asset_path = koreograph_asset_filename
+        muse_map._header = header
+        return muse_map
+
+    def _load_notes(self):
+        cached = note_cache.load_notes(note_cache.notes_path(self._header.content_hash))
+        if cached is None:
+            # The note cache was cleared since the header was written
+            logger.debug(f"Loading the notes of '{self.title}' from its asset")
+            loaded = MuseSwiprMap.from_koreograph_asset(self._asset_path)
+        else:
+            loaded = MuseSwiprMap._from_cached_notes(cached)
+        self._tempo_sections = loaded.tempo_sections
+        self._notes = loaded.notes
+
     def _parse_notes(self):
-        for t in self.tracks:
-            note_times_data = t["mEventList"]
-            for d in note_times_data:
-                assert d["mStartSample"] == d["mEndSample"]
-                if t["mEventID"] != "TimingPoint":
-                    note = Note(int(t["mEventID"]), d["mStartSample"])
-                    self.notes.append(note)
-
-        self.notes = sorted(self.notes, key=lambda note: note.sample_time)
+        self.notes = NoteArray.from_tracks(
+            (int(event_id), start_samples)
+            for event_id, start_samples in self.tracks
+            if event_id != "TimingPoint"
+        )
 
     def output_notes(self, file_path: str):
         """Writes a text file that visualises the map.
@@ -0,0 +1,382 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+import config.logging_config as logging_config
+from musemapalyzr.analysis_config import AnalysisConfig, get_analysis_config
+from musemapalyzr.constants import (
+    DEFAULT_SAMPLE_RATE,
+    N_STACK_MASK,
+    SINGLE_STREAMS,
+    SWITCH,
+    ZIG_ZAG,
+)
+from musemapalyzr.density import moving_averages, note_density
+from musemapalyzr.difficulty_calculation import multiply_pattern_scores
+from musemapalyzr.entities import Note, NoteArray, Segment
+from musemapalyzr.map_pattern_analysis import Mapalyzr
+from musemapalyzr.pattern_automaton import PatternAutomaton, segment_code
+from musemapalyzr.pattern_views import (
+    PatternScorer,
+    PatternView,
+    merge_pattern_views,
+    view_indices,
+)
+from musemapalyzr.utils import PatternScore, Weighting, analyse_segments, weighted_average_of_values
+
+logger = logging_config.logger
+
+
+def _run_kind(segment: Segment) -> int:
+    # The kind of the pairs of notes in a segment, before handle_current_segment renamed it
+    if segment.kind == SWITCH:
+        return ZIG_ZAG
+    if segment.kind & N_STACK_MASK:
+        return SINGLE_STREAMS
+    return segment.kind
+
+
+def _shift_view(view: PatternView, offset: int) -> PatternView:
+    return PatternView(
+        view.pattern_name, tuple((start + offset, end + offset) for start, end in view.spans)
+    )
+
+
+class IncrementalAnalyzer:
+    """Keeps the analysis of a map up to date as notes are inserted, deleted and moved.
+
+    `calculate_difficulty` re-analyses the whole map. After an edit, only part of it can change:
+
+        - Segments: a segment always starts where the kind of the notes changes (e.g. at a long
+          interval). So the segments are recomputed from the last change of kind before the
+          edited notes to the first one after them, and the rest are kept.
+        - Patterns: the pattern groups are all reset together, and a reset only depends on the
+          segment it happens at and the one before it. So patterns are identified again from the
+          last reset before the recomputed segments, until the run is reset where the previous
+          run was, after them. The patterns from there on are kept.
+        - Scores: patterns made of the same segments as before keep their PatternScore.
+        - Density: the edited notes are added to and taken from their sections' counts.
+
+    The Weighting is always the one `calculate_difficulty` gives for the same notes.
+    """
+
+    def __init__(
+        self,
+        notes: Union[List[Note], NoteArray],
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        config: Optional[AnalysisConfig] = None,
+    ):
+        """
+        Args:
+            notes (Union[List[Note], NoteArray]): The notes of the map.
+            sample_rate (int, optional): The sample rate of the map. Defaults to
+                DEFAULT_SAMPLE_RATE.
+            config (AnalysisConfig, optional): The compiled config. Defaults to the config
+                compiled for sample_rate.
+        """
+        if config is None:
+            config = get_analysis_config(sample_rate)
+        if not isinstance(notes, NoteArray):
+            notes = NoteArray.from_notes(notes)
+        self.config = config
+        # Patterns have always been weighted at the default sample rate
+        self.pattern_config = config.with_sample_rate(DEFAULT_SAMPLE_RATE)
+        self._mapalyzr = Mapalyzr(self.pattern_config)
+        self._scorer = PatternScorer(self._mapalyzr.pattern_classes, self.pattern_config)
+
+        self.notes = notes
+        self.segments: List[Segment] = analyse_segments(
+            notes, self.pattern_config.sample_rate, config=self.pattern_config
+        )
+        # The index of the first note of each segment. Segments share their boundary notes.
+        self._segment_starts = self._starts_of(self.segments, 0)
+        self._codes = [segment_code(segment) for segment in self.segments]
+
+        automaton = PatternAutomaton(
+            self._mapalyzr.groups, self.segments, self.pattern_config, self._codes
+        )
+        automaton.run()
+        self._views = automaton.views
+        self._identified_at = automaton.identified_at
+        self._resets = automaton.resets
+        self._last_views = automaton.last_views()
+        # The PatternScore (and segments) of each pattern, by its name and segments
+        self._scores: Dict[Tuple, Tuple[PatternScore, List[Segment]]] = {}
+        self.pattern_views, self._scores, self.pattern_weighting = self._weigh_patterns(
+            self.segments, self._views + self._last_views
+        )
+
+        self.section_counts: np.ndarray = note_density(
+            notes, config.sample_window_secs, config.sample_rate, config.moving_avg_window
+        ).section_counts
+        self.weighting = self._weigh()
+
+    def insert_note(self, lane: int, sample_time: int) -> Weighting:
+        """Adds a note to the map.
+
+        Returns:
+            Weighting: The new Weighting of the map.
+        """
+        return self.edit([], [Note(lane, sample_time)])
+
+    def delete_note(self, lane: int, sample_time: int) -> Weighting:
+        """Removes a note from the map.
+
+        Returns:
+            Weighting: The new Weighting of the map.
+        """
+        return self.edit([Note(lane, sample_time)], [])
+
+    def move_note(
+        self, lane: int, sample_time: int, new_lane: int, new_sample_time: int
+    ) -> Weighting:
+        """Moves a note of the map to another lane and/or sample time.
+
+        Returns:
+            Weighting: The new Weighting of the map.
+        """
+        return self.edit([Note(lane, sample_time)], [Note(new_lane, new_sample_time)])
+
+    def edit(self, removed: Iterable[Note], added: Iterable[Note]) -> Weighting:
+        """Removes and adds notes in one edit, then updates the analysis.
+
+        Args:
+            removed (Iterable[Note]): Notes of the map to remove.
+            added (Iterable[Note]): Notes to add once the removed notes are gone.
+
+        Raises:
+            ValueError: If a removed note is not in the map, or an added note is on the same
+                sample time as another note.
+
+        Returns:
+            Weighting: The new Weighting of the map.
+        """
+        removed = list(removed)
+        added = sorted(added, key=lambda note: note.sample_time)
+        if not removed and not added:
+            return self.weighting
+        notes = self.notes
+        old_length = len(notes)
+
+        removed_times = np.array([note.sample_time for note in removed], dtype=np.int64)
+        removed_indices = np.searchsorted(notes.sample_times, removed_times)
+        for note, index in zip(removed, removed_indices.tolist()):
+            if (
+                index == old_length
+                or notes.sample_times[index] != note.sample_time
+                or notes.lanes[index] != note.lane
+            ):
+                raise ValueError(f"The map has no note {note}.")
+        if len(np.unique(removed_indices)) < len(removed):
+            raise ValueError("The same note cannot be removed twice.")
+        lanes = np.delete(notes.lanes, removed_indices)
+        sample_times = np.delete(notes.sample_times, removed_indices)
+
+        added_times = np.array([note.sample_time for note in added], dtype=np.int64)
+        positions = np.searchsorted(sample_times, added_times)
+        kept_times = np.append(sample_times, np.iinfo(np.int64).max)
+        if (kept_times[positions] == added_times).any() or (np.diff(added_times) == 0).any():
+            raise ValueError("Two notes cannot be on the same sample time.")
+        new_notes = NoteArray(
+            np.insert(lanes, positions, [note.lane for note in added]),
+            np.insert(sample_times, positions, added_times),
+        )
+        # Where the added notes ended up, once the ones before them were inserted too
+        added_indices = positions + np.arange(len(added))
+
+        edited_old = removed_indices.tolist()
+        edited_new = added_indices.tolist()
+        # The notes before `first` and the last `unchanged_after` notes are the same as before
+        first = min(edited_old + edited_new)
+        unchanged_after = min(
+            [old_length - 1 - index for index in edited_old]
+            + [len(new_notes) - 1 - index for index in edited_new]
+        )
+
+        segments, segment_starts, codes, kept_before, kept_from = self._resegment(
+            new_notes, first, unchanged_after
+        )
+        views, identified_at, resets, last_views = self._identify(
+            segments, codes, kept_before, kept_from
+        )
+        pattern_views, scores, pattern_weighting = self._weigh_patterns(
+            segments, views + last_views
+        )
+        section_counts = self._count_sections(new_notes, first, removed_times, added_times)
+        # Nothing is kept until the whole edit is analysed, so a failed edit changes nothing
+        self.notes = new_notes
+        self.segments = segments
+        self._segment_starts = segment_starts
+        self._codes = codes
+        self._views = views
+        self._identified_at = identified_at
+        self._resets = resets
+        self._last_views = last_views
+        self.pattern_views = pattern_views
+        self._scores = scores
+        self.pattern_weighting = pattern_weighting
+        self.section_counts = section_counts
+        self.weighting = self._weigh()
+        return self.weighting
+
+    def _starts_of(self, segments: List[Segment], start: int) -> List[int]:
+        starts = []
+        for segment in segments:
+            starts.append(start)
+            start += len(segment.notes) - 1
+        return starts
+
+    def _resegment(self, new_notes: NoteArray, first: int, unchanged_after: int):
+        segments = self.segments
+        starts = self._segment_starts
+        length_change = len(new_notes) - len(self.notes)
+
+        # The last segment before the edit that starts on a change of kind. Its first two notes
+        # and the note before it are untouched, so the new segments still start there.
+        kept_before = max(bisect_right(starts, first - 2) - 1, 0)
+        while kept_before > 0 and _run_kind(segments[kept_before - 1]) == _run_kind(
+            segments[kept_before]
+        ):
+            kept_before -= 1
+        # ...and the first such segment after it
+        kept_from = bisect_left(starts, len(self.notes) - unchanged_after + 1)
+        while kept_from < len(segments) and _run_kind(segments[kept_from - 1]) == _run_kind(
+            segments[kept_from]
+        ):
+            kept_from += 1
+
+        start = starts[kept_before] if kept_before < len(segments) else 0
+        if kept_from < len(segments):
+            end = starts[kept_from] + length_change + 1
+        else:
+            end = len(new_notes)
+        new_segments = analyse_segments(
+            new_notes[start:end], self.pattern_config.sample_rate, config=self.pattern_config
+        )
+        logger.debug(
+            f"Recomputed segments {kept_before}-{kept_from} as {len(new_segments)} segments"
+        )
+
+        segments = segments[:kept_before] + new_segments + segments[kept_from:]
+        segment_starts = (
+            starts[:kept_before]
+            + self._starts_of(new_segments, start)
+            + [kept_start + length_change for kept_start in starts[kept_from:]]
+        )
+        codes = (
+            self._codes[:kept_before]
+            + [segment_code(segment) for segment in new_segments]
+            + self._codes[kept_from:]
+        )
+        return segments, segment_starts, codes, kept_before, kept_from
+
+    def _identify(self, segments, codes, kept_before, kept_from):
+        # How far the kept segments after the new ones moved
+        offset = len(segments) - len(self.segments)
+        kept_after = kept_from + offset
+
+        automaton = PatternAutomaton(self._mapalyzr.groups, segments, self.pattern_config, codes)
+        # Resume after the last reset at an unchanged segment
+        resets_before = bisect_left(self._resets, kept_before)
+        if resets_before > 0:
+            reset = self._resets[resets_before - 1]
+            views_before = bisect_right(self._identified_at, reset)
+            automaton.views = self._views[:views_before]
+            automaton.identified_at = self._identified_at[:views_before]
+            automaton.resets = self._resets[:resets_before]
+            automaton.resume_after(reset)
+
+        def is_previous_reset(index: int) -> bool:
+            if index - 1 < kept_after:
+                return False
+            old_index = index - offset
+            position = bisect_left(self._resets, old_index)
+            return position < len(self._resets) and self._resets[position] == old_index
+
+        stopped_at = automaton.run(is_previous_reset)
+        views = automaton.views
+        identified_at = automaton.identified_at
+        resets = automaton.resets
+        if stopped_at is None:
+            last_views = automaton.last_views()
+        else:
+            # The rest of the run is the previous one, moved by the change in segments
+            old_index = stopped_at - offset
+            views_after = bisect_right(self._identified_at, old_index)
+            resets_after = bisect_right(self._resets, old_index)
+            if offset:
+                views += [_shift_view(view, offset) for view in self._views[views_after:]]
+                identified_at += [index + offset for index in self._identified_at[views_after:]]
+                resets += [index + offset for index in self._resets[resets_after:]]
+                last_views = [_shift_view(view, offset) for view in self._last_views]
+            else:
+                views += self._views[views_after:]
+                identified_at += self._identified_at[views_after:]
+                resets += self._resets[resets_after:]
+                last_views = self._last_views
+        return views, identified_at, resets, last_views
+
+    def _weigh_patterns(self, segments: List[Segment], views: List[PatternView]):
+        pattern_views = merge_pattern_views(views, segments)
+
+        # Patterns of the same segments as before keep their scores
+        scores = {}
+        pattern_scores = []
+        for view in pattern_views:
+            if not view.spans:
+                continue
+            view_segments = [segments[index] for index in view_indices(view)]
+            key = (view.pattern_name, tuple(map(id, view_segments)))
+            cached = self._scores.get(key)
+            if cached is None:
+                # The segments are kept with the score so their ids are not reused
+                cached = (self._scorer.score(view, segments), view_segments)
+            scores[key] = cached
+            pattern_scores.append(cached[0])
+
+        weighting = weighted_average_of_values(
+            multiply_pattern_scores(pattern_scores, self.pattern_config),
+            top_percentage=self.pattern_config.pattern_weighting_top_percentage,
+            top_weight=self.pattern_config.pattern_weighting_top_weight,
+            bottom_weight=self.pattern_config.pattern_weighting_bottom_weight,
+        )
+        return pattern_views, scores, weighting
+
+    def _count_sections(
+        self,
+        new_notes: NoteArray,
+        first: int,
+        removed_times: np.ndarray,
+        added_times: np.ndarray,
+    ) -> np.ndarray:
+        config = self.config
+        if first == 0 or len(new_notes) == 0:
+            # The sections start at the first note, so they all move
+            return note_density(
+                new_notes, config.sample_window_secs, config.sample_rate, config.moving_avg_window
+            ).section_counts
+
+        section_threshold = config.sample_window_secs * config.sample_rate
+        first_time = new_notes.sample_times[0]
+        num_sections = int((new_notes.sample_times[-1] - first_time) // section_threshold) + 1
+
+        section_counts = np.zeros(max(num_sections, len(self.section_counts)), dtype=np.int64)
+        section_counts[: len(self.section_counts)] = self.section_counts
+        np.subtract.at(
+            section_counts,
+            ((removed_times - first_time) // section_threshold).astype(np.int64),
+            1,
+        )
+        np.add.at(
+            section_counts, ((added_times - first_time) // section_threshold).astype(np.int64), 1
+        )
+        return section_counts[:num_sections]
+
+    def _weigh(self) -> Weighting:
+        self.moving_averages = moving_averages(self.section_counts, self.config.moving_avg_window)
+        difficulty = weighted_average_of_values(self.moving_averages.tolist())
+        weighting = self.pattern_weighting
+        return Weighting(
+            weighting=weighting, difficulty=difficulty, weighted_difficulty=weighting * difficulty
+        )
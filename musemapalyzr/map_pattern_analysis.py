@@ -1,18 +1,21 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Type
 
-from config.logging_config import logger
+from musemapalyzr import tracing
+from musemapalyzr.analysis_config import AnalysisConfig, get_analysis_config
 from musemapalyzr.constants import (
     EVEN_CIRCLES,
-    FOUR_STACK,
+    INTERVAL_MASK,
+    N_STACK_MASK,
     NOTHING_BUT_THEORY,
     OTHER,
     SKEWED_CIRCLES,
     SLOW_STRETCH,
-    THREE_STACK,
-    TWO_STACK,
     VARYING_STACKS,
 )
 from musemapalyzr.entities import Segment
+from musemapalyzr.pattern_automaton import run_pattern_automaton
+from musemapalyzr.pattern_views import PatternView, merge_pattern_views, view_segments
+from musemapalyzr.tracing import PatternsMerged
 from patterns.even_circles import EvenCirclesGroup
 from patterns.nothing_but_theory import NothingButTheoryGroup
 from patterns.other import OtherPattern
@@ -21,9 +24,19 @@ from patterns.skewed_circles import SkewedCirclesGroup
 from patterns.slow_stretch import SlowStretchPattern
 from patterns.varying_stacks import VaryingStacksPattern
 
+# Engines identify_patterns can identify Patterns with
+STRATEGY_ENGINE = "strategies"
+AUTOMATON_ENGINE = "automaton"
+
 
 class Mapalyzr:
-    def __init__(self):
+    def __init__(self, config: Optional[AnalysisConfig] = None, engine: str = AUTOMATON_ENGINE):
+        # Passed on to every Pattern
+        self.config: AnalysisConfig = config if config is not None else get_analysis_config()
+        if engine not in (STRATEGY_ENGINE, AUTOMATON_ENGINE):
+            raise ValueError(f"Unknown pattern engine '{engine}'.")
+        self.engine = engine
+
         # **THE** list of Patterns
         self.patterns: List[Pattern] = []
 
@@ -33,27 +46,27 @@ class Mapalyzr:
 
         self.groups = []
 
-        self.other_pattern: OtherPattern = OtherPattern(OTHER, [])
+        self.other_pattern: OtherPattern = OtherPattern(OTHER, [], config=self.config)
         self.reset_groups()
 
         self.added = False
         self.reset = False
 
     def is_n_stack(self, segment: Segment):
-        return segment.segment_name in (TWO_STACK, THREE_STACK, FOUR_STACK)
+        return segment.kind & N_STACK_MASK != 0
 
     def segment_is_interval(self, pattern: Segment):
-        return "Interval" in pattern.segment_name
+        return pattern.kind & INTERVAL_MASK != 0
 
     def reset_groups(self):
         self.groups = [
-            EvenCirclesGroup(EVEN_CIRCLES, []),
-            SkewedCirclesGroup(SKEWED_CIRCLES, []),
-            VaryingStacksPattern(VARYING_STACKS, []),
-            NothingButTheoryGroup(NOTHING_BUT_THEORY, []),
-            SlowStretchPattern(SLOW_STRETCH, []),
+            EvenCirclesGroup(EVEN_CIRCLES, [], config=self.config),
+            SkewedCirclesGroup(SKEWED_CIRCLES, [], config=self.config),
+            VaryingStacksPattern(VARYING_STACKS, [], config=self.config),
+            NothingButTheoryGroup(NOTHING_BUT_THEORY, [], config=self.config),
+            SlowStretchPattern(SLOW_STRETCH, [], config=self.config),
         ]
-        self.other_pattern = OtherPattern(OTHER, [])
+        self.other_pattern = OtherPattern(OTHER, [], config=self.config)
 
     def _return_final_patterns(self, merge_mergable=True) -> List[Pattern]:
         """
@@ -62,10 +75,6 @@ class Mapalyzr:
         Merges Slow Stretch patterns
         Note that these have different merging strategies
         """
-        logger.debug(f"_return_final_patterns : {merge_mergable}")
-        logger.debug(
-            f"Patterns ({len(self.patterns)}): {[f'{p.pattern_name} ({len(p.segments)})' for p in self.patterns]}"
-        )
         if not merge_mergable:
             return self.patterns
 
@@ -84,9 +93,8 @@ class Mapalyzr:
         if current_mergable is not None and len(current_mergable.segments) > 0:
             new_groups.append(current_mergable)
 
-        logger.debug(
-            f"Merged patterns ({len(new_groups)}): {[f'{p.pattern_name} ({len(p.segments)})' for p in new_groups]}"
-        )
+        if __debug__ and tracing.sink is not None:
+            tracing.sink.emit(PatternsMerged(len(self.patterns), len(new_groups)))
         return new_groups
 
     def _handle_non_mergable_group(
@@ -115,9 +123,9 @@ class Mapalyzr:
 
     def _get_empty_mergable_pattern(self, pattern: Pattern):
         if pattern.pattern_name == OTHER:
-            return OtherPattern(OTHER, [])
+            return OtherPattern(OTHER, [], config=self.config)
         elif pattern.pattern_name == SLOW_STRETCH:
-            return SlowStretchPattern(SLOW_STRETCH, [])
+            return SlowStretchPattern(SLOW_STRETCH, [], config=self.config)
         else:
             raise ValueError(f"Unsupported mergable pattern of: {pattern.pattern_name}")
 
@@ -193,6 +201,7 @@ class Mapalyzr:
                     last_check_pattern.segments,
                     last_check_pattern.start_sample,
                     last_check_pattern.end_sample,
+                    config=self.config,
                 )
                 self.patterns.append(last_pattern_copy)
                 return self._return_final_patterns(merge_mergable)
@@ -207,6 +216,7 @@ class Mapalyzr:
                     self.other_pattern.segments,
                     self.other_pattern.start_sample,
                     self.other_pattern.end_sample,
+                    config=self.config,
                 )
                 self.patterns.append(last_pattern_copy)
 
@@ -219,6 +229,7 @@ class Mapalyzr:
             other_group = OtherPattern(
                 OTHER,
                 self.other_pattern.segments[: -len(group.segments)],
+                config=self.config,
             )
             self.patterns.append(other_group)
 
@@ -227,6 +238,7 @@ class Mapalyzr:
             group.segments,
             group.start_sample,
             group.end_sample,
+            config=self.config,
         )
         self.patterns.append(group_copy)
         # Reset all groups with current pattern.
@@ -263,6 +275,9 @@ class Mapalyzr:
     ) -> List[Pattern]:
         """Identifies Patterns from a list of Segments.
 
+        The AUTOMATON_ENGINE finds the same Patterns as the STRATEGY_ENGINE in a single pass over
+        the segments, with the group strategies compiled into transition tables.
+
         Args:
             segments_list (List[Segment]): The list of segments to identify Patterns from.
             merge_mergable (bool, optional): If True, merges mergable consecutive patterns together. Defaults to True.
@@ -270,6 +285,9 @@ class Mapalyzr:
         Returns:
             List[Pattern]: The list of identified Patterns.
         """
+        if self.engine == AUTOMATON_ENGINE:
+            return self._identify_patterns_automaton(segments_list, merge_mergable)
+
         for i in range(0, len(segments_list)):
             current_segment = segments_list[i]
 
@@ -291,6 +309,7 @@ class Mapalyzr:
                             self.other_pattern.segments,
                             self.other_pattern.start_sample,
                             self.other_pattern.end_sample,
+                            config=self.config,
                         )
                     )
                 self.other_pattern.reset_group(
@@ -303,3 +322,42 @@ class Mapalyzr:
         self._handle_last_paterns(merge_mergable=merge_mergable)
 
         return self._return_final_patterns(merge_mergable)
+
+    @property
+    def pattern_classes(self) -> Dict[str, Type[Pattern]]:
+        """The Pattern class of every pattern name identify_patterns can give."""
+        pattern_classes = {group.pattern_name: group.__class__ for group in self.groups}
+        pattern_classes[OTHER] = OtherPattern
+        return pattern_classes
+
+    def identify_pattern_views(
+        self, segments_list: List[Segment], merge_mergable: bool = True
+    ) -> List[PatternView]:
+        """Identifies Patterns as PatternViews into the list of Segments.
+
+        Finds the same Patterns as `identify_patterns`, but no Pattern is built: each one is the
+        index ranges of its segments.
+
+        Args:
+            segments_list (List[Segment]): The list of segments to identify Patterns from.
+            merge_mergable (bool, optional): If True, merges mergable consecutive patterns together. Defaults to True.
+
+        Returns:
+            List[PatternView]: The identified Patterns.
+        """
+        views = run_pattern_automaton(self.groups, segments_list, self.config)
+        merged = merge_pattern_views(views, segments_list, merge_mergable)
+        if __debug__ and tracing.sink is not None and merge_mergable:
+            tracing.sink.emit(PatternsMerged(len(views), len(merged)))
+        return merged
+
+    def _identify_patterns_automaton(
+        self, segments_list: List[Segment], merge_mergable: bool
+    ) -> List[Pattern]:
+        pattern_classes = self.pattern_classes
+        return [
+            pattern_classes[view.pattern_name](
+                view.pattern_name, view_segments(view, segments_list), config=self.config
+            )
+            for view in self.identify_pattern_views(segments_list, merge_mergable)
+        ]
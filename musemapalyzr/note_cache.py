@@ -0,0 +1,352 @@
+import hashlib
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from typing import Optional
+
+import numpy as np
+
+import config.logging_config as logging_config
+from musemapalyzr.asset_parser import TempoSections
+
+logger = logging_config.logger
+
+NOTE_CACHE_DIR = "note_cache"
+
+# How large `prune` lets the cache directory grow
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+# How old a temporary file must be before `prune` treats it as left behind by a crashed writer
+STALE_TEMP_SECS = 60 * 60
+
+CachedNotes = namedtuple(
+    "CachedNotes", ["title", "sample_rate", "tempo_sections", "lanes", "sample_times"]
+)
+MapHeader = namedtuple(
+    "MapHeader",
+    ["title", "sample_rate", "note_count", "first_sample", "last_sample", "content_hash"],
+)
+
+_MAGIC = b"MSNC"
+_VERSION = 2
+# magic, version, sample rate, title length (bytes), note count, tempo section count
+_HEADER = struct.Struct("<4sHIIQQ")
+_ALIGNMENT = 8
+
+_MAP_HEADER_MAGIC = b"MSNH"
+_MAP_HEADER_VERSION = 1
+# magic, version, sample rate, title length (bytes), note count, first and last sample,
+# asset hash
+_MAP_HEADER = struct.Struct("<4sHIIQqq16s")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def asset_hash(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def notes_path(content_hash: str, cache_dir: Optional[str] = None) -> str:
+    """Gets the path of the note cache file of the asset with the given `asset_hash`.
+
+    The file is named after the hash of the asset's contents, so an edited asset never matches
+    a stale cache file.
+    """
+    return os.path.join(cache_dir or NOTE_CACHE_DIR, f"{content_hash}.notes")
+
+
+def header_path(asset_path: str, cache_dir: Optional[str] = None) -> str:
+    """Gets where the header of an asset is cached.
+
+    Unlike the note cache, the file is named after the asset's path, size and modification time,
+    so it can be found without reading the asset at all.
+
+    Args:
+        asset_path (str): The path of the .asset file.
+        cache_dir (str, optional): The cache directory. Defaults to NOTE_CACHE_DIR.
+
+    Returns:
+        str: The path of the header file.
+    """
+    stat = os.stat(asset_path)
+    key = f"{os.path.abspath(asset_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8")
+    return os.path.join(
+        cache_dir or NOTE_CACHE_DIR, f"{hashlib.blake2b(key, digest_size=16).hexdigest()}.header"
+    )
+
+
+def file_content_hash(asset_path: str, cache_dir: Optional[str] = None) -> str:
+    """Gets the `asset_hash` of an asset file, from its cached header when it has one.
+
+    Args:
+        asset_path (str): The path of the .asset file.
+        cache_dir (str, optional): The cache directory. Defaults to NOTE_CACHE_DIR.
+
+    Returns:
+        str: The hash of the asset's contents.
+    """
+    header = load_header(header_path(asset_path, cache_dir))
+    if header is not None:
+        return header.content_hash
+    with open(asset_path, "rb") as f:
+        return asset_hash(f.read())
+
+
+def load_notes(cache_path: str) -> Optional[CachedNotes]:
+    """Loads cached notes through a memory map.
+
+    The returned arrays are read-only views over the mapped file, nothing is copied.
+
+    Args:
+        cache_path (str): The path of the cache file.
+
+    Returns:
+        Optional[CachedNotes]: The cached notes, or None if there is no usable cache file.
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(buffer) < _HEADER.size:
+        return None
+    magic, version, sample_rate, title_length, note_count, section_count = _HEADER.unpack_from(
+        buffer
+    )
+    if magic != _MAGIC or version != _VERSION:
+        return None
+
+    title_offset = _HEADER.size
+    sample_times_offset = _aligned(title_offset + title_length)
+    section_starts_offset = sample_times_offset + note_count * 8
+    samples_per_beat_offset = section_starts_offset + section_count * 8
+    lanes_offset = samples_per_beat_offset + section_count * 8
+    if len(buffer) != lanes_offset + note_count:
+        logger.warning(f"Ignoring truncated note cache: '{cache_path}'")
+        return None
+
+    title = buffer[title_offset : title_offset + title_length].decode("utf-8")
+    sample_times = np.frombuffer(buffer, dtype="<i8", count=note_count, offset=sample_times_offset)
+    tempo_sections = TempoSections(
+        np.frombuffer(buffer, dtype="<i8", count=section_count, offset=section_starts_offset),
+        np.frombuffer(buffer, dtype="<f8", count=section_count, offset=samples_per_beat_offset),
+    )
+    lanes = np.frombuffer(buffer, dtype=np.uint8, count=note_count, offset=lanes_offset)
+    _mark_used(cache_path)
+    return CachedNotes(
+        title=title,
+        sample_rate=sample_rate,
+        tempo_sections=tempo_sections,
+        lanes=lanes,
+        sample_times=sample_times,
+    )
+
+
+def store_notes(
+    cache_path: str,
+    title: str,
+    sample_rate: int,
+    lanes,
+    sample_times,
+    tempo_sections: TempoSections = TempoSections((), ()),
+) -> None:
+    """Writes the sorted notes and tempo sections of a map to a cache file.
+
+    The file is written next to its final path and then moved into place, so a reader never
+    sees a half written cache file.
+
+    Args:
+        cache_path (str): The path of the cache file.
+        title (str): The title of the map.
+        sample_rate (int): The sample rate of the map.
+        lanes: The lane of each note, sorted by sample time.
+        sample_times: The sample time of each note, sorted.
+        tempo_sections (TempoSections, optional): The map's tempo sections. Defaults to none.
+    """
+    title_bytes = title.encode("utf-8")
+    sample_times = np.ascontiguousarray(sample_times, dtype="<i8")
+    lanes = np.ascontiguousarray(lanes, dtype=np.uint8)
+    section_starts = np.ascontiguousarray(tempo_sections.start_samples, dtype="<i8")
+    samples_per_beat = np.ascontiguousarray(tempo_sections.samples_per_beat, dtype="<f8")
+    header = _HEADER.pack(
+        _MAGIC,
+        _VERSION,
+        sample_rate,
+        len(title_bytes),
+        len(sample_times),
+        len(section_starts),
+    )
+    padding = b"\0" * (_aligned(len(header) + len(title_bytes)) - len(header) - len(title_bytes))
+
+    _write_atomically(
+        cache_path,
+        [
+            header,
+            title_bytes,
+            padding,
+            sample_times.tobytes(),
+            section_starts.tobytes(),
+            samples_per_beat.tobytes(),
+            lanes.tobytes(),
+        ],
+    )
+
+
+def load_header(header_cache_path: str) -> Optional[MapHeader]:
+    """Loads a cached map header. Only the few bytes of the header file are read.
+
+    Args:
+        header_cache_path (str): The path of the header file.
+
+    Returns:
+        Optional[MapHeader]: The cached header, or None if there is no usable header file.
+    """
+    try:
+        with open(header_cache_path, "rb") as f:
+            buffer = f.read()
+    except OSError:
+        return None
+
+    if len(buffer) < _MAP_HEADER.size:
+        return None
+    (
+        magic,
+        version,
+        sample_rate,
+        title_length,
+        note_count,
+        first_sample,
+        last_sample,
+        content_hash,
+    ) = _MAP_HEADER.unpack_from(buffer)
+    if magic != _MAP_HEADER_MAGIC or version != _MAP_HEADER_VERSION:
+        return None
+    if len(buffer) != _MAP_HEADER.size + title_length:
+        logger.warning(f"Ignoring truncated map header: '{header_cache_path}'")
+        return None
+
+    _mark_used(header_cache_path)
+    return MapHeader(
+        title=buffer[_MAP_HEADER.size :].decode("utf-8"),
+        sample_rate=sample_rate,
+        note_count=note_count,
+        first_sample=first_sample,
+        last_sample=last_sample,
+        content_hash=content_hash.hex(),
+    )
+
+
+def store_header(header_cache_path: str, header: MapHeader) -> None:
+    """Writes the header of a map to a header file.
+
+    Args:
+        header_cache_path (str): The path of the header file.
+        header (MapHeader): The header to write.
+    """
+    title_bytes = header.title.encode("utf-8")
+    packed = _MAP_HEADER.pack(
+        _MAP_HEADER_MAGIC,
+        _MAP_HEADER_VERSION,
+        header.sample_rate,
+        len(title_bytes),
+        header.note_count,
+        header.first_sample,
+        header.last_sample,
+        bytes.fromhex(header.content_hash),
+    )
+    _write_atomically(header_cache_path, [packed, title_bytes])
+
+
+def prune(cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_CACHE_BYTES) -> int:
+    """Deletes the least recently used cache files until the cache fits in max_bytes.
+
+    Every edit of an asset leaves its old note cache and header files behind, since they are
+    named after its old contents and mtime. Loading a file marks it as used, so those are the
+    first to go. Temporary files older than STALE_TEMP_SECS, left by a writer that was killed, are
+    deleted too.
+
+    Args:
+        cache_dir (str, optional): The cache directory. Defaults to NOTE_CACHE_DIR.
+        max_bytes (int, optional): The most bytes of cache files to keep.
+            Defaults to DEFAULT_MAX_CACHE_BYTES.
+
+    Returns:
+        int: The number of files deleted.
+    """
+    cache_dir = cache_dir or NOTE_CACHE_DIR
+    cache_files = []
+    stale_temp_files = []
+    stale_before_ns = time.time_ns() - STALE_TEMP_SECS * 10**9
+    try:
+        with os.scandir(cache_dir) as dir_entries:
+            for dir_entry in dir_entries:
+                if not dir_entry.name.endswith((".notes", ".header", ".tmp")):
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except OSError:
+                    continue
+                if not dir_entry.name.endswith(".tmp"):
+                    cache_files.append((stat.st_mtime_ns, stat.st_size, dir_entry.path))
+                elif stat.st_mtime_ns < stale_before_ns:
+                    stale_temp_files.append(dir_entry.path)
+    except FileNotFoundError:
+        return 0
+
+    deleted = 0
+    for path in stale_temp_files:
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        deleted += 1
+
+    total_bytes = sum(size for _, size, _ in cache_files)
+    for _, size, path in sorted(cache_files):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            # In use by another process, on platforms that do not allow deleting it
+            continue
+        total_bytes -= size
+        deleted += 1
+    if deleted:
+        logger.info(f"Pruned {deleted} files from the note cache '{cache_dir}'")
+    return deleted
+
+
+def _mark_used(cache_path: str) -> None:
+    # prune deletes the files with the oldest mtime first
+    try:
+        os.utime(cache_path)
+    except OSError:
+        pass
+
+
+def _write_atomically(cache_path: str, chunks) -> None:
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(temp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        _remove_quietly(temp_path)
+        logger.warning(f"Could not write cache file '{cache_path}': {e}")
+    except BaseException:
+        _remove_quietly(temp_path)
+        raise
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,249 @@
+from bisect import bisect_right
+from collections import namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional
+
+import config.logging_config as logging_config
+from musemapalyzr.analysis_config import AnalysisConfig
+from musemapalyzr.constants import INTERVAL_MASK, LONG_INTERVAL
+from musemapalyzr.entities import Segment
+from musemapalyzr.map_pattern_analysis import Mapalyzr
+from musemapalyzr.pattern_automaton import PatternAutomaton
+from musemapalyzr.pattern_views import PatternScorer, PatternView, merge_pattern_views
+
+logger = logging_config.logger
+
+# Roughly how many segments each chunk gets. Maps with fewer than two chunks are not split.
+DEFAULT_CHUNK_SEGMENTS = 1000
+
+# The Patterns identified in a map, and the PatternScore of each one that has segments
+ScoredPatterns = namedtuple("ScoredPatterns", ["views", "pattern_scores"])
+
+# What a worker found from the start of its chunk to the first reset in the next chunk, with
+# indices into the whole map:
+#   - views, identified_at and resets as in PatternAutomaton. The first reset is the one the
+#     chunk was started from, -1 for the first chunk.
+#   - last_views: if it ran to the last segment, its last views when PatternViews were, and
+#     were not, identified before them. Otherwise None.
+#   - pattern_scores: the PatternScore of each view it merged, by pattern name and spans.
+_ChunkResult = namedtuple(
+    "_ChunkResult", ["views", "identified_at", "resets", "last_views", "pattern_scores"]
+)
+
+
+def chunk_boundaries(
+    segments: List[Segment], chunk_segments: int = DEFAULT_CHUNK_SEGMENTS
+) -> List[int]:
+    """Gets where to cut a map's segments into chunks for `parallel_pattern_scores`.
+
+    Each chunk after the first starts at least chunk_segments after the start of the chunk
+    before it, at the first long interval within another chunk_segments. Long intervals are
+    rare in most maps, so without one it starts at the first interval of any kind.
+
+    Args:
+        segments (List[Segment]): The segments of the map.
+        chunk_segments (int, optional): The least number of segments in a chunk. Defaults to
+            DEFAULT_CHUNK_SEGMENTS.
+
+    Returns:
+        List[int]: The index of the first segment of each chunk after the first.
+    """
+    kinds = [segment.kind for segment in segments]
+    boundaries = []
+    start = chunk_segments
+    while start < len(kinds):
+        window = kinds[start : start + chunk_segments]
+        if LONG_INTERVAL in window:
+            boundary = start + window.index(LONG_INTERVAL)
+        else:
+            boundary = next(
+                (index for index in range(start, len(kinds)) if kinds[index] & INTERVAL_MASK),
+                None,
+            )
+            if boundary is None:
+                break
+        boundaries.append(boundary)
+        start = boundary + chunk_segments
+    return boundaries
+
+
+def _shift(view: PatternView, offset: int) -> PatternView:
+    return PatternView(
+        view.pattern_name, tuple((start + offset, end + offset) for start, end in view.spans)
+    )
+
+
+def _identify_chunk(
+    segments: List[Segment],
+    offset: int,
+    next_start: Optional[int],
+    reaches_end: bool,
+    config: AnalysisConfig,
+) -> _ChunkResult:
+    # segments are the map's from index offset on. A chunk after the first starts at the second
+    # of them, in the state the groups would be in after a reset there.
+    mapalyzr = Mapalyzr(config)
+    automaton = PatternAutomaton(mapalyzr.groups, segments, config)
+    if offset > 0:
+        automaton.resume_after(1)
+        resets = [1]
+    else:
+        resets = [-1]
+
+    stopped_at = automaton.run(
+        None if next_start is None else lambda index: index + offset >= next_start
+    )
+    resets += automaton.resets
+    views = automaton.views
+    identified_at = automaton.identified_at
+    last_views = None
+    if stopped_at is None:
+        if reaches_end:
+            last_views = (automaton.last_views(True), automaton.last_views(False))
+        else:
+            # The next Patterns depend on segments after these, so stop at the last reset
+            identified = bisect_right(identified_at, resets[-1])
+            views, identified_at = views[:identified], identified_at[:identified]
+
+    scorer = PatternScorer(mapalyzr.pattern_classes, config)
+    merged = merge_pattern_views(views + (last_views[0] if last_views else []), segments)
+    pattern_scores = {
+        (view.pattern_name, _shift(view, offset).spans): scorer.score(view, segments)
+        for view in merged
+        if view.spans
+    }
+    return _ChunkResult(
+        [_shift(view, offset) for view in views],
+        [index + offset for index in identified_at],
+        [index + offset if index >= 0 else index for index in resets],
+        (
+            None
+            if last_views is None
+            else tuple([_shift(view, offset) for view in last] for last in last_views)
+        ),
+        pattern_scores,
+    )
+
+
+def _stitch(
+    segments: List[Segment], config: AnalysisConfig, results: List[_ChunkResult]
+) -> ScoredPatterns:
+    mapalyzr = Mapalyzr(config)
+
+    def resume(reset: int) -> PatternAutomaton:
+        automaton = PatternAutomaton(mapalyzr.groups, segments, config)
+        if reset >= 0:
+            automaton.resume_after(reset)
+        return automaton
+
+    views = []
+    last_views = None
+    # The last segment the sequential run is known to reset at, -1 before the first segment
+    reset = -1
+    for result in results:
+        if reset not in result.resets:
+            # The chunk started from a reset the sequential run does not make. Run it from its
+            # last known reset until it resets where the chunk did, or has passed the chunk.
+            chunk_resets = set(result.resets)
+            chunk_end = result.resets[-1]
+            automaton = resume(reset)
+            reset = automaton.run(lambda index: index in chunk_resets or index >= chunk_end)
+            views += automaton.views
+            logger.debug(f"Ran the patterns after chunk seam {result.resets[0]} again")
+            if reset is None:
+                last_views = automaton.last_views(len(views) > 0)
+                break
+            if reset not in chunk_resets:
+                continue
+
+        views += result.views[bisect_right(result.identified_at, reset) :]
+        if result.last_views is not None:
+            last_views = result.last_views[0 if views else 1]
+            break
+        reset = result.resets[-1]
+
+    if last_views is None:
+        automaton = resume(reset)
+        automaton.run()
+        views += automaton.views
+        last_views = automaton.last_views(len(views) > 0)
+
+    # Patterns that were not merged the same way in their chunk are scored again
+    scorer = PatternScorer(mapalyzr.pattern_classes, config)
+    pattern_scores = {}
+    for result in results:
+        pattern_scores.update(result.pattern_scores)
+    merged = merge_pattern_views(views + last_views, segments)
+    return ScoredPatterns(
+        merged,
+        [
+            pattern_scores.get((view.pattern_name, view.spans)) or scorer.score(view, segments)
+            for view in merged
+            if view.spans
+        ],
+    )
+
+
+def parallel_pattern_scores(
+    segments: List[Segment],
+    config: AnalysisConfig,
+    executor: Optional[Executor] = None,
+    max_workers: Optional[int] = None,
+    chunk_segments: int = DEFAULT_CHUNK_SEGMENTS,
+) -> ScoredPatterns:
+    """Identifies and scores the Patterns of a long map in chunks, in parallel.
+
+    The segments are cut into chunks at intervals (see `chunk_boundaries`). Each chunk is
+    identified and scored from the reset the groups would be in at its first segment, and runs
+    on into the next chunk until it is reset there. The chunks are then stitched together:
+
+        - Where the run of one chunk resets at a segment the next chunk also reset at, the
+          next chunk's Patterns are the sequential run's from there on.
+        - Otherwise the sequential run is resumed from its last known reset until it does.
+        - The stitched Patterns are merged like `_return_final_patterns`, so Other and Slow
+          Stretch Patterns are merged across the seams. Any merged Pattern no chunk scored is
+          scored then.
+
+    So the Patterns and PatternScores are always those of the sequential run.
+
+    Args:
+        segments (List[Segment]): The segments of the map.
+        config (AnalysisConfig): The compiled config.
+        executor (Executor, optional): The pool to run the chunks on. Defaults to a
+            ProcessPoolExecutor for this call, whose workers log through this process.
+        max_workers (int, optional): The number of processes of the default pool.
+        chunk_segments (int, optional): The least number of segments in a chunk. Defaults to
+            DEFAULT_CHUNK_SEGMENTS.
+
+    Returns:
+        ScoredPatterns: The merged PatternViews and the PatternScores of those with segments.
+    """
+    boundaries = chunk_boundaries(segments, chunk_segments)
+    if not boundaries:
+        mapalyzr = Mapalyzr(config)
+        views = mapalyzr.identify_pattern_views(segments)
+        scorer = PatternScorer(mapalyzr.pattern_classes, config)
+        return ScoredPatterns(views, scorer.score_all(views, segments))
+
+    starts = [0] + boundaries
+    # Each chunk gets the segment before it, for its reset, and the next chunk to run on into
+    offsets = [max(start - 1, 0) for start in starts]
+    next_starts = boundaries + [None]
+    ends = starts[2:] + [len(segments)] * min(len(starts), 2)
+    tasks = (
+        [segments[offset:end] for offset, end in zip(offsets, ends)],
+        offsets,
+        next_starts,
+        [end == len(segments) for end in ends],
+        [config] * len(starts),
+    )
+    if executor is None:
+        with ProcessPoolExecutor(
+            max_workers,
+            initializer=logging_config.forward_worker_logs,
+            initargs=(logging_config.worker_log_queue(),),
+        ) as executor:
+            results = list(executor.map(_identify_chunk, *tasks))
+    else:
+        results = list(executor.map(_identify_chunk, *tasks))
+    return _stitch(segments, config, results)
@@ -0,0 +1,382 @@
+import functools
+from typing import Callable, List, Optional, Sequence, Type
+
+from musemapalyzr import tracing
+from musemapalyzr.analysis_config import AnalysisConfig
+from musemapalyzr.constants import (
+    INTERVAL_MASK,
+    N_STACK_MASK,
+    OTHER,
+    SHORT_INTERVAL,
+    TWO_STACK,
+    SegmentKind,
+)
+from musemapalyzr.entities import Note, Segment
+from musemapalyzr.pattern_views import PatternView, to_spans
+from musemapalyzr.tracing import GroupRejected, PatternAppended
+from patterns.pattern import Pattern
+
+# Segment kinds in bit order, each kind's index is its code
+_KINDS = [kind.value for kind in SegmentKind]
+_KIND_INDEX = {kind: index for index, kind in enumerate(_KINDS)}
+
+# Rules may tell segments apart by their note count (e.g. 3 note Zig Zags), counts above this
+# are assumed to be treated alike
+_MAX_NOTE_COUNT = 8
+_NOTE_COUNT_CODES = _MAX_NOTE_COUNT + 1
+
+# n-stack and other segment counts above this are assumed to be treated alike by is_appendable
+_MAX_APPENDABLE_COUNT = 4
+
+# What check_segment does with a segment: whether it is appended, and whether it returns True
+_APPENDS = 2
+_ACCEPTS = 1
+
+
+def segment_code(segment: Segment) -> int:
+    """The column of the transition table for a segment: its kind and note count."""
+    return _KIND_INDEX[segment.kind] * _NOTE_COUNT_CODES + min(len(segment.notes), _MAX_NOTE_COUNT)
+
+
+class GroupRules:
+    """The check_segment and is_appendable rules of one pattern group, compiled into tables.
+
+    check_segment only depends on:
+        - the kind of the group's last segment (or that it has none)
+        - the kind and note count of the new segment
+        - whether the two segments' time differences are within the pattern tolerance
+        - whether the gap between the two segments is within the pattern tolerance
+
+    So `transitions[last_kind + 1][segment_code]` is the outcome of every check_segment, either
+    one outcome, or four indexed by `time_difference_ok * 2 + gap_ok` when the tolerances
+    matter. is_appendable only depends on how many n-stacks and other segments there are, so
+    it is `appendable[n_stacks][others]`.
+
+    The tables are filled in by running the group's own strategies on stand-in segments, so
+    they always follow the rules in `strategies/`.
+    """
+
+    def __init__(self, pattern_class: Type[Pattern], pattern_name: str, config: AnalysisConfig):
+        self.pattern_class = pattern_class
+        self.pattern_name = pattern_name
+        self.tolerance = config.pattern_tolerance
+
+        group = pattern_class(pattern_name, [], config=config)
+        self.transitions = [
+            [
+                self._probe_check_segment(group, last_kind, kind, note_count)
+                for kind in _KINDS
+                for note_count in range(_NOTE_COUNT_CODES)
+            ]
+            for last_kind in [None] + _KINDS
+        ]
+        self.appendable = [
+            [
+                self._probe_is_appendable(group, n_stacks, others)
+                for others in range(_MAX_APPENDABLE_COUNT + 1)
+            ]
+            for n_stacks in range(_MAX_APPENDABLE_COUNT + 1)
+        ]
+
+    def _probe_check_segment(
+        self, group: Pattern, last_kind: Optional[int], kind: int, note_count: int
+    ):
+        # Time differences and gaps just within, or well outside of, the tolerance
+        time_difference = self.tolerance + 1000
+        too_far = 2 * self.tolerance + 1000
+
+        outcomes = []
+        for time_difference_ok in (False, True):
+            for gap_ok in (False, True):
+                group.is_active = True
+                group.segments = []
+                if last_kind is not None:
+                    group.segments.append(_stand_in(last_kind, 2, 0, time_difference))
+                start = time_difference if gap_ok else time_difference + too_far
+                segment = _stand_in(
+                    kind,
+                    max(note_count, 2),
+                    start,
+                    time_difference if time_difference_ok else time_difference + too_far,
+                )
+                accepted = group.check_segment(segment)
+                appended = bool(group.segments) and group.segments[-1] is segment
+                outcomes.append(_APPENDS * appended + _ACCEPTS * bool(accepted))
+
+        if len(set(outcomes)) == 1:
+            return outcomes[0]
+        return tuple(outcomes)
+
+    def _probe_is_appendable(self, group: Pattern, n_stacks: int, others: int) -> bool:
+        group.segments = [_stand_in(TWO_STACK, 2, 0, 1)] * n_stacks + [
+            _stand_in(SHORT_INTERVAL, 2, 0, 1)
+        ] * others
+        try:
+            return group.is_appendable()
+        except ValueError:
+            # Only raised for segments the group can never hold
+            return False
+
+
+def _stand_in(kind: int, note_count: int, start: int, time_difference: int) -> Segment:
+    notes = [Note(i % 2, start + i * time_difference) for i in range(note_count)]
+    return Segment(kind, notes, time_difference=time_difference)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_group_rules(
+    pattern_class: Type[Pattern], pattern_name: str, config: AnalysisConfig
+) -> GroupRules:
+    """Gets the GroupRules of a pattern group, compiling them on first use."""
+    return GroupRules(pattern_class, pattern_name, config)
+
+
+class _GroupState:
+    __slots__ = (
+        "rules",
+        "indices",
+        "last",
+        "is_active",
+        "last_kind",
+        "n_stacks",
+        "is_appendable",
+    )
+
+    def __init__(self, rules: GroupRules):
+        self.rules = rules
+        self.clear()
+
+    def clear(self):
+        # The indices of the group's segments, and its last segment
+        self.indices = []
+        self.last = None
+        self.is_active = True
+        self.last_kind = 0
+        self.n_stacks = 0
+        self.is_appendable = False
+
+    def check_segment(self, segment: Segment, index: int, code: int) -> bool:
+        if not self.is_active:
+            return False
+
+        outcome = self.rules.transitions[self.last_kind][code]
+        if outcome.__class__ is tuple:
+            last = self.last
+            tolerance = self.rules.tolerance
+            time_difference_ok = abs(segment.time_difference - last.time_difference) <= tolerance
+            gap_ok = abs(last.notes[-1].sample_time - segment.notes[0].sample_time) <= tolerance
+            outcome = outcome[time_difference_ok * 2 + gap_ok]
+
+        if outcome & _APPENDS:
+            self.indices.append(index)
+            self.last = segment
+            self.last_kind = code // _NOTE_COUNT_CODES + 1
+            if segment.kind & N_STACK_MASK:
+                self.n_stacks += 1
+            n_stacks = self.n_stacks
+            others = len(self.indices) - n_stacks
+            self.is_appendable = self.rules.appendable[
+                n_stacks if n_stacks < _MAX_APPENDABLE_COUNT else _MAX_APPENDABLE_COUNT
+            ][others if others < _MAX_APPENDABLE_COUNT else _MAX_APPENDABLE_COUNT]
+        return bool(outcome & _ACCEPTS)
+
+    def reset(self, previous: Optional[Segment], current: Segment, index: int, codes: List[int]):
+        # Pattern.reset_group, where previous is the segment before current
+        self.clear()
+        if current.kind & INTERVAL_MASK:
+            self.check_segment(current, index, codes[index])
+        elif previous is not None and previous.kind & INTERVAL_MASK:
+            self.check_segment(previous, index - 1, codes[index - 1])
+            self.check_segment(current, index, codes[index])
+        elif previous is not None:
+            added = self.check_segment(previous, index - 1, codes[index - 1])
+            if added:
+                added = self.check_segment(current, index, codes[index])
+            if not added:
+                self.is_active = False
+
+    def to_view(self) -> PatternView:
+        return PatternView(self.rules.pattern_name, to_spans(self.indices))
+
+
+def _reset_other(previous: Optional[Segment], current: Segment, index: int) -> List[int]:
+    # Pattern.reset_group for OtherPattern, which takes every segment
+    if current.kind & INTERVAL_MASK:
+        return [index]
+    if previous is not None:
+        return [index - 1, index]
+    return []
+
+
+class PatternAutomaton:
+    """`Mapalyzr.identify_patterns` in one pass, with compiled group rules instead of strategy
+    calls.
+
+    Each segment is looked up in the transition table of every group instead of being checked
+    by it, and a group's appendability is kept up to date as segments are appended. Groups only
+    hold the indices of their segments, and identified Patterns are PatternViews.
+
+    Every group is reset together, and a reset only depends on the segment it happens at and
+    the one before it. So the automaton can resume after any segment it was reset at, and two
+    runs over segments that are the same from a reset onwards give the same PatternViews from
+    there. The segment each view was identified at and every reset are recorded for this.
+    """
+
+    def __init__(
+        self,
+        groups: Sequence[Pattern],
+        segments: List[Segment],
+        config: AnalysisConfig,
+        codes: Optional[List[int]] = None,
+    ):
+        self.segments = segments
+        self.states = [
+            _GroupState(compile_group_rules(group.__class__, group.pattern_name, config))
+            for group in groups
+        ]
+        # The segment_code of every segment, if already known
+        self.codes = [segment_code(segment) for segment in segments] if codes is None else codes
+        # The identified PatternViews, and the index of the segment each one was identified at
+        self.views: List[PatternView] = []
+        self.identified_at: List[int] = []
+        # The indices of the segments every group was reset at, in order
+        self.resets: List[int] = []
+        # The indices of the segments in the Other group
+        self.other: List[int] = []
+        self.next_index = 0
+
+    def resume_after(self, reset_index: int):
+        """Puts the automaton in the state it was in after being reset at a segment.
+
+        Args:
+            reset_index (int): The index of a segment every group was reset at.
+        """
+        previous = self.segments[reset_index - 1] if reset_index > 0 else None
+        current = self.segments[reset_index]
+        for state in self.states:
+            state.reset(previous, current, reset_index, self.codes)
+        self.other = _reset_other(previous, current, reset_index)
+        self.next_index = reset_index + 1
+
+    def run(self, stop_at_reset: Optional[Callable[[int], bool]] = None) -> Optional[int]:
+        """Identifies Patterns up to the last segment.
+
+        Args:
+            stop_at_reset (Callable[[int], bool], optional): Called with the index of each
+                segment the groups are reset at. Returning True stops the run there.
+
+        Returns:
+            Optional[int]: The index of the segment the run stopped at, or None if it ran to the
+                last segment.
+        """
+        segments = self.segments
+        states = self.states
+        codes = self.codes
+        views = self.views
+        identified_at = self.identified_at
+        other = self.other
+        sink = tracing.sink
+
+        previous = segments[self.next_index - 1] if self.next_index > 0 else None
+        for index in range(self.next_index, len(segments)):
+            current = segments[index]
+            code = codes[index]
+            added = False
+            reset = False
+            for state in states:
+                # An inactive group rejects every segment, and has not become appendable since
+                if state.is_active and state.check_segment(current, index, code):
+                    added = True
+                    continue
+                if state.indices:
+                    if __debug__ and sink is not None and state.is_active:
+                        sink.emit(
+                            GroupRejected(state.rules.pattern_name, index, len(state.indices))
+                        )
+                    state.is_active = False
+                if state.is_appendable:
+                    added = True
+                    reset = True
+                    # Need to first check if the Other segments have stragglers...
+                    if len(state.indices) < len(other):
+                        views.append(PatternView(OTHER, to_spans(other[: -len(state.indices)])))
+                        identified_at.append(index)
+                        if __debug__ and sink is not None:
+                            sink.emit(PatternAppended(OTHER, views[-1].spans, index))
+                    views.append(state.to_view())
+                    identified_at.append(index)
+                    if __debug__ and sink is not None:
+                        sink.emit(PatternAppended(views[-1].pattern_name, views[-1].spans, index))
+                    for state_to_reset in states:
+                        state_to_reset.reset(previous, current, index, codes)
+                    other = _reset_other(previous, current, index)
+                    break
+
+            if not reset:
+                other.append(index)
+
+            if not added:
+                if other:
+                    views.append(PatternView(OTHER, to_spans(other)))
+                    identified_at.append(index)
+                    if __debug__ and sink is not None:
+                        sink.emit(PatternAppended(OTHER, views[-1].spans, index))
+                other = _reset_other(previous, current, index)
+                for state in states:
+                    state.reset(previous, current, index, codes)
+                reset = True
+
+            previous = current
+            if reset:
+                self.resets.append(index)
+                if stop_at_reset is not None and stop_at_reset(index):
+                    self.other = other
+                    self.next_index = index + 1
+                    return index
+
+        self.other = other
+        self.next_index = len(segments)
+        return None
+
+    def last_views(self, has_views: Optional[bool] = None) -> List[PatternView]:
+        """`Mapalyzr._handle_last_patterns`, from the state the automaton ended in.
+
+        Args:
+            has_views (bool, optional): Whether any PatternView was identified before the last
+                one. Defaults to whether this automaton identified any.
+
+        Returns:
+            List[PatternView]: The PatternView still held by the groups, if any.
+        """
+        for state in self.states:
+            if state.is_appendable:
+                return [state.to_view()]
+        # If there is a hanging SINGLE Interval at the end of the pattern, don't add it... unless it is the only one in the group list
+        other = self.other
+        if has_views is None:
+            has_views = len(self.views) > 0
+        if len(other) > 0 and (
+            not has_views or not (len(other) == 1 and self.segments[other[0]].kind & INTERVAL_MASK)
+        ):
+            return [PatternView(OTHER, to_spans(other))]
+        return []
+
+
+def run_pattern_automaton(
+    groups: Sequence[Pattern], segments: List[Segment], config: AnalysisConfig
+) -> List[PatternView]:
+    """Identifies Patterns in one pass with a PatternAutomaton.
+
+    This is `Mapalyzr.identify_patterns` up to (not including) merging.
+
+    Args:
+        groups (Sequence[Pattern]): The pattern groups, in the order they are checked.
+        segments (List[Segment]): The segments to identify Patterns from.
+        config (AnalysisConfig): The compiled config.
+
+    Returns:
+        List[PatternView]: The identified PatternViews, including the last one.
+    """
+    automaton = PatternAutomaton(groups, segments, config)
+    automaton.run()
+    return automaton.views + automaton.last_views()
@@ -1,6 +1,11 @@
+import functools
+from typing import Callable, Dict, Tuple
+
 import numpy as np
+from numpy.typing import ArrayLike
 
 from config.config import get_config
+from musemapalyzr.analysis_config import AnalysisConfig
 
 conf = get_config()
 
@@ -180,47 +185,165 @@ def varying_stacks_multiplier(
     return lower_bound + (upper_bound - lower_bound) * smoothstep(t)
 
 
+# The points of a CurveTable by default, enough that interpolating is within 1e-6 of the curve
+DEFAULT_TABLE_POINTS = 4096
+
+# The NPS the circle multipliers reach their upper bound at
+CIRCLE_MAX_NPS = 30
+
+
+def smoothstep_curve(
+    values: ArrayLike,
+    lower_bound: float,
+    upper_bound: float,
+    lower_clamp: float,
+    upper_clamp: float,
+) -> np.ndarray:
+    """The smoothstep multiplier curve of most patterns, over an array of NPS (or note counts).
+
+    Args:
+        values (ArrayLike): The NPS (or note counts) to get the multipliers of.
+        lower_bound (float): The multiplier at and below lower_clamp.
+        upper_bound (float): The multiplier at and above upper_clamp.
+        lower_clamp (float): Where the curve starts rising.
+        upper_clamp (float): Where the curve stops rising.
+
+    Returns:
+        np.ndarray: The multiplier of each value.
+    """
+    t = np.clip((np.asarray(values, dtype=float) - lower_clamp) / (upper_clamp - lower_clamp), 0, 1)
+    return lower_bound + (upper_bound - lower_bound) * (t * t * (3 - (2 * t)))
+
+
+def ease_in_quartic_curve(
+    values: ArrayLike,
+    lower_bound: float,
+    upper_bound: float,
+    lower_clamp: float,
+    upper_clamp: float,
+) -> np.ndarray:
+    """The multiplier curve of Zig Zags, `smoothstep_curve` with t**4 as the easing."""
+    t = np.clip((np.asarray(values, dtype=float) - lower_clamp) / (upper_clamp - lower_clamp), 0, 1)
+    return lower_bound + (upper_bound - lower_bound) * t**4
+
+
+def circle_curve(values: ArrayLike, lower_bound: float, upper_bound: float) -> np.ndarray:
+    """The multiplier curve of Even and Skewed Circles, rising from 0 to CIRCLE_MAX_NPS."""
+    t = np.clip(np.asarray(values, dtype=float) / CIRCLE_MAX_NPS, 0, 1)
+    return lower_bound + (upper_bound - lower_bound) * (3 * t**2 - 2 * t**3)
+
+
+# The vectorised function of each curve of an AnalysisConfig, by field name
+CURVES: Dict[str, Callable[..., np.ndarray]] = {
+    "nothing_but_theory_curve": smoothstep_curve,
+    "varying_streams_curve": smoothstep_curve,
+    "zig_zag_curve": ease_in_quartic_curve,
+    "even_circle_curve": circle_curve,
+    "skewed_circle_curve": circle_curve,
+    "stream_curve": smoothstep_curve,
+    "pattern_stream_length_curve": smoothstep_curve,
+    "zig_zag_length_curve": smoothstep_curve,
+    "four_stack_curve": smoothstep_curve,
+    "three_stack_curve": smoothstep_curve,
+    "two_stack_curve": smoothstep_curve,
+    "varying_stacks_curve": smoothstep_curve,
+}
+
+
+def curve_values(curve_name: str, values: ArrayLike, config: AnalysisConfig) -> np.ndarray:
+    """Gets the multipliers of a config's curve over an array of NPS (or note counts).
+
+    These are what the scalar multiplier functions give for each value, to within rounding (NumPy
+    computes small powers by multiplying).
+
+    Args:
+        curve_name (str): The AnalysisConfig field of the curve, e.g. "zig_zag_curve".
+        values (ArrayLike): The NPS (or note counts) to get the multipliers of.
+        config (AnalysisConfig): The compiled config to take the curve's parameters from.
+
+    Returns:
+        np.ndarray: The multiplier of each value.
+    """
+    if curve_name not in CURVES:
+        raise ValueError(f"Unknown multiplier curve: {curve_name}")
+    return CURVES[curve_name](values, *getattr(config, curve_name))
+
+
+class CurveTable:
+    """A curve sampled at evenly spaced points, looked up by linear interpolation.
+
+    Every curve is flat outside of where it rises, so only that range is sampled and values
+    outside of it get the curve's exact bounds.
+
+    Attributes:
+        curve_name (str): The AnalysisConfig field of the curve.
+        xs (np.ndarray): The values the curve was sampled at.
+        ys (np.ndarray): The multiplier at each of xs.
+    """
+
+    def __init__(self, curve_name: str, curve: Tuple[float, ...], points: int):
+        if points < 2:
+            raise ValueError(f"A CurveTable needs at least 2 points, not {points}")
+        self.curve_name = curve_name
+        if CURVES[curve_name] is circle_curve:
+            start, stop = 0, CIRCLE_MAX_NPS
+        else:
+            start, stop = curve[2], curve[3]
+        self.xs = np.linspace(start, stop, points)
+        self.ys = CURVES[curve_name](self.xs, *curve)
+
+    def __call__(self, values: ArrayLike) -> np.ndarray:
+        return np.interp(values, self.xs, self.ys)
+
+
+def get_curve_table(
+    curve_name: str, config: AnalysisConfig, points: int = DEFAULT_TABLE_POINTS
+) -> CurveTable:
+    """Gets the lookup table of a config's curve, building it on first use.
+
+    Args:
+        curve_name (str): The AnalysisConfig field of the curve, e.g. "zig_zag_curve".
+        config (AnalysisConfig): The compiled config to take the curve's parameters from.
+        points (int, optional): The number of points to sample. Defaults to DEFAULT_TABLE_POINTS.
+
+    Returns:
+        CurveTable: The table, shared by every call with the same curve parameters.
+    """
+    if curve_name not in CURVES:
+        raise ValueError(f"Unknown multiplier curve: {curve_name}")
+    return _curve_table(curve_name, getattr(config, curve_name), points)
+
+
+@functools.lru_cache(maxsize=None)
+def _curve_table(curve_name: str, curve: Tuple[float, ...], points: int) -> CurveTable:
+    return CurveTable(curve_name, curve, points)
+
+
 if __name__ == "__main__":
     import matplotlib.pyplot as plt
 
+    from musemapalyzr.analysis_config import get_analysis_config
+
+    config = get_analysis_config()
     nps_values = np.linspace(
         1, 30, 1000
     )  # Generate 1000 equally spaced NPS values between 1 and 30
 
-    even_circle = [even_circle_multiplier(nps) for nps in nps_values]
-
-    skewed_values = [skewed_circle_multiplier(nps) for nps in nps_values]
-
-    zig_zag_values = [zig_zag_multiplier(nps) for nps in nps_values]
-
-    nbt_values = [nothing_but_theory_multiplier(nps) for nps in nps_values]
-    stream_values = [stream_multiplier(nps) for nps in nps_values]
-    pattern_stream_values = [pattern_stream_length_multiplier(nps) for nps in nps_values]
-
-    zig_zag_length_values = [zig_zag_length_multiplier(nps) for nps in nps_values]
-
-    four_stack_values = [four_stack_multiplier(nps) for nps in nps_values]
-    three_stack_values = [three_stack_multiplier(nps) for nps in nps_values]
-    two_stack_values = [two_stack_multiplier(nps) for nps in nps_values]
-    varying_stacks_values = [varying_stacks_multiplier(nps) for nps in nps_values]
-
-    plt.plot(nps_values, even_circle, label="Even Circle")
-    plt.plot(nps_values, skewed_values, label="Skewed Circle")
-    plt.plot(nps_values, zig_zag_values, label="Zig Zag")
-    plt.plot(nps_values, nbt_values, label="Nothing but Theory")
-    plt.plot(nps_values, stream_values, label="Single Streams")
-    plt.plot(nps_values, varying_stacks_values, label="Varying Stacks)")
-
-    plt.plot(nps_values, four_stack_values, label="Four Stacks)")
-    plt.plot(nps_values, three_stack_values, label="Three Stacks)")
-    plt.plot(nps_values, two_stack_values, label="Two Stacks)")
-
-    plt.plot(
-        nps_values,
-        pattern_stream_values,
-        label="Pattern Stream (Multiplier for Num notes)",
-    )
-    plt.plot(nps_values, zig_zag_length_values, label="Zig Zag (Multiplier for Num notes)")
+    labels = {
+        "even_circle_curve": "Even Circle",
+        "skewed_circle_curve": "Skewed Circle",
+        "zig_zag_curve": "Zig Zag",
+        "nothing_but_theory_curve": "Nothing but Theory",
+        "stream_curve": "Single Streams",
+        "varying_stacks_curve": "Varying Stacks)",
+        "four_stack_curve": "Four Stacks)",
+        "three_stack_curve": "Three Stacks)",
+        "two_stack_curve": "Two Stacks)",
+        "pattern_stream_length_curve": "Pattern Stream (Multiplier for Num notes)",
+        "zig_zag_length_curve": "Zig Zag (Multiplier for Num notes)",
+    }
+    for curve_name, label in labels.items():
+        plt.plot(nps_values, curve_values(curve_name, nps_values, config), label=label)
 
     plt.xlabel("Note Speed (NPS)")
     plt.ylabel("Multiplier")
@@ -0,0 +1,157 @@
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type
+
+from musemapalyzr.analysis_config import AnalysisConfig
+from musemapalyzr.constants import INTERVAL_MASK, OTHER, SLOW_STRETCH
+from musemapalyzr.entities import Segment
+from musemapalyzr.utils import PatternScore
+from patterns.pattern import Pattern
+
+# A Pattern as the (start, end) index ranges of its segments in the map's list of segments.
+# Most Patterns are one range; merged Patterns and groups that skipped a segment have more.
+PatternView = namedtuple("PatternView", ["pattern_name", "spans"])
+
+Spans = Tuple[Tuple[int, int], ...]
+
+
+def to_spans(indices: Sequence[int]) -> Spans:
+    """Gets the (start, end) ranges covering segment indices, in order."""
+    if not indices:
+        return ()
+    spans = []
+    start = end = indices[0]
+    for index in indices:
+        if index == end:
+            end += 1
+            continue
+        if end > start:
+            spans.append((start, end))
+        start, end = index, index + 1
+    spans.append((start, end))
+    return tuple(spans)
+
+
+def view_indices(view: PatternView) -> Iterator[int]:
+    for start, end in view.spans:
+        yield from range(start, end)
+
+
+def view_length(view: PatternView) -> int:
+    return sum(end - start for start, end in view.spans)
+
+
+def view_segments(view: PatternView, segments: Sequence[Segment]) -> List[Segment]:
+    """Gets the segments of a PatternView."""
+    if len(view.spans) == 1:
+        start, end = view.spans[0]
+        return list(segments[start:end])
+    return [segments[index] for index in view_indices(view)]
+
+
+def merge_pattern_views(
+    views: List[PatternView], segments: Sequence[Segment], merge_mergable: bool = True
+) -> List[PatternView]:
+    """`Mapalyzr._return_final_patterns` for PatternViews.
+
+    Consecutive Other and Slow Stretch views are merged the same way, dropping the segments they
+    overlap by, without building any Pattern.
+
+    Args:
+        views (List[PatternView]): The identified PatternViews, in order.
+        segments (Sequence[Segment]): The segments the views index.
+        merge_mergable (bool, optional): If True, merges mergable consecutive views together.
+            Defaults to True.
+
+    Returns:
+        List[PatternView]: The final PatternViews.
+    """
+    if not merge_mergable:
+        return views
+
+    def is_interval(index: int) -> bool:
+        return segments[index].kind & INTERVAL_MASK != 0
+
+    merged = []
+    # The name and segment indices of the Other or Slow Stretch being merged
+    current_name: Optional[str] = None
+    current: Optional[List[int]] = None
+    is_first = True
+    for view in views:
+        if view.pattern_name not in (OTHER, SLOW_STRETCH):
+            if current is not None:
+                # An Other not ending in an interval overlaps the next pattern by a segment
+                if current_name == OTHER and not is_interval(current[-1]):
+                    current = current[:-1]
+                merged.append(PatternView(current_name, to_spans(current)))
+                current = None
+            merged.append(view)
+            is_first = True
+            continue
+
+        indices = list(view_indices(view))
+        if current is None:
+            current_name, current = view.pattern_name, []
+        if current_name != view.pattern_name:
+            # An Other of one segment between two mergables is dropped
+            if view.pattern_name == OTHER and len(indices) == 1:
+                continue
+            merged.append(PatternView(current_name, to_spans(current)))
+            is_first = True
+            current_name, current = view.pattern_name, []
+
+        if is_first:
+            if len(views) > 1 and len(indices) == 1 and is_interval(indices[0]):
+                current = None
+            else:
+                current += indices
+        elif current_name == OTHER:
+            if len(indices) > 2:
+                current += indices[1:] if is_interval(indices[0]) else indices[2:]
+        else:
+            current += indices[1:]
+        if current is not None:
+            is_first = False
+
+    if current is not None and len(current) > 0:
+        merged.append(PatternView(current_name, to_spans(current)))
+    return merged
+
+
+class PatternScorer:
+    """Scores PatternViews with one Pattern, and so one set of strategies, per pattern name.
+
+    Each view's segments are bound to the Pattern of its name before it is scored, instead of a
+    Pattern being built for every view.
+    """
+
+    def __init__(self, pattern_classes: Dict[str, Type[Pattern]], config: AnalysisConfig):
+        self.config = config
+        self._patterns = {
+            name: pattern_class(name, [], config=config)
+            for name, pattern_class in pattern_classes.items()
+        }
+
+    def score(self, view: PatternView, segments: Sequence[Segment]) -> PatternScore:
+        """Gets the PatternScore of a view, as calculate_scores_from_patterns would.
+
+        Args:
+            view (PatternView): The view to score. It must have segments.
+            segments (Sequence[Segment]): The segments the view indexes.
+
+        Returns:
+            PatternScore: The score of the view.
+        """
+        pattern = self._patterns[view.pattern_name]
+        pattern.segments = view_segments(view, segments)
+        return PatternScore(
+            pattern.pattern_name,
+            pattern.calc_pattern_difficulty(),
+            pattern.has_interval_segment,
+            pattern.total_notes,
+        )
+
+    def score_all(
+        self, views: Iterable[PatternView], segments: Sequence[Segment]
+    ) -> List[PatternScore]:
+        """Scores every view that has segments."""
+        return [self.score(view, segments) for view in views if view.spans]
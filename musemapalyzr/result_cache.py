@@ -0,0 +1,188 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections import namedtuple
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+import config.logging_config as logging_config
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.utils import MapScore, Weighting
+
+logger = logging_config.logger
+
+RESULT_CACHE_PATH = "result_cache.sqlite"
+
+# Bump when a change to the analysis changes any map's scores, so no result from before it is used
+ENGINE_VERSION = 1
+
+DEFAULT_MAX_ENTRIES = 10000
+
+CacheStats = namedtuple("CacheStats", ["hits", "misses", "entries", "hit_rate"])
+
+# Bump when the table changes, the cache is then emptied
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE results (
+    content_hash TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    engine_version INTEGER NOT NULL,
+    weighting REAL NOT NULL,
+    difficulty REAL NOT NULL,
+    weighted_difficulty REAL NOT NULL,
+    density_curve BLOB NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (content_hash, config_hash, engine_version)
+);
+CREATE INDEX results_last_used ON results (last_used);
+"""
+
+
+def config_hash(settings: Optional[dict] = None) -> str:
+    """Gets a hash of the config values, the same however they are ordered or formatted.
+
+    Args:
+        settings (dict, optional): The config. Defaults to config/config.yaml.
+
+    Returns:
+        str: The hash.
+    """
+    if settings is None:
+        settings = dict(get_analysis_config().settings)
+    canonical = json.dumps(settings, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """A SQLite cache of each map's MapScore.
+
+    A result is keyed by the hash of the map's asset, the hash of the config it was scored with
+    and ENGINE_VERSION, so an edited asset, a config change or a new engine never gets a stale
+    result. Byte-identical assets share one result.
+
+    When there are more than max_entries results, the least recently used ones are evicted.
+    settings is the config the maps are scored with, config/config.yaml by default.
+
+    Attributes:
+        hits (int): How many results were found since the cache was opened.
+        misses (int): How many were not.
+    """
+
+    def __init__(
+        self,
+        db_path: str = RESULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        settings: Optional[dict] = None,
+    ):
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, not {max_entries}.")
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.config_hash = config_hash(settings)
+        self.hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(db_path)
+        self._create_schema()
+
+    def _create_schema(self):
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        if version == _SCHEMA_VERSION:
+            return
+        if version != 0:
+            logger.info(f"Emptying the result cache '{self.db_path}' (v{version})")
+        with self._connection:
+            self._connection.execute("DROP TABLE IF EXISTS results")
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_many(self, content_hashes: Iterable[str]) -> Dict[str, MapScore]:
+        """Gets the cached results of maps, and marks them as used.
+
+        Each hash counts once towards `hits` or `misses`.
+
+        Args:
+            content_hashes (Iterable[str]): The `asset_hash` of each map.
+
+        Returns:
+            Dict[str, MapScore]: The MapScore of each map that has one, by hash.
+        """
+        content_hashes = list(dict.fromkeys(content_hashes))
+        found: Dict[str, MapScore] = {}
+        # Within SQLite's limit on the number of parameters
+        for start in range(0, len(content_hashes), 500):
+            chunk = content_hashes[start : start + 500]
+            rows = self._connection.execute(
+                "SELECT content_hash, weighting, difficulty, weighted_difficulty, density_curve "
+                "FROM results WHERE config_hash = ? AND engine_version = ? "
+                f"AND content_hash IN ({', '.join('?' * len(chunk))})",
+                (self.config_hash, ENGINE_VERSION, *chunk),
+            )
+            for content_hash, weighting, difficulty, weighted_difficulty, density_curve in rows:
+                found[content_hash] = MapScore(
+                    Weighting(weighting, difficulty, weighted_difficulty),
+                    np.frombuffer(density_curve, dtype=np.float64).tolist(),
+                )
+
+        with self._connection:
+            self._connection.executemany(
+                "UPDATE results SET last_used = ? "
+                "WHERE content_hash = ? AND config_hash = ? AND engine_version = ?",
+                [(time.time_ns(), h, self.config_hash, ENGINE_VERSION) for h in found],
+            )
+        self.hits += len(found)
+        self.misses += len(content_hashes) - len(found)
+        return found
+
+    def put(self, content_hash: str, map_score: MapScore):
+        """Caches the result of a map, evicting the least recently used results if it is full.
+
+        Args:
+            content_hash (str): The `asset_hash` of the map.
+            map_score (MapScore): Its result.
+        """
+        weighting = map_score.weighting
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    content_hash,
+                    self.config_hash,
+                    ENGINE_VERSION,
+                    weighting.weighting,
+                    weighting.difficulty,
+                    weighting.weighted_difficulty,
+                    np.asarray(map_score.density_curve, dtype=np.float64).tobytes(),
+                    time.time_ns(),
+                ),
+            )
+            self._connection.execute(
+                "DELETE FROM results WHERE rowid IN "
+                "(SELECT rowid FROM results ORDER BY last_used LIMIT "
+                "max((SELECT COUNT(*) FROM results) - ?, 0))",
+                (self.max_entries,),
+            )
+
+    def __len__(self) -> int:
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM results").fetchone()
+        return count
+
+    def stats(self) -> CacheStats:
+        """Gets how often results were found since the cache was opened.
+
+        Returns:
+            CacheStats: The hits, misses, number of cached results, and the share of lookups
+                that were hits (0 before any lookup).
+        """
+        lookups = self.hits + self.misses
+        return CacheStats(self.hits, self.misses, len(self), self.hits / lookups if lookups else 0)
@@ -0,0 +1,105 @@
+from typing import Sequence
+
+import numpy as np
+
+from config.config import get_config
+from musemapalyzr.constants import DEFAULT_SAMPLE_RATE
+
+conf = get_config()
+
+# Subdivisions of a beat that notes are snapped to, coarsest first
+BEAT_SUBDIVISIONS = (1, 2, 3, 4, 6, 8, 12, 16)
+
+# Every subdivision in BEAT_SUBDIVISIONS lands on a whole tick
+TICKS_PER_BEAT = 48
+
+
+class TempoIndex:
+    """The beat grid of a map, built once from its tempo sections.
+
+    Each tempo section restarts the grid at its start sample. When several sections start on
+    the same sample, the last one wins. Notes before the first section are placed on the first
+    section's grid.
+
+    All the queries take a whole array of sample times and answer in one vectorised call.
+    """
+
+    def __init__(self, start_samples: Sequence[int], samples_per_beat: Sequence[float]):
+        start_samples = np.asarray(start_samples, dtype=np.int64)
+        samples_per_beat = np.asarray(samples_per_beat, dtype=np.float64)
+        if len(start_samples) == 0:
+            raise ValueError("A TempoIndex needs at least one tempo section.")
+        if start_samples.shape != samples_per_beat.shape:
+            raise ValueError(
+                f"Got {len(start_samples)} start samples for {len(samples_per_beat)} tempos."
+            )
+
+        order = np.argsort(start_samples, kind="stable")
+        self.start_samples: np.ndarray = start_samples[order]
+        self.samples_per_beat: np.ndarray = samples_per_beat[order]
+
+        # The tick each section starts on, so ticks keep counting up across sections
+        section_ticks = np.rint(
+            np.diff(self.start_samples) / self.samples_per_beat[:-1] * TICKS_PER_BEAT
+        ).astype(np.int64)
+        self.start_ticks: np.ndarray = np.concatenate(([0], np.cumsum(section_ticks)))
+
+    def section_indices(self, sample_times) -> np.ndarray:
+        """Gets the index of the tempo section each sample time is in."""
+        indices = np.searchsorted(self.start_samples, sample_times, side="right") - 1
+        return np.maximum(indices, 0)
+
+    def beats(self, sample_times) -> np.ndarray:
+        """Gets how many beats each sample time is after the start of its tempo section."""
+        sample_times = np.asarray(sample_times)
+        indices = self.section_indices(sample_times)
+        return (sample_times - self.start_samples[indices]) / self.samples_per_beat[indices]
+
+    def ticks(self, sample_times) -> np.ndarray:
+        """Rounds each sample time to the nearest tick (1/TICKS_PER_BEAT of a beat).
+
+        Notes on any grid in BEAT_SUBDIVISIONS land exactly on a tick, so the difference
+        between two notes' ticks is their grid-aligned interval.
+        """
+        sample_times = np.asarray(sample_times)
+        indices = self.section_indices(sample_times)
+        local_beats = (sample_times - self.start_samples[indices]) / self.samples_per_beat[indices]
+        return self.start_ticks[indices] + np.rint(local_beats * TICKS_PER_BEAT).astype(np.int64)
+
+    def snap_divisors(
+        self, sample_times, tolerance_ms: float = None, sample_rate: int = DEFAULT_SAMPLE_RATE
+    ) -> np.ndarray:
+        """Classifies the snap of each sample time.
+
+        The snap is given as a note value like in Koreographer: 4 is on a beat (1/4),
+        8 on a half beat (1/8), 12 on a third of a beat (1/12), 16 on a quarter beat (1/16)...
+        The coarsest snap within tolerance wins. Sample times on none of the
+        BEAT_SUBDIVISIONS grids are 0.
+
+        Args:
+            sample_times: The sample times to classify.
+            tolerance_ms (float, optional): How far off a grid line a note can be.
+                Defaults to the segment_tolerance_ms config.
+            sample_rate (int, optional): The sample rate of the map. Defaults to DEFAULT_SAMPLE_RATE.
+
+        Returns:
+            np.ndarray: The snap of each sample time.
+        """
+        if tolerance_ms is None:
+            tolerance_ms = conf["segment_tolerance_ms"]
+        tolerance_samples = tolerance_ms * sample_rate / 1000
+
+        sample_times = np.asarray(sample_times)
+        indices = self.section_indices(sample_times)
+        samples_per_beat = self.samples_per_beat[indices]
+        local_beats = (sample_times - self.start_samples[indices]) / samples_per_beat
+
+        snaps = np.zeros(len(sample_times), dtype=np.int64)
+        for subdivision in BEAT_SUBDIVISIONS:
+            grid_positions = local_beats * subdivision
+            off_grid_samples = (
+                np.abs(grid_positions - np.rint(grid_positions)) * samples_per_beat / subdivision
+            )
+            on_grid = (snaps == 0) & (off_grid_samples <= tolerance_samples)
+            snaps[on_grid] = 4 * subdivision
+        return snaps
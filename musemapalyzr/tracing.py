@@ -0,0 +1,115 @@
+"""Structured tracing of the analysis hot paths.
+
+Tracing is off unless a TraceSink is installed with `trace_to`. Every place that traces checks
+
+    if __debug__ and tracing.sink is not None:
+        tracing.sink.emit(SomeEvent(...))
+
+so with tracing off the hot paths only test `sink`, and build no event, string or list. Under
+`python -O` the check is compiled out altogether (and nothing can be traced).
+
+With a sink installed, they emit the typed events below instead of free-text log lines, and the
+sink can be queried for them:
+
+    with trace_to() as sink:
+        calculate_difficulty(notes)
+    sink.query(ScoreComponents, pattern_name=EVEN_CIRCLES)
+"""
+
+import contextlib
+from collections import namedtuple
+from typing import Iterator, List, Optional, Type
+
+import config.logging_config as logging_config
+
+logger = logging_config.logger
+
+# analyse_segments kept a segment
+SegmentFormed = namedtuple(
+    "SegmentFormed", ["index", "kind", "note_count", "time_difference", "first_sample"]
+)
+# A group with segments rejected a segment and stopped growing
+GroupRejected = namedtuple("GroupRejected", ["pattern_name", "segment_index", "segment_count"])
+# A Pattern was identified, as the spans of its segments, when the segment at segment_index
+# ended it
+PatternAppended = namedtuple("PatternAppended", ["pattern_name", "spans", "segment_index"])
+# The identified Patterns were merged into the final ones
+PatternsMerged = namedtuple("PatternsMerged", ["pattern_count", "merged_count"])
+# A variation score's entropy, from the counts of what it told apart
+EntropyCalculated = namedtuple("EntropyCalculated", ["pattern_name", "counts", "entropy"])
+# A variation score's entropy was debuffed, for "interval" or "switch" segments
+EntropyDebuffed = namedtuple("EntropyDebuffed", ["pattern_name", "reason", "debuff"])
+# calc_pattern_difficulty's parts and result
+ScoreComponents = namedtuple(
+    "ScoreComponents",
+    ["pattern_name", "variation_multiplier", "pattern_multiplier", "score"],
+)
+# apply_multiplier_to_pattern_chunk multiplied a chunk of PatternScores
+ChunkMultiplied = namedtuple("ChunkMultiplied", ["pattern_count", "total_notes", "multiplier"])
+
+
+class TraceSink:
+    """Keeps every traced event, in order.
+
+    Attributes:
+        events (List[tuple]): The events emitted so far.
+    """
+
+    def __init__(self):
+        self.events: List[tuple] = []
+
+    def emit(self, event: tuple):
+        self.events.append(event)
+
+    def query(self, event_type: Optional[Type[tuple]] = None, **fields) -> List[tuple]:
+        """Gets the events of a type whose fields have the given values.
+
+        Args:
+            event_type (Type[tuple], optional): The event type, e.g. ScoreComponents. Defaults to
+                events of any type.
+            **fields: The values the events' fields must have.
+
+        Returns:
+            List[tuple]: The matching events, in order.
+        """
+        return [
+            event
+            for event in self.events
+            if (event_type is None or type(event) is event_type)
+            and all(getattr(event, name, None) == value for name, value in fields.items())
+        ]
+
+    def clear(self):
+        self.events.clear()
+
+
+class LoggingTraceSink(TraceSink):
+    """A TraceSink that also writes each event to the debug log."""
+
+    def emit(self, event: tuple):
+        super().emit(event)
+        logger.debug(repr(event))
+
+
+# The installed sink. None while tracing is off.
+sink: Optional[TraceSink] = None
+
+
+@contextlib.contextmanager
+def trace_to(trace_sink: Optional[TraceSink] = None) -> Iterator[TraceSink]:
+    """Installs a sink for the events traced inside the with block.
+
+    Args:
+        trace_sink (TraceSink, optional): The sink. Defaults to a new TraceSink.
+
+    Yields:
+        TraceSink: The installed sink.
+    """
+    global sink
+    if trace_sink is None:
+        trace_sink = TraceSink()
+    previous, sink = sink, trace_sink
+    try:
+        yield trace_sink
+    finally:
+        sink = previous
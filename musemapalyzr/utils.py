@@ -1,24 +1,44 @@
 from collections import namedtuple
-from typing import List, Optional, Tuple
+from typing import List, Optional, Tuple, Union
 
-from config.config import get_config
+import numpy as np
+
+from musemapalyzr import tracing
+from musemapalyzr.analysis_config import AnalysisConfig, get_analysis_config
 from musemapalyzr.constants import (
     DEFAULT_SAMPLE_RATE,
     LONG_INTERVAL,
     MED_INTERVAL,
-    OTHER,
+    N_STACK_BY_NOTE_COUNT,
+    OTHER_SEGMENT,
     SHORT_INTERVAL,
     SINGLE_STREAMS,
+    STREAM_LIKE_MASK,
     SWITCH,
     ZIG_ZAG,
 )
-from musemapalyzr.entities import Note, Segment
+from musemapalyzr.entities import Note, NoteArray, Segment
+from musemapalyzr.tracing import SegmentFormed
 
-conf = get_config()
 PatternScore = namedtuple("PatternScore", ["pattern_name", "score", "has_interval", "total_notes"])
 
 Weighting = namedtuple("Weighting", ["weighting", "difficulty", "weighted_difficulty"])
 
+# The Weighting of a map and its note density moving averages (one per sample window)
+MapScore = namedtuple("MapScore", ["weighting", "density_curve"])
+
+# Below this many values, weighted_average_of_values is faster in plain Python
+_MIN_VECTORISED_VALUES = 256
+
+# Engines analyse_segments can detect segments with
+PYTHON_ENGINE = "python"
+VECTORISED_ENGINE = "numpy"
+
+# The n-stack kind of a SINGLE_STREAMS segment, indexed by its note count
+_N_STACK_KINDS = np.array(
+    [OTHER_SEGMENT] * 2 + [N_STACK_BY_NOTE_COUNT[count] for count in range(2, 5)]
+)
+
 
 def moving_average_note_density(sections: List[List[Note]], window_size: int):
     num_sections = len(sections)
@@ -36,25 +56,32 @@ def moving_average_note_density(sections: List[List[Note]], window_size: int):
 
 
 def create_sections(
-    notes: List[Note], section_threshold_seconds=1, sample_rate: int = DEFAULT_SAMPLE_RATE
-) -> List[List[Note]]:
+    notes: Union[List[Note], NoteArray],
+    section_threshold_seconds=1,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+) -> Union[List[List[Note]], List[NoteArray]]:
     """Creates sections of section_threshold_seconds length to help with calculating
     density over the course of a map.
 
     Args:
-        notes (List[Note]): The list of notes from a map
+        notes (Union[List[Note], NoteArray]): The notes from a map
         section_threshold_seconds (int, optional): The length of the sections in seconds. Defaults to 1.
         sample_rate (int, optional): The sample rate of the map. Defaults to DEFAULT_SAMPLE_RATE.
 
     Returns:
-        _type_: _description_
+        Union[List[List[Note]], List[NoteArray]]: The notes in each section. A NoteArray is
+            split into views of itself.
     """
     section_threshold = section_threshold_seconds * sample_rate
+
+    if isinstance(notes, NoteArray):
+        return _create_note_array_sections(notes, section_threshold)
+
     song_start_samples = min(note.sample_time for note in notes)
     song_duration_samples = max(note.sample_time for note in notes)
 
-    # First, sort the notes by sample_time
-    notes.sort(key=lambda x: x.sample_time)
+    # First, sort the notes by sample_time, leaving the caller's list alone
+    notes = sorted(notes, key=lambda x: x.sample_time)
 
     # Calculate the number of sections based on song_duration_samples and section_threshold
     num_sections = int(
@@ -73,11 +100,27 @@ def create_sections(
     return sections
 
 
+def _create_note_array_sections(notes: NoteArray, section_threshold) -> List[NoteArray]:
+    # NoteArrays are already sorted, so each section boundary can be binary searched
+    song_start_samples = notes.sample_times[0]
+    song_duration_samples = notes.sample_times[-1]
+    num_sections = int(
+        (song_duration_samples - song_start_samples + section_threshold) // section_threshold
+    )
+    boundaries = song_start_samples + np.arange(1, num_sections) * section_threshold
+    splits = np.searchsorted(notes.sample_times, boundaries, side="left").tolist()
+
+    return [notes[start:end] for start, end in zip([0] + splits, splits + [len(notes)])]
+
+
 def weighted_average_of_values(values, top_percentage=0.3, top_weight=0.7, bottom_weight=0.3):
     """Calculates the weighted average of a list of values.
 
+    The threshold is found by selection rather than a full sort, and every value at or above it
+    is a top value. Short lists, like the multipliers of one Other pattern, skip numpy.
+
     Args:
-        values (list): A list of numerical values.
+        values (list): A list (or array) of numerical values.
         top_percentage (float): The percentage of values that are considered "top" values. Default is 0.3.
         top_weight (float): The weight given to top values. Default is 0.7.
         bottom_weight (float): The weight given to non-top values. Default is 0.3.
@@ -88,85 +131,188 @@ def weighted_average_of_values(values, top_percentage=0.3, top_weight=0.7, botto
     Raises:
         ValueError: If the input list 'values' is empty.
     """
-    if not values:
+    if len(values) == 0:
         raise ValueError("The input list 'values' cannot be empty.")
+    if len(values) < _MIN_VECTORISED_VALUES:
+        return _weighted_average_of_few_values(values, top_percentage, top_weight, bottom_weight)
+    values = np.asarray(values, dtype=np.float64)
+
+    # Find the threshold that separates the top 30% highest densities from the rest. It is the
+    # threshold_index-th highest value, which is the (n - 1 - threshold_index)-th lowest.
+    threshold_index = min(int(len(values) * (1 - top_percentage)), len(values) - 1)
+    kth = len(values) - 1 - threshold_index
+    threshold = np.partition(values, kth)[kth]
+
+    # Calculate the weighted average. cumsum adds left to right, so it rounds exactly like
+    # summing the values one by one.
+    weights = np.where(values >= threshold, top_weight, bottom_weight)
+    weighted_sum = np.cumsum(values * weights)[-1]
+    total_weight = np.cumsum(weights)[-1]
+
+    weighted_average = weighted_sum / total_weight
+    return float(weighted_average)
+
 
-    # Find the threshold that separates the top 30% highest densities from the rest
+def _weighted_average_of_few_values(values, top_percentage, top_weight, bottom_weight) -> float:
     moving_averages_sorted = sorted(values, reverse=True)
 
-    threshold_index = int(len(values) * (1 - top_percentage))
-    if threshold_index >= len(moving_averages_sorted):
-        threshold_index = len(moving_averages_sorted) - 1
+    threshold_index = min(int(len(values) * (1 - top_percentage)), len(values) - 1)
     threshold = moving_averages_sorted[threshold_index]
 
-    # Calculate the weighted average
     total_weight = 0
     weighted_sum = 0
-
     for avg in values:
-        if avg >= threshold:
-            weight = top_weight
-        else:
-            weight = bottom_weight
-
+        weight = top_weight if avg >= threshold else bottom_weight
         weighted_sum += avg * weight
         total_weight += weight
 
-    weighted_average = weighted_sum / total_weight
-    return weighted_average
+    return weighted_sum / total_weight
+
+
+def weighted_averages_of_values(
+    value_lists, top_percentage=0.3, top_weight=0.7, bottom_weight=0.3
+) -> np.ndarray:
+    """Calculates `weighted_average_of_values` for many lists of values at once.
+
+    The lists are padded into one matrix whose rows are sorted in a single call (selecting a
+    different rank in every row costs more than sorting them all). The weighted sums are then
+    taken along the rows, so each average is exactly the one `weighted_average_of_values`
+    gives.
+
+    Args:
+        value_lists (Iterable[list]): The lists of values, of any lengths.
+        top_percentage (float): The percentage of values that are considered "top" values. Default is 0.3.
+        top_weight (float): The weight given to top values. Default is 0.7.
+        bottom_weight (float): The weight given to non-top values. Default is 0.3.
+
+    Returns:
+        np.ndarray: The weighted average of each list.
+
+    Raises:
+        ValueError: If any of the lists is empty.
+    """
+    value_lists = [np.asarray(values, dtype=np.float64) for values in value_lists]
+    if not value_lists:
+        return np.zeros(0)
+    lengths = np.array([len(values) for values in value_lists])
+    if not lengths.all():
+        raise ValueError("The input lists of values cannot be empty.")
+
+    # Row i holds list i, padded with +inf so its own values are its lowest
+    rows = np.arange(len(value_lists))
+    in_list = np.arange(lengths.max()) < lengths[:, None]
+    values = np.full(in_list.shape, np.inf)
+    values[in_list] = np.concatenate(value_lists)
+
+    threshold_indexes = np.minimum((lengths * (1 - top_percentage)).astype(np.int64), lengths - 1)
+    kths = lengths - 1 - threshold_indexes
+    thresholds = np.sort(values, axis=1)[rows, kths]
+
+    weights = np.where(values >= thresholds[:, None], top_weight, bottom_weight)
+    weights[~in_list] = 0
+    values[~in_list] = 0
+    # Padding adds zeros after each list's own values, which leaves its sums unchanged
+    weighted_sums = np.cumsum(values * weights, axis=1)[:, -1]
+    total_weights = np.cumsum(weights, axis=1)[:, -1]
+    return weighted_sums / total_weights
 
 
 def get_next_segment_and_required_notes(
     prev_note: Note,
     note: Note,
     time_difference: int,
-    sample_rate: int = DEFAULT_SAMPLE_RATE,
-) -> Tuple[str, int]:
-    notes_per_second = sample_rate / time_difference
-
-    if notes_per_second >= conf["short_interval_nps"]:
-        if note.lane != prev_note.lane:
-            return ZIG_ZAG, 2
-        else:
-            return SINGLE_STREAMS, 2
-    elif notes_per_second < conf["long_interval_nps"]:
+    config: Optional[AnalysisConfig] = None,
+) -> Tuple[int, int]:
+    if config is None:
+        config = get_analysis_config()
+
+    if time_difference <= config.max_stream_time_difference:
+        if time_difference > 0:
+            if note.lane != prev_note.lane:
+                return ZIG_ZAG, 2
+            else:
+                return SINGLE_STREAMS, 2
+        if time_difference == 0:
+            raise ZeroDivisionError("Two consecutive notes have the same sample time.")
+        return LONG_INTERVAL, 0  # The notes are out of order
+    elif time_difference > config.max_med_interval_time_difference:
         return LONG_INTERVAL, 0
-    elif notes_per_second < conf["med_interval_nps"]:
+    elif time_difference > config.max_short_interval_time_difference:
         return MED_INTERVAL, 0
-    elif notes_per_second < conf["short_interval_nps"]:
-        return SHORT_INTERVAL, 0
     else:
-        return OTHER, 0
+        return SHORT_INTERVAL, 0
 
 
 def handle_current_segment(
     segments: List[Segment], current_segment: Optional[Segment]
 ) -> List[Segment]:
     if current_segment:
-        if current_segment.segment_name == OTHER:
+        if current_segment.kind == OTHER_SEGMENT:
             segments.append(current_segment)
         elif len(current_segment.notes) >= current_segment.required_notes:
-            if current_segment.segment_name == ZIG_ZAG and len(current_segment.notes) == 2:
-                current_segment.segment_name = SWITCH
-            elif current_segment.segment_name == SINGLE_STREAMS and len(current_segment.notes) < 5:
-                current_segment.segment_name = f"{len(current_segment.notes)}-Stack"
+            if current_segment.kind == ZIG_ZAG and len(current_segment.notes) == 2:
+                current_segment.kind = SWITCH
+            elif current_segment.kind == SINGLE_STREAMS and len(current_segment.notes) < 5:
+                current_segment.kind = N_STACK_BY_NOTE_COUNT[len(current_segment.notes)]
             segments.append(current_segment)
     return segments
 
 
-def analyse_segments(notes: List[Note], sample_rate: int = DEFAULT_SAMPLE_RATE):
+def analyse_segments(
+    notes: Union[List[Note], NoteArray],
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    engine: str = VECTORISED_ENGINE,
+    config: Optional[AnalysisConfig] = None,
+):
     """
-    Given a list of `Note` objects, detects segments in the sequence of notes and returns a list of `Segment` objects.
+    Given a sequence of notes, detects segments in the sequence of notes and returns a list of `Segment` objects.
 
     Args:
-        notes (List[Note]): A list of `Note` objects representing the sequence of notes to be analysed.
+        notes (Union[List[Note], NoteArray]): The sequence of notes to be analysed.
+        sample_rate (int, optional): The sample rate of the map. Defaults to DEFAULT_SAMPLE_RATE.
+        engine (str, optional): VECTORISED_ENGINE or PYTHON_ENGINE. Both detect the exact same
+            segments. Defaults to VECTORISED_ENGINE.
+        config (AnalysisConfig, optional): The compiled config. Defaults to the config compiled
+            for sample_rate.
 
     Returns:
         A list of `Segment` objects, each representing a detected segment in the sequence of notes.
     """
+    if config is None:
+        config = get_analysis_config(sample_rate)
+    if engine == VECTORISED_ENGINE:
+        segments = _analyse_segments_vectorised(notes, config)
+    elif engine == PYTHON_ENGINE:
+        segments = _analyse_segments_python(notes, config)
+    else:
+        raise ValueError(f"Unknown segment engine '{engine}'.")
+
+    if __debug__ and tracing.sink is not None:
+        for index, segment in enumerate(segments):
+            tracing.sink.emit(
+                SegmentFormed(
+                    index,
+                    segment.kind,
+                    len(segment.notes),
+                    segment.time_difference,
+                    segment.notes[0].sample_time,
+                )
+            )
+    return segments
+
+
+def _analyse_segments_python(
+    notes: Union[List[Note], NoteArray], config: AnalysisConfig
+) -> List[Segment]:
+    """The `analyse_segments` loop, one pair of notes at a time."""
+
+    if isinstance(notes, NoteArray):
+        notes = notes.to_notes()
+
     segments = []
     current_segment = None
-    tolerance = conf["segment_tolerance_ms"] * sample_rate / 1000  # 10ms in sample time
+    sample_rate = config.sample_rate
+    tolerance = config.segment_tolerance  # 10ms in sample time
 
     for i in range(1, len(notes)):  # Starts at second note
         prev_note = notes[i - 1]
@@ -174,13 +320,13 @@ def analyse_segments(notes: List[Note], sample_rate: int = DEFAULT_SAMPLE_RATE):
 
         time_difference = note.sample_time - prev_note.sample_time
 
-        # Get the name of the next segment and the notes required to complete it
-        next_segment_name, next_required_notes = get_next_segment_and_required_notes(
-            prev_note, note, time_difference
+        # Get the kind of the next segment and the notes required to complete it
+        next_segment_kind, next_required_notes = get_next_segment_and_required_notes(
+            prev_note, note, time_difference, config
         )
 
         # If the current pair of notes belongs to the same segment as the previous pair of notes
-        if current_segment and current_segment.segment_name == next_segment_name:
+        if current_segment and current_segment.kind == next_segment_kind:
             base_time_difference = (
                 current_segment.notes[1].sample_time - current_segment.notes[0].sample_time
             )
@@ -191,7 +337,7 @@ def analyse_segments(notes: List[Note], sample_rate: int = DEFAULT_SAMPLE_RATE):
             else:  # The time difference between the current pair of notes is not within the tolerance of the base time difference of the current segmen
                 segments = handle_current_segment(segments, current_segment)
                 current_segment = Segment(
-                    next_segment_name,
+                    next_segment_kind,
                     [prev_note, note],
                     required_notes=next_required_notes,
                     time_difference=time_difference,
@@ -200,7 +346,7 @@ def analyse_segments(notes: List[Note], sample_rate: int = DEFAULT_SAMPLE_RATE):
         else:  # If the current pair of notes does not belong to the same segmen as the previous pair of notes
             segments = handle_current_segment(segments, current_segment)
             current_segment = Segment(
-                next_segment_name,
+                next_segment_kind,
                 [prev_note, note],
                 required_notes=next_required_notes,
                 time_difference=time_difference,
@@ -210,3 +356,88 @@ def analyse_segments(notes: List[Note], sample_rate: int = DEFAULT_SAMPLE_RATE):
     segments = handle_current_segment(segments, current_segment)
 
     return segments
+
+
+def _analyse_segments_vectorised(
+    notes: Union[List[Note], NoteArray], config: AnalysisConfig
+) -> List[Segment]:
+    """The array version of the `analyse_segments` loop.
+
+    Each pair of consecutive notes is classified at once, then runs of the same kind are split
+    wherever a pair's time difference leaves the tolerance of its segment's first pair. Only
+    runs with such a break are walked segment by segment.
+
+    The Segments of a NoteArray hold views of it, so no Note is created for them.
+    """
+    if isinstance(notes, NoteArray):
+        lanes, sample_times = notes.lanes, notes.sample_times
+    else:
+        lanes = np.array([note.lane for note in notes], dtype=np.int64)
+        sample_times = np.array([note.sample_time for note in notes], dtype=np.int64)
+    if len(notes) < 2:
+        return []
+
+    time_differences = np.diff(sample_times)
+    if not time_differences.all():
+        raise ZeroDivisionError("Two consecutive notes have the same sample time.")
+    sample_rate = config.sample_rate
+    tolerance = config.segment_tolerance
+
+    # Like get_next_segment_and_required_notes
+    bands = np.digitize(
+        time_differences,
+        [
+            config.max_stream_time_difference + 1,
+            config.max_short_interval_time_difference + 1,
+            config.max_med_interval_time_difference + 1,
+        ],
+    )
+    kinds = np.array([SINGLE_STREAMS, SHORT_INTERVAL, MED_INTERVAL, LONG_INTERVAL])[bands]
+    kinds[time_differences < 0] = LONG_INTERVAL
+    kinds[(kinds == SINGLE_STREAMS) & (lanes[1:] != lanes[:-1])] = ZIG_ZAG
+
+    # Runs of pairs of the same kind, then the pairs that break their run's base time difference
+    run_starts = np.flatnonzero(np.concatenate(([True], kinds[1:] != kinds[:-1])))
+    run_ends = np.append(run_starts[1:], len(kinds))
+    run_of_pair = np.repeat(np.arange(len(run_starts)), run_ends - run_starts)
+    breaks = np.abs(time_differences - time_differences[run_starts][run_of_pair]) > tolerance
+
+    segment_starts = run_starts.tolist()
+    for run in np.unique(run_of_pair[breaks]).tolist():
+        start, end = segment_starts[run], int(run_ends[run])
+        base_time_difference = None
+        for pair, time_difference in enumerate(time_differences[start:end].tolist(), start):
+            if base_time_difference is None:
+                base_time_difference = time_difference
+            elif abs(time_difference - base_time_difference) > tolerance:
+                segment_starts.append(pair)
+                base_time_difference = time_difference
+    starts = np.sort(np.array(segment_starts, dtype=np.int64))
+    ends = np.append(starts[1:], len(kinds))
+
+    # handle_current_segment as masks
+    note_counts = ends - starts + 1
+    segment_kinds = kinds[starts]
+    required_notes = np.where(segment_kinds & STREAM_LIKE_MASK, 2, 0)
+    is_switch = (segment_kinds == ZIG_ZAG) & (note_counts == 2)
+    is_n_stack = (segment_kinds == SINGLE_STREAMS) & (note_counts < 5)
+    segment_kinds[is_switch] = SWITCH
+    segment_kinds[is_n_stack] = _N_STACK_KINDS[note_counts[is_n_stack]]
+    kept = note_counts >= required_notes
+
+    return [
+        Segment(
+            kind,
+            notes[start : end + 1],
+            required_notes=required,
+            time_difference=time_difference,
+            sample_rate=sample_rate,
+        )
+        for kind, start, end, required, time_difference in zip(
+            segment_kinds[kept].tolist(),
+            starts[kept].tolist(),
+            ends[kept].tolist(),
+            required_notes[kept].tolist(),
+            time_differences[starts[kept]].tolist(),
+        )
+    ]
@@ -0,0 +1,141 @@
+import os
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+from config.config import CONFIG_PATH
+
+# How often the directory is scanned
+DEFAULT_POLL_INTERVAL = 1.0
+# How long changes must stop for before they are handled
+DEFAULT_DEBOUNCE_SECS = 2.0
+
+# The .asset filenames added or modified, and removed, and whether the config file changed
+ChangeSet = namedtuple("ChangeSet", ["changed", "removed", "config_changed"])
+
+# (size, mtime_ns) of a file
+_FileStat = Tuple[int, int]
+
+
+def merge_changes(earlier: ChangeSet, later: ChangeSet) -> ChangeSet:
+    """Combines two ChangeSets into the one change from before `earlier` to after `later`.
+
+    A map changed and then removed is removed, and one removed and then added again is changed.
+
+    Args:
+        earlier (ChangeSet): The first changes.
+        later (ChangeSet): The changes after them.
+
+    Returns:
+        ChangeSet: The combined changes, with the filenames sorted.
+    """
+    changed = (set(earlier.changed) - set(later.removed)) | set(later.changed)
+    removed = (set(earlier.removed) - set(later.changed)) | set(later.removed)
+    return ChangeSet(
+        sorted(changed), sorted(removed), earlier.config_changed or later.config_changed
+    )
+
+
+class MapWatcher:
+    """Watches a data directory's .asset files and the config file for changes.
+
+    Each scan compares the size and mtime of every file with the previous scan, like
+    `MapCatalog.refresh`, so it works the same on every platform and file system.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        config_path: str = CONFIG_PATH,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        debounce_secs: float = DEFAULT_DEBOUNCE_SECS,
+    ):
+        self.data_dir = data_dir
+        self.config_path = config_path
+        self.poll_interval = poll_interval
+        self.debounce_secs = debounce_secs
+        self._assets = self._scan_assets()
+        self._config_stat = self._stat(config_path)
+
+    @property
+    def filenames(self) -> List[str]:
+        """The .asset filenames as of the last scan, sorted."""
+        return sorted(self._assets)
+
+    @staticmethod
+    def _stat(path: str) -> Optional[_FileStat]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _scan_assets(self) -> Dict[str, _FileStat]:
+        # A missing data directory has no maps, so removing it removes them all
+        assets = {}
+        try:
+            with os.scandir(self.data_dir) as dir_entries:
+                for dir_entry in dir_entries:
+                    if not dir_entry.name.endswith(".asset"):
+                        continue
+                    try:
+                        if not dir_entry.is_file():
+                            continue
+                        stat = dir_entry.stat()
+                    except OSError:
+                        # Removed while scanning
+                        continue
+                    assets[dir_entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        return assets
+
+    def poll(self) -> ChangeSet:
+        """Scans once for what changed since the last scan.
+
+        Returns:
+            ChangeSet: The changes, with the filenames sorted.
+        """
+        assets = self._scan_assets()
+        changed = sorted(name for name, stat in assets.items() if self._assets.get(name) != stat)
+        removed = sorted(name for name in self._assets if name not in assets)
+        config_stat = self._stat(self.config_path)
+        config_changed = config_stat != self._config_stat
+        self._assets = assets
+        self._config_stat = config_stat
+        return ChangeSet(changed, removed, config_changed)
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Optional[ChangeSet]:
+        """Waits for changes, then until there have been none for `debounce_secs`.
+
+        A burst of changes, like a map being exported or many maps being copied in, comes back
+        as one ChangeSet, once the files have stopped changing.
+
+        Args:
+            timeout (float, optional): How long to wait for the first change. Defaults to
+                waiting forever.
+
+        Returns:
+            Optional[ChangeSet]: Every change in the burst, or None if there was none before the
+                timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changes = self.poll()
+        while not _has_changes(changes):
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+            changes = self.poll()
+
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < self.debounce_secs:
+            time.sleep(min(self.poll_interval, self.debounce_secs))
+            later = self.poll()
+            if _has_changes(later):
+                changes = merge_changes(changes, later)
+                quiet_since = time.monotonic()
+        return changes
+
+
+def _has_changes(changes: ChangeSet) -> bool:
+    return bool(changes.changed or changes.removed or changes.config_changed)
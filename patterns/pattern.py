@@ -1,24 +1,197 @@
-from typing import Dict, List, Optional
+import collections
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 
 import config.logging_config as logging_config
-from config.config import get_config
+from musemapalyzr import tracing
+from musemapalyzr.analysis_config import AnalysisConfig, get_analysis_config
 from musemapalyzr.constants import (
     DEFAULT_SAMPLE_RATE,
-    FOUR_STACK,
-    LONG_INTERVAL,
-    MED_INTERVAL,
-    SHORT_INTERVAL,
-    SINGLE_STREAMS,
-    SLOW_STRETCH,
+    INTERVAL_MASK,
+    N_STACK_MASK,
     SWITCH,
-    THREE_STACK,
-    TWO_STACK,
-    ZIG_ZAG,
 )
 from musemapalyzr.entities import Segment
+from musemapalyzr.tracing import EntropyDebuffed, ScoreComponents
 
 logger = logging_config.logger
-conf = get_config()
+
+
+class PatternSegments(list):
+    """The segments of a Pattern, with aggregates kept up to date as segments are appended.
+
+    Appending or extending updates the aggregates with the new segments only. Any other change
+    to the list counts every segment again.
+
+    Attributes:
+        n_stack_count (int): The number of n-stack segments.
+        interval_count (int): The number of interval segments.
+        kind_counts (Counter): The number of segments of each kind, in order of first appearance.
+        kind_note_counts (Counter): The number of segments of each kind and note count, in order
+            of first appearance.
+        note_count (int): The number of notes with a unique sample time.
+        lane_counts (Counter): The number of notes with a unique sample time in each lane.
+        first_sample (Optional[int]): The earliest sample time of any note.
+        last_sample (Optional[int]): The latest sample time of any note.
+    """
+
+    __slots__ = (
+        "interval_debuffs",
+        "end_extra_debuff",
+        "n_stack_count",
+        "interval_count",
+        "kind_counts",
+        "kind_note_counts",
+        "note_count",
+        "lane_counts",
+        "first_sample",
+        "last_sample",
+        "_sample_times",
+        "_first_indices",
+        "_first_interval_after_start",
+        "_settled_interval_debuffs",
+    )
+
+    def __init__(
+        self,
+        segments: Iterable[Segment] = (),
+        interval_debuffs: Optional[Mapping[int, float]] = None,
+        end_extra_debuff: float = 1,
+    ):
+        super().__init__()
+        self.interval_debuffs = interval_debuffs if interval_debuffs is not None else {}
+        self.end_extra_debuff = end_extra_debuff
+        self._clear_aggregates()
+        self.extend(segments)
+
+    def _clear_aggregates(self):
+        self.n_stack_count = 0
+        self.interval_count = 0
+        self.kind_counts = collections.Counter()
+        self.kind_note_counts = collections.Counter()
+        self.note_count = 0
+        self.lane_counts = collections.Counter()
+        self.first_sample = None
+        self.last_sample = None
+        self._sample_times = set()
+        # The index each kind first appears at, and of the first interval after the first segment
+        self._first_indices = {}
+        self._first_interval_after_start = None
+        # The sum of the interval debuffs of every segment but the last, in order
+        self._settled_interval_debuffs = 0
+
+    def _count(self, segment: Segment):
+        index = len(self)
+        kind = segment.kind
+        if index > 0:
+            # The segment that was last is now between two segments, unless it is the first
+            previous = self[-1]
+            if previous.kind & INTERVAL_MASK:
+                debuff = self.interval_debuffs[previous.kind]
+                if index == 1:
+                    debuff *= self.end_extra_debuff
+                self._settled_interval_debuffs += debuff
+
+        if kind & N_STACK_MASK:
+            self.n_stack_count += 1
+        elif kind & INTERVAL_MASK:
+            self.interval_count += 1
+            if index > 0 and self._first_interval_after_start is None:
+                self._first_interval_after_start = index
+        if kind not in self._first_indices:
+            self._first_indices[kind] = index
+        self.kind_counts[kind] += 1
+        self.kind_note_counts[(kind, len(segment.notes))] += 1
+
+        sample_times = self._sample_times
+        for note in segment.notes:
+            sample_time = note.sample_time
+            if sample_time not in sample_times:
+                sample_times.add(sample_time)
+                self.lane_counts[note.lane] += 1
+                if self.first_sample is None or sample_time < self.first_sample:
+                    self.first_sample = sample_time
+                if self.last_sample is None or sample_time > self.last_sample:
+                    self.last_sample = sample_time
+        self.note_count = len(sample_times)
+
+    def _recount(self):
+        segments = list(self)
+        super().clear()
+        self._clear_aggregates()
+        self.extend(segments)
+
+    def append(self, segment: Segment):
+        self._count(segment)
+        super().append(segment)
+
+    def extend(self, segments: Iterable[Segment]):
+        for segment in segments:
+            self.append(segment)
+
+    def __iadd__(self, segments: Iterable[Segment]):
+        self.extend(segments)
+        return self
+
+    def _recounted(method):
+        def recounted(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            self._recount()
+            return result
+
+        return recounted
+
+    insert = _recounted(list.insert)
+    pop = _recounted(list.pop)
+    remove = _recounted(list.remove)
+    clear = _recounted(list.clear)
+    sort = _recounted(list.sort)
+    reverse = _recounted(list.reverse)
+    __setitem__ = _recounted(list.__setitem__)
+    __delitem__ = _recounted(list.__delitem__)
+    __imul__ = _recounted(list.__imul__)
+    del _recounted
+
+    def __reduce__(self):
+        return self.__class__, (list(self), dict(self.interval_debuffs), self.end_extra_debuff)
+
+    def first_segment_outside(self, kind_mask: int) -> Optional[Segment]:
+        """Gets the first segment whose kind is not in kind_mask, if any."""
+        if all(kind & kind_mask for kind in self.kind_counts):
+            return None
+        return next(segment for segment in self if not segment.kind & kind_mask)
+
+    def kind_entropy_counts(self) -> List[int]:
+        """The counts `DefaultCalcVariationScore` takes the entropy of, in the same order.
+
+        Intervals at either end are left out, and every other interval counts as one kind.
+        """
+        inner_intervals = self.interval_count
+        if len(self) > 0 and self[0].kind & INTERVAL_MASK:
+            inner_intervals -= 1
+        if len(self) > 1 and self[-1].kind & INTERVAL_MASK:
+            inner_intervals -= 1
+
+        counts = []
+        for kind, count in self.kind_counts.items():
+            if kind & INTERVAL_MASK:
+                continue
+            if inner_intervals and self._first_indices[kind] > self._first_interval_after_start:
+                counts.append(inner_intervals)
+                inner_intervals = 0
+            counts.append(count)
+        if inner_intervals:
+            counts.append(inner_intervals)
+        return counts
+
+    def interval_debuff_total(self) -> Tuple[float, int]:
+        """The sum and number of the interval debuffs `DefaultCalcVariationScore` averages.
+
+        Intervals at either end also get the extra end debuff.
+        """
+        total = self._settled_interval_debuffs
+        if len(self) > 0 and self[-1].kind & INTERVAL_MASK:
+            total += self.interval_debuffs[self[-1].kind] * self.end_extra_debuff
+        return total, self.interval_count
 
 
 class Pattern:
@@ -29,26 +202,27 @@ class Pattern:
         start_sample: int = None,
         end_sample: int = None,
         sample_rate: int = DEFAULT_SAMPLE_RATE,
+        config: Optional[AnalysisConfig] = None,
     ):
+        if config is None:
+            config = get_analysis_config(sample_rate)
         self.pattern_name = pattern_name
-        self.segments = segments
         self.start_sample = start_sample
         self.end_sample = end_sample
         self.is_active = True
 
-        self.sample_rate = sample_rate
-        self.tolerance = conf["pattern_tolerance_ms"] * sample_rate // 1000
+        self.config = config
+        self.sample_rate = config.sample_rate
+        self.tolerance = config.pattern_tolerance
 
-        self.variation_weighting = conf["default_variation_weighting"]
-        self.pattern_weighting = conf["default_pattern_weighting"]
+        self.variation_weighting = config.default_variation_weighting
+        self.pattern_weighting = config.default_pattern_weighting
 
-        self.intervals = {
-            SHORT_INTERVAL: conf["short_int_debuff"],
-            MED_INTERVAL: conf["med_int_debuff"],
-            LONG_INTERVAL: conf["long_int_debuff"],
-        }
+        self.intervals = config.interval_debuffs
 
-        self.end_extra_debuff = conf["extra_int_end_debuff"]
+        self.end_extra_debuff = config.extra_int_end_debuff
+
+        self.segments = segments
 
         # Use composition to add functionality
         self.check_segment_strategy = None
@@ -57,37 +231,32 @@ class Pattern:
         self.calc_pattern_multiplier_strategy = None
         self.calc_pattern_length_multiplier_strategy = None
 
-        self._total_notes = None
+    @property
+    def segments(self) -> PatternSegments:
+        return self._segments
+
+    @segments.setter
+    def segments(self, segments: Iterable[Segment]):
+        # A PatternSegments is kept as is, so `segments += ...` does not count every segment again
+        if not isinstance(segments, PatternSegments):
+            segments = PatternSegments(segments, self.intervals, self.end_extra_debuff)
+        self._segments = segments
 
     @property
-    def total_notes(self):
-        if self._total_notes:
-            return self._total_notes
-        count = 0
-        unique_timestamps = set()
-        for segment in self.segments:
-            for note in segment.notes:
-                if note.sample_time not in unique_timestamps:
-                    count += 1
-                    unique_timestamps.add(note.sample_time)
-
-        self._total_notes = count
-        return self._total_notes
+    def total_notes(self) -> int:
+        return self.segments.note_count
 
     @property
-    def has_interval_segment(self):
-        for seg in self.segments:
-            if "Interval" in seg.segment_name:
-                return True
-        return False
+    def has_interval_segment(self) -> bool:
+        return self.segments.interval_count > 0
 
     # General helper methods
     def is_n_stack(self, segment: Segment):
-        return segment.segment_name in ("2-Stack", "3-Stack", "4-Stack")
+        return segment.kind & N_STACK_MASK != 0
 
     def segment_is_interval(self, segment: Segment):
         if segment:
-            return "Interval" in segment.segment_name
+            return segment.kind & INTERVAL_MASK != 0
         return False
 
     def time_difference_is_tolerable(self, previous_segment: Segment, current_segment: Segment):
@@ -157,23 +326,10 @@ class Pattern:
             self.segments.append(interval_segment)
             return False
 
-    def _get_segment_type_counts(self, segment_names):
-        segment_counts = {
-            SWITCH: 0,
-            ZIG_ZAG: 0,
-            TWO_STACK: 0,
-            THREE_STACK: 0,
-            FOUR_STACK: 0,
-            SINGLE_STREAMS: 0,
-            SHORT_INTERVAL: 0,
-            MED_INTERVAL: 0,
-            LONG_INTERVAL: 0,
-        }
-        for name in segment_names:
-            segment_counts[name] += 1
-        return segment_counts
-
-    def _calc_switch_debuff(self, segment_counts: Dict[str, int], entropy: float) -> float:
+    def _get_segment_type_counts(self, segment_kinds: Iterable[int]) -> Dict[int, int]:
+        return collections.Counter(segment_kinds)
+
+    def _calc_switch_debuff(self, segment_counts: Dict[int, int], entropy: float) -> float:
         """Looks at the number of switches with relation to how many segments there are.
 
         A low segment count (<4) such as [zig zag, switch, zig zag] will be debuffed
@@ -181,7 +337,7 @@ class Pattern:
         switch proportion results in less debuff.
 
         Args:
-            segment_counts (Dict[str: int]): The dictionary of segment type counts
+            segment_counts (Dict[int: int]): The dictionary of segment kind counts
             entropy (float): The current entropy value
 
         Returns:
@@ -205,26 +361,22 @@ class Pattern:
                     switch_debuff = (
                         0.9  # if there are more switches, then don't make the buff as hard
                     )
-            logger.debug(
-                f">>> Switch (proportion {switch_proportion}) debuff by {switch_debuff:.2f} <<<"
-            )
+            if __debug__ and tracing.sink is not None:
+                tracing.sink.emit(EntropyDebuffed(self.pattern_name, "switch", switch_debuff))
             entropy *= switch_debuff
         return entropy
 
     def calc_pattern_difficulty(self) -> float:
-        logger.debug(f"{self.pattern_name:.>25} {'Difficulty':.<25}")
         variation_multiplier = self.calc_variation_score()
         pattern_multiplier = self.calc_pattern_multiplier()
 
         final = (self.variation_weighting * variation_multiplier) + (
             self.pattern_weighting * pattern_multiplier
         )
-        if self.pattern_name == SLOW_STRETCH:
-            logger.debug(f"{'Segments:':>25} {self.segments}")
-
-        logger.debug(f"{'Variation Multiplier:':>25} {variation_multiplier}")
-        logger.debug(f"{'Pattern Multiplier:':>25} {pattern_multiplier}")
-        logger.debug(f"{'After Weighting:':>25} {final}")
+        if __debug__ and tracing.sink is not None:
+            tracing.sink.emit(
+                ScoreComponents(self.pattern_name, variation_multiplier, pattern_multiplier, final)
+            )
 
         return final
 
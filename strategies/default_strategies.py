@@ -1,9 +1,10 @@
-import collections
 import math
 from typing import Optional
 
 import config.logging_config as logging_config
+from musemapalyzr import tracing
 from musemapalyzr.entities import Segment
+from musemapalyzr.tracing import EntropyCalculated, EntropyDebuffed
 from strategies.pattern_strategies import (
     CalcPatternLengthMultiplierStrategy,
     CalcPatternMultiplierStrategy,
@@ -31,42 +32,31 @@ class DefaultCalcVariationScore(CalcVariationScoreStrategy):
         """
 
         # Thanks to ChatGPT for writing this for me
-        if len(self.pattern.segments) == 0:
+        segments = self.pattern.segments
+        if len(segments) == 0:
             return 0
-        temp_lst = [s.segment_name for s in self.pattern.segments]
-        interval_list = []
-        segment_names = []
-
-        pattern_counts = self.pattern._get_segment_type_counts(temp_lst)
-
-        # Check for intervals:
-        for i, name in enumerate(temp_lst):
-            if name in self.pattern.intervals:
-                if i == 0 or i == len(temp_lst) - 1:  # If it's the firs
-                    interval_list.append(
-                        self.pattern.intervals[name] * self.pattern.end_extra_debuff
-                    )
-                    # Don't add it to the list to check
-                else:
-                    interval_list.append(self.pattern.intervals[name])
-                    segment_names.append("Interval")  # Rename all Intervals to the same name
-            else:
-                segment_names.append(name)
-
-        logger.debug(f"Checking entropy of: {segment_names}")
-
-        n = len(segment_names)
-        freq = [count / n for count in collections.Counter(segment_names).values()]
+
+        # Intervals at either end are only debuffs, the others also count as one kind
+        kind_counts = segments.kind_entropy_counts()
+        interval_debuff_total, interval_count = segments.interval_debuff_total()
+
+        n = sum(kind_counts)
+        freq = [count / n for count in kind_counts]
         entropy = -sum(p * math.log2(p) for p in freq)
+        if __debug__ and tracing.sink is not None:
+            tracing.sink.emit(EntropyCalculated(self.pattern.pattern_name, kind_counts, entropy))
 
-        if len(interval_list) != 0:
+        if interval_count != 0:
             # average interval debuffs and multiply that by the entropy
-            average_debuff = sum(interval_list) / len(interval_list)
+            average_debuff = interval_debuff_total / interval_count
             entropy *= average_debuff
 
-            logger.debug(f">>> Debuffing (due to Intervals) by {average_debuff} <<<")
+            if __debug__ and tracing.sink is not None:
+                tracing.sink.emit(
+                    EntropyDebuffed(self.pattern.pattern_name, "interval", average_debuff)
+                )
 
-        entropy = self.pattern._calc_switch_debuff(pattern_counts, entropy)
+        entropy = self.pattern._calc_switch_debuff(segments.kind_counts, entropy)
 
         if entropy == 0:  # Temp?
             return 1
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from musemapalyzr.constants import SWITCH
+from musemapalyzr.constants import INTERVAL_MASK, N_STACK_MASK, SWITCH
 from musemapalyzr.entities import Segment
 from musemapalyzr.pattern_multipliers import even_circle_multiplier
 from strategies.default_strategies import DefaultCalcVariationScore
@@ -12,6 +12,8 @@ from strategies.pattern_strategies import (
     IsAppendableStrategy,
 )
 
+EVEN_CIRCLES_MASK = N_STACK_MASK | SWITCH
+
 
 class EvenCirclesCheckSegment(CheckSegmentStrategy):
     def check_segment(self, current_segment: Segment) -> Optional[bool]:
@@ -29,7 +31,7 @@ class EvenCirclesCheckSegment(CheckSegmentStrategy):
             return True
 
         # Check for invalid combinations of previous segment and current segment
-        if not self.pattern.is_n_stack(current_segment) and current_segment.segment_name != SWITCH:
+        if not current_segment.kind & EVEN_CIRCLES_MASK:
             return False
 
         if previous_segment:
@@ -38,12 +40,10 @@ class EvenCirclesCheckSegment(CheckSegmentStrategy):
                 self.pattern.segments.append(current_segment)
                 return True
 
-            if previous_segment.segment_name == SWITCH and not self.pattern.is_n_stack(
-                current_segment
-            ):
+            if previous_segment.kind == SWITCH and not current_segment.kind & N_STACK_MASK:
                 return False
 
-            if self.pattern.is_n_stack(previous_segment) and current_segment.segment_name != SWITCH:
+            if previous_segment.kind & N_STACK_MASK and current_segment.kind != SWITCH:
                 return False
 
             if not self.pattern.time_difference_is_tolerable(previous_segment, current_segment):
@@ -60,19 +60,13 @@ class EvenCirclesCheckSegment(CheckSegmentStrategy):
 
 class EvenCirclesIsAppendable(IsAppendableStrategy):
     def is_appendable(self) -> bool:
-        if len(self.pattern.segments) >= 3:
+        segments = self.pattern.segments
+        if len(segments) >= 3:
             # Sanity check that everything in it is only N-stacks or Switches
-            n_stack_count = 0
-            for p in self.pattern.segments:
-                if self.pattern.is_n_stack(p):
-                    n_stack_count += 1
-                if (
-                    not self.pattern.is_n_stack(p)
-                    and p.segment_name != SWITCH
-                    and not self.pattern.segment_is_interval(p)
-                ):
-                    raise ValueError(f"Even Circle has a: {p.segment_name}!!")
-            if n_stack_count >= 2:  # There must be at least 2 n_stacks to be valid
+            p = segments.first_segment_outside(N_STACK_MASK | SWITCH | INTERVAL_MASK)
+            if p is not None:
+                raise ValueError(f"Even Circle has a: {p.segment_name}!!")
+            if segments.n_stack_count >= 2:  # There must be at least 2 n_stacks to be valid
                 return True
         return False
 
@@ -90,5 +84,5 @@ class EvenCirclesCalcVariationScore(DefaultCalcVariationScore):
 class EvenCirclesCalcPatternMultiplier(CalcPatternMultiplierStrategy):
     def calc_pattern_multiplier(self) -> float:
         nps = self.pattern.segments[0].notes_per_second  # Even Circle should have consistent NPS
-        multiplier = even_circle_multiplier(nps)
+        multiplier = even_circle_multiplier(nps, *self.pattern.config.even_circle_curve)
         return multiplier
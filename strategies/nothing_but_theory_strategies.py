@@ -2,9 +2,11 @@ import math
 from typing import Optional
 
 import config.logging_config as logging_config
-from musemapalyzr.constants import SWITCH, ZIG_ZAG
+from musemapalyzr import tracing
+from musemapalyzr.constants import INTERVAL_MASK, N_STACK_MASK, ZIG_ZAG
 from musemapalyzr.entities import Segment
 from musemapalyzr.pattern_multipliers import nothing_but_theory_multiplier
+from musemapalyzr.tracing import EntropyCalculated
 from patterns.pattern import Pattern
 from strategies.pattern_strategies import (
     CalcPatternLengthMultiplierStrategy,
@@ -16,6 +18,8 @@ from strategies.pattern_strategies import (
 
 logger = logging_config.logger
 
+NOTHING_BUT_THEORY_MASK = N_STACK_MASK | ZIG_ZAG
+
 
 class NothingButTheoryCheckSegment(CheckSegmentStrategy):
     def check_segment(self, current_segment: Segment) -> Optional[bool]:
@@ -33,10 +37,10 @@ class NothingButTheoryCheckSegment(CheckSegmentStrategy):
             return True
 
         # Check for invalid combinations of previous segment and current segment
-        if not self.pattern.is_n_stack(current_segment) and current_segment.segment_name != ZIG_ZAG:
+        if not current_segment.kind & NOTHING_BUT_THEORY_MASK:
             return False
 
-        if current_segment.segment_name == ZIG_ZAG and len(current_segment.notes) not in [4, 6]:
+        if current_segment.kind == ZIG_ZAG and len(current_segment.notes) not in [4, 6]:
             return False
 
         if previous_segment:
@@ -45,15 +49,10 @@ class NothingButTheoryCheckSegment(CheckSegmentStrategy):
                 self.pattern.segments.append(current_segment)
                 return True
 
-            if previous_segment.segment_name == ZIG_ZAG and not self.pattern.is_n_stack(
-                current_segment
-            ):
+            if previous_segment.kind == ZIG_ZAG and not current_segment.kind & N_STACK_MASK:
                 return False
 
-            if (
-                self.pattern.is_n_stack(previous_segment)
-                and current_segment.segment_name != ZIG_ZAG
-            ):
+            if previous_segment.kind & N_STACK_MASK and current_segment.kind != ZIG_ZAG:
                 return False
 
             if (
@@ -75,19 +74,13 @@ class NothingButTheoryCheckSegment(CheckSegmentStrategy):
 
 class NothingButTheoryIsAppendable(IsAppendableStrategy):
     def is_appendable(self) -> bool:
-        if len(self.pattern.segments) >= 3:
+        segments = self.pattern.segments
+        if len(segments) >= 3:
             # Sanity check that everything in it is only N-stacks or ZIG ZAGS
-            n_stack_count = 0
-            for seg in self.pattern.segments:
-                if self.pattern.is_n_stack(seg):
-                    n_stack_count += 1
-                if (
-                    not self.pattern.is_n_stack(seg)
-                    and seg.segment_name != ZIG_ZAG
-                    and not self.pattern.segment_is_interval(seg)
-                ):
-                    raise ValueError(f"Nothing but theory has a: {seg.segment_name}!!")
-            if n_stack_count >= 2:
+            seg = segments.first_segment_outside(N_STACK_MASK | ZIG_ZAG | INTERVAL_MASK)
+            if seg is not None:
+                raise ValueError(f"Nothing but theory has a: {seg.segment_name}!!")
+            if segments.n_stack_count >= 2:
                 return True
         return False
 
@@ -95,49 +88,19 @@ class NothingButTheoryIsAppendable(IsAppendableStrategy):
 class NothingButTheoryCalcVariationScore(CalcVariationScoreStrategy):
     def calc_variation_score(self) -> float:
         # TODO: Make the calculation method into several helper methods.
+        # Zig Zags of different note lengths are considered different. Every segment is keyed
+        # by its (kind, note count), intervals too, so none are debuffed as intervals.
+        freq_dict = self.pattern.segments.kind_note_counts
 
-        logger.debug("Note: Nothing but theory overrode calc_variation_score")
-        temp_lst = [
-            f"{s.segment_name} {len(s.notes)}" for s in self.pattern.segments
-        ]  # Zig Zags of different note lengths are considered different
-        interval_list = []
-        segment_names = []
-
-        segment_counts = self.pattern._get_segment_type_counts(
-            [s.segment_name for s in self.pattern.segments]
-        )
-
-        # Check for intervals:
-        for i, name in enumerate(temp_lst):
-            if name in self.pattern.intervals:
-                if i == 0 or i == len(temp_lst) - 1:  # If it's the firs
-                    interval_list.append(
-                        self.pattern.intervals[name] * self.pattern.end_extra_debuff
-                    )
-                    # Don't add it to the list to check
-                else:
-                    interval_list.append(self.pattern.intervals[name])
-                    segment_names.append("Interval")  # Rename all Intervals to the same name
-            else:
-                segment_names.append(name)
-
-        logger.debug(f"Checking entropy of: {segment_names}")
-
-        n = len(segment_names)
-        freq_dict = {}
-        for name in segment_names:
-            freq_dict[name] = freq_dict.get(name, 0) + 1
+        n = len(self.pattern.segments)
         freq = [freq_dict[x] / n for x in freq_dict]
         entropy = -sum(p * math.log2(max(p, 1e-10)) for p in freq)
+        if __debug__ and tracing.sink is not None:
+            tracing.sink.emit(
+                EntropyCalculated(self.pattern.pattern_name, list(freq_dict.values()), entropy)
+            )
 
-        if len(interval_list) != 0:
-            # average interval debuffs and multiply that by the entropy
-            average_debuff = sum(interval_list) / len(interval_list)
-            entropy *= average_debuff
-
-            logger.debug(f">>> Debuffing (due to Intervals) by {average_debuff} <<<")
-
-        entropy = self.pattern._calc_switch_debuff(segment_counts, entropy)
+        entropy = self.pattern._calc_switch_debuff(self.pattern.segments.kind_counts, entropy)
 
         return max(1, entropy)
 
@@ -146,5 +109,7 @@ class NothingButTheoryCalcPatternMultiplier(CalcPatternMultiplierStrategy):
     def calc_pattern_multiplier(self) -> float:
         nps = self.pattern.segments[0].notes_per_second
 
-        multiplier = nothing_but_theory_multiplier(nps)
+        multiplier = nothing_but_theory_multiplier(
+            nps, *self.pattern.config.nothing_but_theory_curve
+        )
         return multiplier
@@ -1,4 +1,3 @@
-from config.config import get_config
 from strategies.default_strategies import DefaultCalcVariationScore
 from strategies.pattern_strategies import (
     CalcPatternLengthMultiplierStrategy,
@@ -7,8 +6,6 @@ from strategies.pattern_strategies import (
     CheckSegmentStrategy,
     IsAppendableStrategy,
 )
-
-conf = get_config()
 from typing import Optional
 
 import config.logging_config as logging_config
@@ -61,32 +58,42 @@ class OtherCalcPatternMultiplier(CalcPatternMultiplierStrategy):
                 float: The multiplier of the pattern.
         """
 
+        config = self.pattern.config
         multipliers = []
 
         for segment in self.pattern.segments:
-            if segment.segment_name == SWITCH:
-                multipliers.append(conf["other_switch_multiplier"])
-
-            elif segment.segment_name == ZIG_ZAG:
-                multipliers.append(zig_zag_multiplier(segment.notes_per_second))
-            elif segment.segment_name == TWO_STACK:
-                multipliers.append(two_stack_multiplier(segment.notes_per_second))
-            elif segment.segment_name == THREE_STACK:
-                multipliers.append(three_stack_multiplier(segment.notes_per_second))
-            elif segment.segment_name == FOUR_STACK:
-                multipliers.append(four_stack_multiplier(segment.notes_per_second))
-            elif segment.segment_name == SINGLE_STREAMS:
-                multipliers.append(stream_multiplier(segment.notes_per_second))
-            elif segment.segment_name == SHORT_INTERVAL:
-                multipliers.append(conf["other_short_int_multiplier"])
-            elif segment.segment_name == MED_INTERVAL:
-                multipliers.append(conf["other_med_int_multiplier"])
-            elif segment.segment_name == LONG_INTERVAL:
-                multipliers.append(conf["other_long_int_multiplier"])
+            if segment.kind == SWITCH:
+                multipliers.append(config.other_switch_multiplier)
+
+            elif segment.kind == ZIG_ZAG:
+                multipliers.append(
+                    zig_zag_multiplier(segment.notes_per_second, *config.zig_zag_curve)
+                )
+            elif segment.kind == TWO_STACK:
+                multipliers.append(
+                    two_stack_multiplier(segment.notes_per_second, *config.two_stack_curve)
+                )
+            elif segment.kind == THREE_STACK:
+                multipliers.append(
+                    three_stack_multiplier(segment.notes_per_second, *config.three_stack_curve)
+                )
+            elif segment.kind == FOUR_STACK:
+                multipliers.append(
+                    four_stack_multiplier(segment.notes_per_second, *config.four_stack_curve)
+                )
+            elif segment.kind == SINGLE_STREAMS:
+                multipliers.append(
+                    stream_multiplier(segment.notes_per_second, *config.stream_curve)
+                )
+            elif segment.kind == SHORT_INTERVAL:
+                multipliers.append(config.other_short_int_multiplier)
+            elif segment.kind == MED_INTERVAL:
+                multipliers.append(config.other_med_int_multiplier)
+            elif segment.kind == LONG_INTERVAL:
+                multipliers.append(config.other_long_int_multiplier)
             else:
                 logger.warning(f"WARNING: Did not recognise pattern: {segment.segment_name}")
                 multipliers.append(1)
-        logger.debug(f"Other Pattern Multipliers: {multipliers}")
         weighted_average = weighted_average_of_values(multipliers)
 
         return weighted_average
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from musemapalyzr.constants import ZIG_ZAG
+from musemapalyzr.constants import INTERVAL_MASK, N_STACK_MASK, ZIG_ZAG
 from musemapalyzr.entities import Segment
 from musemapalyzr.pattern_multipliers import skewed_circle_multiplier
 from patterns.pattern import Pattern
@@ -13,6 +13,8 @@ from strategies.pattern_strategies import (
     IsAppendableStrategy,
 )
 
+SKEWED_CIRCLES_MASK = N_STACK_MASK | ZIG_ZAG
+
 
 class SkewedCirclesCheckSegment(CheckSegmentStrategy):
     def check_segment(self, current_segment: Segment) -> Optional[bool]:
@@ -30,7 +32,7 @@ class SkewedCirclesCheckSegment(CheckSegmentStrategy):
             return True
 
         # Check for invalid combinations of previous segment and current segment
-        if not self.pattern.is_n_stack(current_segment) and current_segment.segment_name != ZIG_ZAG:
+        if not current_segment.kind & SKEWED_CIRCLES_MASK:
             return False
 
         if previous_segment:
@@ -39,15 +41,10 @@ class SkewedCirclesCheckSegment(CheckSegmentStrategy):
                 self.pattern.segments.append(current_segment)
                 return True
 
-            if previous_segment.segment_name == ZIG_ZAG and not self.pattern.is_n_stack(
-                current_segment
-            ):
+            if previous_segment.kind == ZIG_ZAG and not current_segment.kind & N_STACK_MASK:
                 return False
 
-            if (
-                self.pattern.is_n_stack(previous_segment)
-                and current_segment.segment_name != ZIG_ZAG
-            ):
+            if previous_segment.kind & N_STACK_MASK and current_segment.kind != ZIG_ZAG:
                 return False
 
             if (
@@ -61,7 +58,7 @@ class SkewedCirclesCheckSegment(CheckSegmentStrategy):
             ):
                 return False
 
-        if current_segment.segment_name == ZIG_ZAG and len(current_segment.notes) != 3:
+        if current_segment.kind == ZIG_ZAG and len(current_segment.notes) != 3:
             return False
 
         # Current segment should be valid from here
@@ -72,19 +69,13 @@ class SkewedCirclesCheckSegment(CheckSegmentStrategy):
 
 class SkewedCirclesIsAppendable(IsAppendableStrategy):
     def is_appendable(self) -> bool:
-        if len(self.pattern.segments) >= 3:
+        segments = self.pattern.segments
+        if len(segments) >= 3:
             # Sanity check that everything in it is only N-stacks or ZIG ZAGS
-            n_stack_count = 0
-            for p in self.pattern.segments:
-                if self.pattern.is_n_stack(p):
-                    n_stack_count += 1
-                if (
-                    not self.pattern.is_n_stack(p)
-                    and p.segment_name != ZIG_ZAG
-                    and not self.pattern.segment_is_interval(p)
-                ):
-                    raise ValueError(f"Skewed Circle has a: {p.segment_name}!!")
-            if n_stack_count >= 2:
+            p = segments.first_segment_outside(N_STACK_MASK | ZIG_ZAG | INTERVAL_MASK)
+            if p is not None:
+                raise ValueError(f"Skewed Circle has a: {p.segment_name}!!")
+            if segments.n_stack_count >= 2:
                 return True
         return False
 
@@ -103,5 +94,5 @@ class SkewedCirclesCalcPatternMultiplier(CalcPatternMultiplierStrategy):
     def calc_pattern_multiplier(self) -> float:
         nps = self.pattern.segments[0].notes_per_second
 
-        multiplier = skewed_circle_multiplier(nps)
+        multiplier = skewed_circle_multiplier(nps, *self.pattern.config.skewed_circle_curve)
         return multiplier
@@ -1,6 +1,7 @@
 import math
 from typing import Optional
 
+from musemapalyzr.constants import INTERVAL_MASK
 from musemapalyzr.entities import Segment
 from patterns.pattern import Pattern
 from strategies.default_strategies import DefaultCalcPatternMultiplier
@@ -21,8 +22,8 @@ class SlowStretchCheckSegment(CheckSegmentStrategy):
             self.pattern.segments[-1] if len(self.pattern.segments) > 0 else None
         )
 
-        if "Interval" in current_segment.segment_name and (
-            previous_segment is None or "Interval" in previous_segment.segment_name
+        if current_segment.kind & INTERVAL_MASK and (
+            previous_segment is None or previous_segment.kind & INTERVAL_MASK
         ):
             self.pattern.segments.append(current_segment)
             return True
@@ -31,10 +32,11 @@ class SlowStretchCheckSegment(CheckSegmentStrategy):
 
 class SlowStretchIsAppendable(IsAppendableStrategy):
     def is_appendable(self) -> bool:
-        if len(self.pattern.segments) >= 2:
-            for p in self.pattern.segments:
-                if "Interval" not in p.segment_name:
-                    raise ValueError(f"Slow Stretch has a: {p.segment_name}!!")
+        segments = self.pattern.segments
+        if len(segments) >= 2:
+            p = segments.first_segment_outside(INTERVAL_MASK)
+            if p is not None:
+                raise ValueError(f"Slow Stretch has a: {p.segment_name}!!")
             return True
         return False
 
@@ -43,16 +45,11 @@ class SlowStretchCalcVariation(CalcVariationScoreStrategy):
     def calc_variation_score(self) -> float:
         # Variation score for Slow Stretches is based on column variation rather than segment variation
 
-        lst = []
-        unique_sample_times = set()
-        for p in self.pattern.segments:
-            for n in p.notes:
-                if n.sample_time not in unique_sample_times:
-                    lst.append(n.lane)
-                    unique_sample_times.add(n.sample_time)
-        n = len(lst)
-        unique_vals = set(lst)
-        freq = [lst.count(x) / n for x in unique_vals]
+        # The lane of each note with a unique sample time
+        lane_counts = self.pattern.segments.lane_counts
+        n = self.pattern.segments.note_count
+        unique_vals = set(lane_counts)
+        freq = [lane_counts[x] / n for x in unique_vals]
 
         entropy = -sum(p * math.log2(p) for p in freq)
         if int(entropy) == 0:
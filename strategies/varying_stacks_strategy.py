@@ -1,5 +1,6 @@
 from typing import Optional
 
+from musemapalyzr.constants import INTERVAL_MASK, N_STACK_MASK
 from musemapalyzr.entities import Segment
 from musemapalyzr.pattern_multipliers import varying_stacks_multiplier
 from patterns.pattern import Pattern
@@ -25,7 +26,7 @@ class VaryingStacksCheckSegment(CheckSegmentStrategy):
             return True
 
         # Check if current segment is straight up invalid
-        if not self.pattern.is_n_stack(current_segment):
+        if not current_segment.kind & N_STACK_MASK:
             return False
 
         # Current segment should be valid from here
@@ -35,15 +36,13 @@ class VaryingStacksCheckSegment(CheckSegmentStrategy):
 
 class VaryingStacksIsAppendable(IsAppendableStrategy):
     def is_appendable(self) -> bool:
-        if len(self.pattern.segments) >= 2:
+        segments = self.pattern.segments
+        if len(segments) >= 2:
             # Needs at least 2 n-stacks to be valid
-            n_stack_count = 0
-            for p in self.pattern.segments:
-                if self.pattern.is_n_stack(p):
-                    n_stack_count += 1
-                if not self.pattern.is_n_stack(p) and not self.pattern.segment_is_interval(p):
-                    raise ValueError(f"Varying Stack has a: {p.segment_name}!!")
-            if n_stack_count >= 2:
+            p = segments.first_segment_outside(N_STACK_MASK | INTERVAL_MASK)
+            if p is not None:
+                raise ValueError(f"Varying Stack has a: {p.segment_name}!!")
+            if segments.n_stack_count >= 2:
                 return True
         return False
 
@@ -61,5 +60,5 @@ class VaryingStacksCalcVariationScore(DefaultCalcVariationScore):
 class VaryingStacksCalcPatternMultiplier(CalcPatternMultiplierStrategy):
     def calc_pattern_multiplier(self) -> float:
         nps = self.pattern.segments[0].notes_per_second
-        multiplier = varying_stacks_multiplier(nps)
+        multiplier = varying_stacks_multiplier(nps, *self.pattern.config.varying_stacks_curve)
         return multiplier
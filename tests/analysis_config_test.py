@@ -0,0 +1,79 @@
+import dataclasses
+
+import pytest
+
+from config.config import get_config
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.constants import (
+    LONG_INTERVAL,
+    MED_INTERVAL,
+    OTHER,
+    SHORT_INTERVAL,
+    SINGLE_STREAMS,
+)
+from musemapalyzr.entities import Note
+from musemapalyzr.utils import get_next_segment_and_required_notes
+from patterns.other import OtherPattern
+
+conf = get_config()
+
+
+def _kind_from_notes_per_second(time_difference, sample_rate):
+    notes_per_second = sample_rate / time_difference
+    if notes_per_second >= conf["short_interval_nps"]:
+        return SINGLE_STREAMS
+    elif notes_per_second < conf["long_interval_nps"]:
+        return LONG_INTERVAL
+    elif notes_per_second < conf["med_interval_nps"]:
+        return MED_INTERVAL
+    return SHORT_INTERVAL
+
+
+@pytest.mark.parametrize("sample_rate", [22050, 32000, 44100, 48000])
+def test_sample_thresholds_match_notes_per_second(sample_rate):
+    config = get_analysis_config(sample_rate)
+    thresholds = [
+        config.max_stream_time_difference,
+        config.max_short_interval_time_difference,
+        config.max_med_interval_time_difference,
+    ]
+    for threshold in thresholds:
+        for time_difference in range(threshold - 2, threshold + 3):
+            kind, _ = get_next_segment_and_required_notes(
+                Note(0, 0), Note(0, time_difference), time_difference, config
+            )
+            assert kind == _kind_from_notes_per_second(time_difference, sample_rate)
+
+
+def test_tolerances_are_whole_samples():
+    config = get_analysis_config(22050)
+    # 10ms is 220.5 samples, and time differences are whole samples
+    assert config.segment_tolerance == 220
+    assert config.pattern_tolerance == conf["pattern_tolerance_ms"] * 22050 // 1000
+
+
+def test_compiled_once_per_sample_rate():
+    config = get_analysis_config(48000)
+    assert get_analysis_config(48000) is config
+    assert config.with_sample_rate(44100) is get_analysis_config(44100)
+    assert {config: 1}[get_analysis_config(48000)] == 1
+    assert config != get_analysis_config(44100)
+
+
+def test_compiled_config_is_frozen():
+    config = get_analysis_config()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        config.segment_tolerance = 0
+    with pytest.raises(TypeError):
+        config.interval_debuffs[SHORT_INTERVAL] = 1
+    assert not hasattr(config, "__dict__")
+
+
+def test_other_settings():
+    settings = dict(conf, short_int_debuff=0.25)
+    config = get_analysis_config(settings=settings)
+    assert config != get_analysis_config()
+    assert get_analysis_config(settings=settings) is config
+
+    pattern = OtherPattern(OTHER, [], config=config)
+    assert pattern.intervals[SHORT_INTERVAL] == 0.25
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from musemapalyzr.asset_parser import extract_koreography, read_koreography_asset
+
+ASSET = b"""{
+    "Song - Artist - Hard" : {
+        "__type" : "SonicBloom.Koreo.Koreography,SonicBloom.Koreo",
+        "value" : {
+            "_ES3Ref" : "2984661040306006350",
+            "_ES3Ref" : "2984661040306006350",
+            "mSampleRate" : 48000,
+            "mTempoSections" : [
+                {
+                    "sectionName" : "baseTempoSection",
+                    "startSample" : 0,
+                    "samplesPerBeat" : 19600,
+                    "beatsPerMeasure" : 4,
+                    "bStartNewMeasure" : true
+                }
+            ],
+            "mTracks" : [
+                {
+                    "_ES3Ref" : "737018137580159485",
+                    "_ES3Ref" : "737018137580159485",
+                    "mEventID" : "0",
+                    "mEventList" : [
+                        {
+                            "mStartSample" : 1102,
+                            "mEndSample" : 1102
+                        },{
+                            "mStartSample" : 79502,
+                            "mEndSample" : 79502
+                        }
+                    ]
+                },{
+                    "mEventID" : "1",
+                    "mEventList" : [
+                        {
+                            "mStartSample" : 40000,
+                            "mEndSample" : 40000
+                        }
+                    ]
+                },{
+                    "mEventID" : "TimingPoint",
+                    "mEventList" : [
+
+                    ]
+                }
+            ]
+        }
+    }
+}"""
+
+
+def test_extracts_header_and_tracks():
+    data = extract_koreography(ASSET)
+    assert data.title == "Song - Artist - Hard"
+    assert data.sample_rate == 48000
+    assert [event_id for event_id, _ in data.tracks] == ["0", "1", "TimingPoint"]
+    assert list(data.tracks[0][1]) == [1102, 79502]
+    assert list(data.tracks[1][1]) == [40000]
+    assert list(data.tracks[2][1]) == []
+
+
+def test_event_with_duration_is_invalid():
+    asset = ASSET.replace(b'"mEndSample" : 40000', b'"mEndSample" : 40001')
+    with pytest.raises(ValueError):
+        extract_koreography(asset)
+
+
+def test_not_a_koreography_is_invalid():
+    with pytest.raises(ValueError):
+        extract_koreography(b"[1, 2, 3]")
+
+
+def test_matches_json_parse_of_real_asset():
+    filename = "data/Billie Eilish - bad guy - Easy.asset"
+    with open(filename, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    title = list(expected.keys())[0]
+    expected_tracks = [
+        (t["mEventID"], [e["mStartSample"] for e in t["mEventList"]])
+        for t in expected[title]["value"]["mTracks"]
+    ]
+
+    data = read_koreography_asset(filename)
+    assert data.title == title
+    assert data.sample_rate == expected[title]["value"]["mSampleRate"]
+    assert [(event_id, list(samples)) for event_id, samples in data.tracks] == expected_tracks
@@ -0,0 +1,84 @@
+import pytest
+
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.batch_scoring import BatchPatternScorer, batch_multiply_pattern_scores
+from musemapalyzr.constants import OTHER
+from musemapalyzr.difficulty_calculation import get_pattern_weighting, multiply_pattern_scores
+from musemapalyzr.entities import MuseSwiprMap
+from musemapalyzr.map_pattern_analysis import Mapalyzr
+from musemapalyzr.pattern_views import PatternScorer
+from musemapalyzr.utils import PatternScore, analyse_segments
+from patterns.other import OtherPattern
+
+ASSETS = [
+    "data/Billie Eilish - bad guy - Easy.asset",
+    "data/Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+    "data/CRIM3S - lost - The Devil Is Here.asset",
+]
+
+
+def _assert_scores_match(actual, expected):
+    assert [(s.pattern_name, s.has_interval, s.total_notes) for s in actual] == [
+        (s.pattern_name, s.has_interval, s.total_notes) for s in expected
+    ]
+    assert [s.score for s in actual] == pytest.approx([s.score for s in expected], abs=1e-12)
+
+
+@pytest.mark.parametrize("asset", ASSETS)
+def test_matches_pattern_scorer(asset):
+    config = get_analysis_config()
+    segments = analyse_segments(MuseSwiprMap.from_koreograph_asset(asset).notes, config=config)
+    mapalyzr = Mapalyzr(config)
+    views = mapalyzr.identify_pattern_views(segments)
+
+    expected = PatternScorer(mapalyzr.pattern_classes, config).score_all(views, segments)
+    actual = BatchPatternScorer(mapalyzr.pattern_classes, config).score_all(views, segments)
+    _assert_scores_match(actual, expected)
+
+    assert batch_multiply_pattern_scores(actual, config).tolist() == pytest.approx(
+        multiply_pattern_scores(expected, config), abs=1e-12
+    )
+
+
+def test_other_pattern_classes_are_scored_one_by_one():
+    class SlowerOther(OtherPattern):
+        def calc_pattern_difficulty(self) -> float:
+            return super().calc_pattern_difficulty() / 2
+
+    config = get_analysis_config()
+    segments = analyse_segments(MuseSwiprMap.from_koreograph_asset(ASSETS[0]).notes, config=config)
+    mapalyzr = Mapalyzr(config)
+    views = mapalyzr.identify_pattern_views(segments)
+    pattern_classes = dict(mapalyzr.pattern_classes, **{OTHER: SlowerOther})
+
+    expected = PatternScorer(pattern_classes, config).score_all(views, segments)
+    actual = BatchPatternScorer(pattern_classes, config).score_all(views, segments)
+    _assert_scores_match(actual, expected)
+
+
+@pytest.mark.parametrize(
+    "has_intervals",
+    [
+        [],
+        [True],
+        [True, True, True, False, False],
+        [False, True, True, True, False, False, True],
+        [False, False, False, True, False, True, True, True, True],
+    ],
+)
+def test_multiply_pattern_scores_chunks(has_intervals):
+    config = get_analysis_config()
+    pattern_scores = [
+        PatternScore(OTHER, 1 + i / 10, has_interval, 10 * (i + 1))
+        for i, has_interval in enumerate(has_intervals)
+    ]
+    assert batch_multiply_pattern_scores(pattern_scores, config).tolist() == pytest.approx(
+        multiply_pattern_scores(pattern_scores, config), abs=1e-12
+    )
+
+
+def test_pattern_weighting():
+    notes = MuseSwiprMap.from_koreograph_asset(ASSETS[1]).notes
+    assert get_pattern_weighting(notes, batch_scoring=True) == pytest.approx(
+        get_pattern_weighting(notes), abs=1e-12
+    )
@@ -0,0 +1,94 @@
+import os
+import shutil
+
+import pytest
+
+from musemapalyzr import note_cache
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.catalog import MapCatalog, parse_map_filename
+from musemapalyzr.entities import MuseSwiprMap
+
+ASSETS = [
+    "Billie Eilish - bad guy - Easy.asset",
+    "Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+]
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(note_cache, "NOTE_CACHE_DIR", str(tmp_path / "cache"))
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for asset in ASSETS:
+        shutil.copy(f"data/{asset}", data_dir / asset)
+    return str(data_dir)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    with MapCatalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        yield catalog
+
+
+def test_parse_map_filename():
+    assert parse_map_filename(ASSETS[0]) == ("Billie Eilish", "Easy")
+    assert parse_map_filename(f"data/{ASSETS[1]}") == ("Camellia", "Expert")
+    assert parse_map_filename("-  - .asset") == ("-", None)
+
+
+def test_refresh_is_incremental(data_dir, catalog):
+    assert catalog.refresh(data_dir) == (2, 0)
+    assert catalog.refresh(data_dir) == (0, 0)
+
+    path = os.path.join(data_dir, ASSETS[0])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert catalog.refresh(data_dir) == (1, 0)
+
+    os.remove(path)
+    assert catalog.refresh(data_dir) == (0, 1)
+    assert [entry.path for entry in catalog.search()] == [os.path.join(data_dir, ASSETS[1])]
+
+
+def test_entries_describe_the_map(data_dir, catalog):
+    catalog.refresh(data_dir)
+    path = os.path.join(data_dir, ASSETS[0])
+    (entry,) = catalog.search("BAD GUY")
+    m_map = MuseSwiprMap.from_koreograph_asset(path)
+
+    assert entry.path == path
+    assert entry.size == os.path.getsize(path)
+    assert entry.content_hash == m_map.content_hash
+    assert entry.title == m_map.title
+    assert (entry.artist, entry.difficulty) == ("Billie Eilish", "Easy")
+    assert entry.sample_rate == m_map.sample_rate
+    assert entry.note_count == len(m_map.notes)
+    assert entry.duration == m_map.duration
+    assert entry.peak_nps > 0
+
+
+def test_search_filters(data_dir, catalog):
+    catalog.refresh(data_dir)
+    assert len(catalog.search()) == 2
+    assert [entry.artist for entry in catalog.search(difficulty="expert")] == ["Camellia"]
+    assert [entry.artist for entry in catalog.search(artist="billie eilish")] == ["Billie Eilish"]
+    assert catalog.search("hiasobi", difficulty="Easy") == []
+
+    peak_nps = sorted(entry.peak_nps for entry in catalog.search())
+    assert len(catalog.search(min_peak_nps=peak_nps[1])) == 1
+    assert len(catalog.search(max_peak_nps=peak_nps[1])) == 2
+
+
+def test_rebuilds_for_another_sample_window(data_dir, tmp_path):
+    db_path = str(tmp_path / "catalog.sqlite")
+    config = get_analysis_config()
+    with MapCatalog(db_path, config) as catalog:
+        catalog.refresh(data_dir)
+        peak_nps = [entry.peak_nps for entry in catalog.search()]
+    with MapCatalog(db_path, config) as catalog:
+        assert catalog.refresh(data_dir) == (0, 0)
+
+    settings = dict(config.settings, sample_window_secs=config.sample_window_secs * 4)
+    with MapCatalog(db_path, get_analysis_config(settings=settings)) as catalog:
+        assert catalog.refresh(data_dir) == (2, 0)
+        assert [entry.peak_nps for entry in catalog.search()] != peak_nps
@@ -0,0 +1,102 @@
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from musemapalyzr import note_cache
+from musemapalyzr.corpus_pack import LZMA, ZLIB, CorpusPack, import_corpus, write_pack
+from musemapalyzr.entities import MuseSwiprMap
+
+ASSETS = [
+    "Billie Eilish - bad guy - Easy.asset",
+    "Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+]
+
+
+def _read(asset):
+    with open(f"data/{asset}", "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("codec", [ZLIB, LZMA])
+def test_round_trip(tmp_path, codec):
+    pack_path = str(tmp_path / "corpus.mspk")
+    assets = [("a.asset", b"first"), ("b.asset", b""), ("c.asset", b"third" * 100)]
+    assert write_pack(pack_path, assets, codec) == 3
+
+    with CorpusPack(pack_path) as pack:
+        assert pack.codec == codec
+        assert pack.names() == ["a.asset", "b.asset", "c.asset"]
+        assert "b.asset" in pack
+        for name, raw in reversed(assets):
+            assert pack.read(name) == raw
+        assert pack.entries["c.asset"].content_hash == note_cache.asset_hash(b"third" * 100)
+        with pytest.raises(KeyError):
+            pack.read("missing.asset")
+
+
+def test_reads_from_several_threads(tmp_path):
+    pack_path = str(tmp_path / "corpus.mspk")
+    assets = [(f"{i}.asset", bytes([i]) * (1000 + i)) for i in range(50)]
+    write_pack(pack_path, assets)
+
+    with CorpusPack(pack_path) as pack, ThreadPoolExecutor(8) as executor:
+        names = [name for name, _ in assets] * 10
+        assert list(executor.map(pack.read, names)) == [raw for _, raw in assets] * 10
+
+
+def test_rejects_duplicate_names_and_other_files(tmp_path):
+    pack_path = str(tmp_path / "corpus.mspk")
+    with pytest.raises(ValueError):
+        write_pack(pack_path, [("a.asset", b"1"), ("a.asset", b"2")])
+    with pytest.raises(ValueError):
+        CorpusPack(f"data/{ASSETS[0]}")
+
+
+def test_failed_write_leaves_no_files(tmp_path):
+    def assets():
+        yield "a.asset", b"1"
+        raise OSError("unreadable")
+
+    with pytest.raises(OSError):
+        write_pack(str(tmp_path / "corpus.mspk"), assets())
+    with pytest.raises(ValueError):
+        write_pack(str(tmp_path / "corpus.mspk"), [("a.asset", b"1"), ("a.asset", b"2")])
+    assert os.listdir(tmp_path) == []
+
+
+def test_import_from_directory_and_zip(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    zip_path = tmp_path / "data.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        for asset in ASSETS:
+            (data_dir / asset).write_bytes(_read(asset))
+            archive.writestr(f"maps/{asset}", _read(asset))
+        archive.writestr("maps/readme.txt", "not a map")
+
+    for source in [data_dir, zip_path]:
+        pack_path = str(tmp_path / "corpus.mspk")
+        assert import_corpus(str(source), pack_path) == len(ASSETS)
+        with CorpusPack(pack_path) as pack:
+            assert sorted(pack.names()) == sorted(ASSETS)
+            assert all(pack.read(asset) == _read(asset) for asset in ASSETS)
+
+
+def test_map_from_pack_matches_asset(tmp_path, monkeypatch):
+    monkeypatch.setattr(note_cache, "NOTE_CACHE_DIR", str(tmp_path / "cache"))
+    pack_path = str(tmp_path / "corpus.mspk")
+    write_pack(pack_path, [(asset, _read(asset)) for asset in ASSETS])
+    expected = MuseSwiprMap.from_koreograph_asset(f"data/{ASSETS[1]}", use_cache=False)
+
+    with CorpusPack(pack_path) as pack:
+        parsed = MuseSwiprMap.from_corpus_pack(pack, ASSETS[1])
+        assert len(os.listdir(tmp_path / "cache")) == 1
+        cached = MuseSwiprMap.from_corpus_pack(pack, ASSETS[1])
+
+    for m_map in [parsed, cached]:
+        assert m_map.title == expected.title
+        assert m_map.content_hash == expected.content_hash
+        assert m_map.notes.sample_times.tolist() == expected.notes.sample_times.tolist()
+        assert m_map.notes.lanes.tolist() == expected.notes.lanes.tolist()
@@ -0,0 +1,95 @@
+import io
+
+import pytest
+
+from musemapalyzr import corpus_runner, note_cache
+from musemapalyzr.corpus_pack import CorpusPack, write_pack
+from musemapalyzr.corpus_runner import run_corpus
+from musemapalyzr.difficulty_calculation import calculate_difficulty
+from musemapalyzr.entities import MuseSwiprMap
+from musemapalyzr.result_cache import ResultCache
+
+DATA_DIR = "data"
+FILES = [
+    "Billie Eilish - bad guy - Easy.asset",
+    "CRIM3S - lost - The Devil Is Here.asset",
+    "missing.asset",
+    "Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+]
+
+
+def _expected(filename):
+    m_map = MuseSwiprMap.from_koreograph_asset(f"{DATA_DIR}/{filename}")
+    outfile = io.StringIO()
+    weighting = calculate_difficulty(m_map.notes, outfile=outfile, sample_rate=m_map.sample_rate)
+    return weighting, [float(line) for line in outfile.getvalue().splitlines()]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_results_are_in_order(max_workers):
+    results = list(run_corpus(FILES, DATA_DIR, max_workers=max_workers, chunk_size=1))
+
+    assert [result.filename for result in results] == FILES
+    for result in results:
+        if result.filename == "missing.asset":
+            assert result.weighting is None and result.error
+            continue
+        assert result.error is None
+        assert (result.weighting, result.density_curve) == _expected(result.filename)
+
+
+def test_reads_a_pack(tmp_path):
+    pack_path = str(tmp_path / "corpus.mspk")
+    files = [FILES[0], FILES[3]]
+    assets = []
+    for filename in files:
+        with open(f"{DATA_DIR}/{filename}", "rb") as f:
+            assets.append((filename, f.read()))
+    write_pack(pack_path, assets)
+
+    with CorpusPack(pack_path) as pack:
+        names = pack.names()
+    results = list(run_corpus(names, "no such dir", pack_path=pack_path, max_workers=2))
+    assert [result.filename for result in results] == names
+    assert [result.weighting for result in results] == [
+        _expected(filename)[0] for filename in names
+    ]
+
+
+def test_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        list(run_corpus(FILES, DATA_DIR, max_workers=0))
+    with pytest.raises(ValueError):
+        list(run_corpus(FILES, DATA_DIR, chunk_size=0))
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_serves_cached_results(tmp_path, max_workers):
+    files = FILES + [FILES[0]]
+    with ResultCache(str(tmp_path / "results.sqlite")) as cache:
+        first = list(run_corpus(files, DATA_DIR, max_workers=max_workers, cache=cache))
+        # The duplicate is only looked up once, and the missing file cannot be looked up at all
+        assert cache.stats() == (0, 3, 3, 0)
+
+        second = list(run_corpus(files, DATA_DIR, max_workers=max_workers, cache=cache))
+        assert cache.stats() == (3, 3, 3, 0.5)
+
+    assert [result.filename for result in second] == files
+    assert second == first
+    assert second[-1]._replace(filename=FILES[0]) == second[0]
+    assert second[2].error
+
+
+def test_caches_under_the_hash_of_what_was_scored(tmp_path, monkeypatch):
+    with open(f"{DATA_DIR}/{FILES[1]}", "rb") as f:
+        old_hash = note_cache.asset_hash(f.read())
+    # The asset was rewritten between being hashed for the lookup and being scored
+    monkeypatch.setattr(corpus_runner, "file_content_hash", lambda path: old_hash)
+
+    with ResultCache(str(tmp_path / "results.sqlite")) as cache:
+        (result,) = run_corpus([FILES[0]], DATA_DIR, max_workers=1, cache=cache)
+        assert result.content_hash != old_hash
+        assert cache.get_many([old_hash]) == {}
+        assert cache.get_many([result.content_hash]) == {
+            result.content_hash: (result.weighting, result.density_curve)
+        }
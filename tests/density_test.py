@@ -0,0 +1,69 @@
+import pytest
+
+from musemapalyzr.constants import DEFAULT_SAMPLE_RATE
+from musemapalyzr.density import DensityPyramid, note_density
+from musemapalyzr.entities import MuseSwiprMap, Note
+from musemapalyzr.utils import create_sections, moving_average_note_density
+
+ASSETS = [
+    "data/Billie Eilish - bad guy - Easy.asset",
+    "data/Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+]
+
+
+@pytest.mark.parametrize("asset", ASSETS)
+@pytest.mark.parametrize("window_secs", [1, 0.7, 2.5])
+def test_matches_sections(asset, window_secs):
+    m_map = MuseSwiprMap.from_koreograph_asset(asset)
+    sections = create_sections(m_map.notes, window_secs, m_map.sample_rate)
+    density = note_density(m_map.notes, window_secs, m_map.sample_rate, moving_avg_window=5)
+
+    assert density.section_counts.tolist() == [len(section) for section in sections]
+    assert density.moving_averages.tolist() == moving_average_note_density(sections, 5)
+    assert density.peak_nps == max(len(section) for section in sections) / window_secs
+    for lane, counts in enumerate(density.lane_section_counts.tolist()):
+        assert counts == [sum(1 for note in section if note.lane == lane) for section in sections]
+
+
+def test_does_not_sort_the_notes():
+    notes = [Note(1, 3 * DEFAULT_SAMPLE_RATE), Note(0, 0), Note(0, DEFAULT_SAMPLE_RATE // 2)]
+    unsorted = list(notes)
+
+    density = note_density(notes)
+    create_sections(notes)
+
+    assert notes == unsorted
+    assert density.section_counts.tolist() == [2, 0, 0, 1]
+    assert density.lane_section_counts.tolist() == [[2, 0, 0, 0], [0, 0, 0, 1]]
+    assert density.moving_averages.tolist() == [2, 1, 2 / 3, 0.75]
+    assert density.peak_nps == 2
+
+
+def test_no_notes():
+    density = note_density([])
+    assert len(density.section_counts) == 0
+    assert len(density.moving_averages) == 0
+    assert density.peak_nps == 0
+
+
+@pytest.mark.parametrize("asset", ASSETS)
+def test_pyramid_matches_note_density(asset):
+    m_map = MuseSwiprMap.from_koreograph_asset(asset)
+    pyramid = m_map.density_pyramid
+    assert m_map.density_pyramid is pyramid
+
+    # Multiples of a level's width, and lengths only the note offsets can answer
+    for window_secs in [0.05, 0.2, 1, 2, 0.7, 1 / 3, 2.5, 1000]:
+        for moving_avg_window in [1, 5, 12]:
+            expected = note_density(m_map.notes, window_secs, m_map.sample_rate, moving_avg_window)
+            density = pyramid.density(window_secs, moving_avg_window)
+            assert density.section_counts.tolist() == expected.section_counts.tolist()
+            assert density.lane_section_counts.tolist() == expected.lane_section_counts.tolist()
+            assert density.moving_averages.tolist() == expected.moving_averages.tolist()
+            assert density.peak_nps == expected.peak_nps
+
+
+def test_pyramid_without_notes():
+    pyramid = DensityPyramid([])
+    assert len(pyramid.section_counts()) == 0
+    assert pyramid.density().peak_nps == 0
@@ -0,0 +1,44 @@
+import os
+
+from musemapalyzr.difficulty_export import DifficultyExport, export_name, export_row
+from musemapalyzr.utils import Weighting
+
+
+def test_export_name():
+    assert export_name("Billie Eilish - bad guy - Easy.asset") == "Billie Eilish - bad guy - Easy"
+    assert export_name("data\\a.asset") == "a"
+
+
+def test_updates_rows(tmp_path):
+    path = str(tmp_path / "export.txt")
+    export = DifficultyExport(path)
+    export.update("b", Weighting(1.0, 2.0, 2.0))
+    export.update("a", Weighting(0.9, 3.0, 2.7))
+    assert export.flush()
+    assert not export.flush()
+
+    export = DifficultyExport(path)
+    assert export.names() == ["a", "b"]
+    export.update("a", Weighting(0.9, 3.0, 2.7))
+    assert not export.flush()
+    export.update("b", Weighting(1.1, 2.0, 2.2))
+    export.remove("a")
+    export.remove("missing")
+    assert export.flush()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == export_row("b", Weighting(1.1, 2.0, 2.2)) == "b||2.20||1.10||2.00\n"
+
+
+def test_failed_flush_is_retried(tmp_path):
+    # A directory in the way makes the rename fail
+    path = tmp_path / "export.txt"
+    export = DifficultyExport(str(path))
+    (path / "child").mkdir(parents=True)
+    export.update("a", Weighting(0.9, 3.0, 2.7))
+    assert not export.flush()
+    assert os.listdir(tmp_path) == ["export.txt"]
+
+    (path / "child").rmdir()
+    path.rmdir()
+    assert export.flush()
+    assert path.read_text(encoding="utf-8") == export_row("a", Weighting(0.9, 3.0, 2.7))
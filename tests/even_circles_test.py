@@ -86,7 +86,7 @@ def test_starting_with_interval_adds_it_and_returns_True():
     group = EvenCirclesGroup(EVEN_CIRCLES, [])
     added = group.check_segment(current_pattern)
     assert added is True
-    assert group.segments[0].segment_name == SHORT_INTERVAL
+    assert group.segments[0].kind == SHORT_INTERVAL
 
 
 def test_ending_with_interval_adds_it_and_returns_False():
@@ -96,4 +96,4 @@ def test_ending_with_interval_adds_it_and_returns_False():
     group = EvenCirclesGroup(EVEN_CIRCLES, [previous_pattern])
     added = group.check_segment(current_pattern)
     assert added is False
-    assert group.segments[-1].segment_name == SHORT_INTERVAL
+    assert group.segments[-1].kind == SHORT_INTERVAL
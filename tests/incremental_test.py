@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.constants import DEFAULT_SAMPLE_RATE
+from musemapalyzr.difficulty_calculation import calculate_difficulty
+from musemapalyzr.entities import MuseSwiprMap, Note
+from musemapalyzr.incremental import IncrementalAnalyzer
+from musemapalyzr.utils import analyse_segments
+
+ASSETS = [
+    "data/Billie Eilish - bad guy - Easy.asset",
+    "data/Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+]
+
+
+def _describe(segments):
+    return [
+        (s.kind, s.time_difference, [(n.lane, n.sample_time) for n in s.notes]) for s in segments
+    ]
+
+
+def _random_edit(rng, analyzer):
+    sample_times = analyzer.notes.sample_times.tolist()
+    lanes = analyzer.notes.lanes.tolist()
+    taken = set(sample_times)
+    index = rng.randrange(len(sample_times))
+    note = Note(lanes[index], sample_times[index])
+    # Within a few notes of an existing note, so edits land inside runs as well as between them
+    sample_time = sample_times[index] + rng.randint(-20000, 20000)
+    if sample_time in taken:
+        return
+    kind = rng.choice(["insert", "delete", "move", "measure"])
+    if kind == "insert":
+        analyzer.insert_note(rng.randint(0, 1), sample_time)
+    elif kind == "delete":
+        analyzer.delete_note(note.lane, note.sample_time)
+    elif kind == "move":
+        analyzer.move_note(note.lane, note.sample_time, rng.randint(0, 1), sample_time)
+    else:
+        # Rewrite a measure: its notes are replaced by evenly spaced ones
+        end = min(index + rng.randint(1, 8), len(sample_times))
+        removed = [Note(lanes[i], sample_times[i]) for i in range(index, end)]
+        spacing = rng.choice([2756, 5512, 11025])
+        added = [
+            Note(rng.randint(0, 1), sample_times[index] + 1 + i * spacing)
+            for i in range(rng.randint(0, 8))
+        ]
+        kept = taken - {n.sample_time for n in removed}
+        if any(n.sample_time in kept for n in added):
+            return
+        analyzer.edit(removed, added)
+
+
+@pytest.mark.parametrize("asset", ASSETS)
+def test_matches_full_recompute(asset):
+    rng = random.Random(16)
+    m_map = MuseSwiprMap.from_koreograph_asset(asset)
+    analyzer = IncrementalAnalyzer(m_map.notes, m_map.sample_rate)
+    assert analyzer.weighting == calculate_difficulty(m_map.notes, sample_rate=m_map.sample_rate)
+
+    config = get_analysis_config(m_map.sample_rate).with_sample_rate(DEFAULT_SAMPLE_RATE)
+    for _ in range(30):
+        _random_edit(rng, analyzer)
+        assert analyzer.weighting == calculate_difficulty(
+            analyzer.notes, sample_rate=m_map.sample_rate
+        )
+        assert _describe(analyzer.segments) == _describe(
+            analyse_segments(analyzer.notes, config=config)
+        )
+
+
+def test_edits_at_either_end():
+    notes = [Note(i % 2, 10000 + i * 5000) for i in range(40)]
+    analyzer = IncrementalAnalyzer(notes)
+    analyzer.insert_note(1, 1000)
+    analyzer.delete_note(1, 10000 + 39 * 5000)
+    analyzer.move_note(0, 10000, 0, 500000)
+    assert analyzer.weighting == calculate_difficulty(analyzer.notes)
+
+
+def test_invalid_edits_change_nothing():
+    notes = [Note(i % 2, 10000 + i * 5000) for i in range(40)]
+    analyzer = IncrementalAnalyzer(notes)
+    weighting = analyzer.weighting
+    with pytest.raises(ValueError):
+        analyzer.delete_note(1, 10000)
+    with pytest.raises(ValueError):
+        analyzer.insert_note(0, 15000)
+    with pytest.raises(ValueError):
+        analyzer.edit([], [Note(0, 1), Note(1, 1)])
+    assert analyzer.weighting == weighting
+    assert len(analyzer.notes) == 40
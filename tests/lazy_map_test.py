@@ -0,0 +1,56 @@
+import os
+
+from musemapalyzr import note_cache
+from musemapalyzr.entities import MuseSwiprMap
+
+ASSET = "data/Billie Eilish - bad guy - Easy.asset"
+
+
+def _as_tuples(notes):
+    return [(note.lane, note.sample_time) for note in notes]
+
+
+def test_lazy_map_reads_only_the_header(tmp_path, monkeypatch):
+    monkeypatch.setattr(note_cache, "NOTE_CACHE_DIR", str(tmp_path))
+    eager = MuseSwiprMap.from_koreograph_asset(ASSET)
+
+    lazy = MuseSwiprMap.from_koreograph_asset(ASSET, lazy=True)
+    assert not lazy.notes_loaded
+    assert lazy.title == eager.title
+    assert lazy.sample_rate == eager.sample_rate
+    assert lazy.note_count == len(eager.notes)
+    assert lazy.first_sample == eager.notes.sample_times[0]
+    assert lazy.last_sample == eager.notes.sample_times[-1]
+    assert lazy.duration == eager.duration
+    assert not lazy.notes_loaded
+
+    assert _as_tuples(lazy.notes) == _as_tuples(eager.notes)
+    assert lazy.notes_loaded
+    assert list(lazy.tempo_sections.start_samples) == list(eager.tempo_sections.start_samples)
+
+
+def test_lazy_map_without_a_header_is_loaded_in_full(tmp_path, monkeypatch):
+    monkeypatch.setattr(note_cache, "NOTE_CACHE_DIR", str(tmp_path))
+    lazy = MuseSwiprMap.from_koreograph_asset(ASSET, lazy=True)
+    assert lazy.notes_loaded
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_lazy_map_reparses_a_cleared_note_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(note_cache, "NOTE_CACHE_DIR", str(tmp_path))
+    eager = MuseSwiprMap.from_koreograph_asset(ASSET)
+    for filename in os.listdir(tmp_path):
+        if filename.endswith(".notes"):
+            os.remove(tmp_path / filename)
+
+    lazy = MuseSwiprMap.from_koreograph_asset(ASSET, lazy=True)
+    assert not lazy.notes_loaded
+    assert _as_tuples(lazy.notes) == _as_tuples(eager.notes)
+
+
+def test_header_round_trip(tmp_path):
+    header = note_cache.MapHeader("Títle", 48000, 3, 10, 2**40, "00ff" * 8)
+    header_cache_path = str(tmp_path / "map.header")
+    note_cache.store_header(header_cache_path, header)
+    assert note_cache.load_header(header_cache_path) == header
+    assert note_cache.load_header(str(tmp_path / "missing.header")) is None
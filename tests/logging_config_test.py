@@ -0,0 +1,70 @@
+import logging
+import queue
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueHandler
+
+import config.logging_config as logging_config
+from config.log_handlers import BufferedFileHandler, LogListener
+
+
+def _log_in_worker(message):
+    logging_config.logger.info(message)
+
+
+def _info_log():
+    with open("logs/info.log", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_logger_only_queues_records():
+    assert [type(handler) for handler in logging_config.logger.handlers] == [QueueHandler]
+
+    message = f"queued {uuid.uuid4()}"
+    logging_config.logger.info(message)
+    logging_config.flush_logs()
+    assert message in _info_log()
+
+
+def test_worker_records_are_forwarded():
+    message = f"from a worker {uuid.uuid4()}"
+    with ProcessPoolExecutor(
+        1,
+        initializer=logging_config.forward_worker_logs,
+        initargs=(logging_config.worker_log_queue(),),
+    ) as executor:
+        executor.submit(_log_in_worker, message).result()
+    logging_config.flush_logs()
+    assert message in _info_log()
+
+
+def test_listener_writes_batches(tmp_path):
+    handler = BufferedFileHandler(tmp_path / "batch.log", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records = queue.SimpleQueue()
+    listener = LogListener(records, handler)
+    for i in range(2500):
+        records.put(logging.makeLogRecord({"msg": f"record {i}", "levelno": logging.INFO}))
+    listener.start()
+    listener.stop()
+    handler.close()
+    assert (tmp_path / "batch.log").read_text().splitlines() == [f"record {i}" for i in range(2500)]
+
+
+def test_listener_flushes_when_the_queue_empties(tmp_path):
+    handler = BufferedFileHandler(tmp_path / "batch.log", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records = queue.Queue()
+    listener = LogListener(records, handler)
+    listener.start()
+    try:
+        for i in range(3):
+            records.put(logging.makeLogRecord({"msg": f"record {i}", "levelno": logging.INFO}))
+        # Every record is marked done, and written once the queue is empty
+        records.join()
+        assert (tmp_path / "batch.log").read_text().splitlines() == [
+            f"record {i}" for i in range(3)
+        ]
+    finally:
+        listener.stop()
+        handler.close()
@@ -0,0 +1,51 @@
+from musemapalyzr.constants import DEFAULT_SAMPLE_RATE
+from musemapalyzr.entities import Note, NoteArray
+from musemapalyzr.utils import analyse_segments, create_sections
+
+
+def _as_tuples(notes):
+    return [(note.lane, note.sample_time) for note in notes]
+
+
+def test_from_tracks_merges_by_sample_time():
+    notes = NoteArray.from_tracks([(0, [0, 200, 300]), (1, [100, 200, 400])])
+    assert notes.lanes.tolist() == [0, 1, 0, 1, 0, 1]
+    assert notes.sample_times.tolist() == [0, 100, 200, 200, 300, 400]
+
+
+def test_from_tracks_without_notes():
+    notes = NoteArray.from_tracks([(0, []), (1, [])])
+    assert len(notes) == 0
+    assert len(NoteArray.from_tracks([])) == 0
+
+
+def test_indexing_and_slicing():
+    notes = NoteArray([0, 1, 0], [10, 20, 30])
+    assert _as_tuples([notes[0], notes[-1]]) == [(0, 10), (0, 30)]
+    assert isinstance(notes[1:], NoteArray)
+    assert _as_tuples(notes[1:]) == [(1, 20), (0, 30)]
+    assert _as_tuples(notes) == [(0, 10), (1, 20), (0, 30)]
+
+
+def test_create_sections_matches_note_list():
+    note_list = [
+        Note(i % 2, int(seconds * DEFAULT_SAMPLE_RATE))
+        for i, seconds in enumerate([0.5, 0.7, 1.6, 1.9, 4.2, 4.25, 4.3, 6.0])
+    ]
+    note_array = NoteArray.from_notes(note_list)
+
+    expected = create_sections(note_list, 1, DEFAULT_SAMPLE_RATE)
+    sections = create_sections(note_array, 1, DEFAULT_SAMPLE_RATE)
+    assert [_as_tuples(s) for s in sections] == [_as_tuples(s) for s in expected]
+
+
+def test_analyse_segments_matches_note_list():
+    note_list = [
+        Note(i % 3 % 2, int(seconds * DEFAULT_SAMPLE_RATE))
+        for i, seconds in enumerate([0, 0.1, 0.2, 0.3, 0.4, 1.0, 1.1, 3.0, 6.0, 6.05])
+    ]
+    expected = analyse_segments(note_list)
+    segments = analyse_segments(NoteArray.from_notes(note_list))
+    assert [(s.kind, _as_tuples(s.notes)) for s in segments] == [
+        (s.kind, _as_tuples(s.notes)) for s in expected
+    ]
@@ -0,0 +1,96 @@
+import os
+import time
+
+from musemapalyzr import note_cache
+from musemapalyzr.asset_parser import TempoSections
+from musemapalyzr.entities import MuseSwiprMap
+
+ASSET = "data/Billie Eilish - bad guy - Easy.asset"
+
+
+def test_round_trip(tmp_path):
+    cache_path = str(tmp_path / "map.notes")
+    tempo_sections = TempoSections([0, 1102], [19600, 7782.5])
+    note_cache.store_notes(cache_path, "Títle", 48000, [0, 1, 1], [10, 20, 2**40], tempo_sections)
+    cached = note_cache.load_notes(cache_path)
+    assert cached.title == "Títle"
+    assert cached.sample_rate == 48000
+    assert cached.tempo_sections.start_samples.tolist() == [0, 1102]
+    assert cached.tempo_sections.samples_per_beat.tolist() == [19600, 7782.5]
+    assert cached.lanes.tolist() == [0, 1, 1]
+    assert cached.sample_times.tolist() == [10, 20, 2**40]
+
+
+def test_round_trip_without_notes(tmp_path):
+    cache_path = str(tmp_path / "map.notes")
+    note_cache.store_notes(cache_path, "", 44100, [], [])
+    cached = note_cache.load_notes(cache_path)
+    assert len(cached.lanes) == 0
+    assert len(cached.sample_times) == 0
+
+
+def test_missing_or_invalid_cache_is_a_miss(tmp_path):
+    assert note_cache.load_notes(str(tmp_path / "missing.notes")) is None
+
+    cache_path = tmp_path / "invalid.notes"
+    cache_path.write_bytes(b"not a note cache at all")
+    assert note_cache.load_notes(str(cache_path)) is None
+
+
+def test_cache_path_changes_with_contents():
+    assert note_cache.notes_path(note_cache.asset_hash(b"a")) != note_cache.notes_path(
+        note_cache.asset_hash(b"b")
+    )
+
+
+def test_cached_map_matches_parsed_map(tmp_path, monkeypatch):
+    monkeypatch.setattr(note_cache, "NOTE_CACHE_DIR", str(tmp_path))
+
+    parsed = MuseSwiprMap.from_koreograph_asset(ASSET)
+    assert sum(filename.endswith(".notes") for filename in os.listdir(tmp_path)) == 1
+    cached = MuseSwiprMap.from_koreograph_asset(ASSET)
+
+    assert cached.title == parsed.title
+    assert cached.sample_rate == parsed.sample_rate
+    assert list(cached.tempo_sections.start_samples) == list(parsed.tempo_sections.start_samples)
+    assert [(n.lane, n.sample_time) for n in cached.notes] == [
+        (n.lane, n.sample_time) for n in parsed.notes
+    ]
+
+
+def test_prune_deletes_least_recently_used(tmp_path):
+    for i, name in enumerate(["old.notes", "used.header", "new.notes", "other.txt"]):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, ns=(i * 10**9, i * 10**9))
+    header = note_cache.MapHeader("Title", 44100, 0, 0, 0, "00" * 16)
+    note_cache.store_header(str(tmp_path / "used.header"), header)
+    os.utime(tmp_path / "used.header", ns=(10**9, 10**9))
+    # Loading a file marks it as used
+    assert note_cache.load_header(str(tmp_path / "used.header")) == header
+
+    assert note_cache.prune(str(tmp_path), max_bytes=200) == 1
+    assert sorted(os.listdir(tmp_path)) == ["new.notes", "other.txt", "used.header"]
+    assert note_cache.prune(str(tmp_path), max_bytes=0) == 2
+    assert os.listdir(tmp_path) == ["other.txt"]
+    assert note_cache.prune(str(tmp_path / "missing")) == 0
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    # A directory in the way makes the final rename fail
+    cache_path = tmp_path / "blocked.notes"
+    (cache_path / "child").mkdir(parents=True)
+    note_cache.store_notes(str(cache_path), "Title", 44100, [0], [100])
+    assert os.listdir(tmp_path) == ["blocked.notes"]
+
+
+def test_prune_deletes_stale_temporary_files(tmp_path):
+    stale = tmp_path / "stale.notes.123.tmp"
+    stale.write_bytes(b"x")
+    old = (time.time() - note_cache.STALE_TEMP_SECS - 60) * 10**9
+    os.utime(stale, ns=(int(old), int(old)))
+    # Possibly still being written
+    (tmp_path / "fresh.notes.456.tmp").write_bytes(b"x")
+
+    assert note_cache.prune(str(tmp_path)) == 1
+    assert os.listdir(tmp_path) == ["fresh.notes.456.tmp"]
@@ -0,0 +1,86 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import musemapalyzr.parallel_patterns as parallel_patterns
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.constants import INTERVAL_MASK, LONG_INTERVAL
+from musemapalyzr.difficulty_calculation import get_pattern_weighting
+from musemapalyzr.entities import MuseSwiprMap
+from musemapalyzr.map_pattern_analysis import Mapalyzr
+from musemapalyzr.parallel_patterns import chunk_boundaries, parallel_pattern_scores
+from musemapalyzr.pattern_views import PatternScorer
+from musemapalyzr.utils import analyse_segments
+
+ASSETS = [
+    "data/Billie Eilish - bad guy - Easy.asset",
+    "data/Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+]
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ProcessPoolExecutor(2) as executor:
+        yield executor
+
+
+def _sequential(segments, config):
+    mapalyzr = Mapalyzr(config)
+    views = mapalyzr.identify_pattern_views(segments)
+    return views, PatternScorer(mapalyzr.pattern_classes, config).score_all(views, segments)
+
+
+def test_chunk_boundaries_are_intervals():
+    segments = analyse_segments(MuseSwiprMap.from_koreograph_asset(ASSETS[1]).notes)
+    boundaries = chunk_boundaries(segments, 50)
+    assert boundaries
+    assert all(segments[index].kind & INTERVAL_MASK for index in boundaries)
+    assert all(end - start >= 50 for start, end in zip([0] + boundaries, boundaries))
+
+    # A long interval is preferred
+    segments[120].kind = LONG_INTERVAL
+    assert chunk_boundaries(segments, 100)[0] == 120
+
+
+@pytest.mark.parametrize("asset", ASSETS)
+@pytest.mark.parametrize("chunk_segments", [10, 50])
+def test_matches_sequential(asset, chunk_segments, executor):
+    config = get_analysis_config()
+    m_map = MuseSwiprMap.from_koreograph_asset(asset)
+    segments = analyse_segments(m_map.notes, config=config)
+    views, pattern_scores = _sequential(segments, config)
+
+    scored = parallel_pattern_scores(segments, config, executor, chunk_segments=chunk_segments)
+    assert scored.views == views
+    assert scored.pattern_scores == pattern_scores
+
+
+@pytest.mark.parametrize("asset", ASSETS)
+def test_stitches_any_seam(asset, executor, monkeypatch):
+    # Cut at every few segments, so chunks often start where the groups are not reset
+    monkeypatch.setattr(
+        parallel_patterns,
+        "chunk_boundaries",
+        lambda segments, chunk_segments: list(range(chunk_segments, len(segments), chunk_segments)),
+    )
+    config = get_analysis_config()
+    m_map = MuseSwiprMap.from_koreograph_asset(asset)
+    segments = analyse_segments(m_map.notes, config=config)
+    views, pattern_scores = _sequential(segments, config)
+
+    for chunk_segments in [1, 2, 3, 7]:
+        scored = parallel_pattern_scores(segments, config, executor, chunk_segments=chunk_segments)
+        assert scored.views == views
+        assert scored.pattern_scores == pattern_scores
+
+
+def test_pattern_weighting(executor, monkeypatch):
+    monkeypatch.setattr(
+        parallel_patterns,
+        "chunk_boundaries",
+        lambda segments, _: list(range(20, len(segments), 20)),
+    )
+    m_map = MuseSwiprMap.from_koreograph_asset(ASSETS[1])
+    assert get_pattern_weighting(m_map.notes, executor=executor) == get_pattern_weighting(
+        m_map.notes
+    )
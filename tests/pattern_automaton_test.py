@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.constants import SegmentKind
+from musemapalyzr.entities import MuseSwiprMap, Note, Segment
+from musemapalyzr.map_pattern_analysis import AUTOMATON_ENGINE, STRATEGY_ENGINE, Mapalyzr
+from musemapalyzr.utils import analyse_segments
+
+ASSETS = [
+    "data/Billie Eilish - bad guy - Easy.asset",
+    "data/Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+]
+
+
+def _describe(patterns):
+    return [(p.pattern_name, [id(segment) for segment in p.segments]) for p in patterns]
+
+
+def _identify(engine, segments, merge_mergable):
+    try:
+        patterns = Mapalyzr(get_analysis_config(), engine).identify_patterns(
+            segments, merge_mergable
+        )
+    except Exception as e:
+        return type(e)
+    return _describe(patterns)
+
+
+def _random_segments(rng):
+    kinds = [kind.value for kind in SegmentKind if kind != SegmentKind.OTHER]
+    segments = []
+    sample_time = 0
+    for _ in range(rng.randint(0, 12)):
+        note_count = rng.choice([2, 2, 3, 4, 5, 6, 7])
+        # Time differences and gaps either side of the pattern tolerance
+        time_difference = rng.choice([800, 800, 810, 900, 5000])
+        sample_time += rng.choice([0, 5, time_difference, time_difference + 500])
+        notes = [Note(i % 2, sample_time + i * time_difference) for i in range(note_count)]
+        segments.append(Segment(rng.choice(kinds), notes, time_difference=time_difference))
+        sample_time = notes[-1].sample_time
+    return segments
+
+
+@pytest.mark.parametrize("asset", ASSETS)
+@pytest.mark.parametrize("merge_mergable", [True, False])
+def test_matches_strategies_on_maps(asset, merge_mergable):
+    m_map = MuseSwiprMap.from_koreograph_asset(asset)
+    segments = analyse_segments(m_map.notes, m_map.sample_rate)
+    assert _identify(AUTOMATON_ENGINE, segments, merge_mergable) == _identify(
+        STRATEGY_ENGINE, segments, merge_mergable
+    )
+
+
+def test_matches_strategies_on_random_segments():
+    rng = random.Random(14)
+    for _ in range(500):
+        segments = _random_segments(rng)
+        for merge_mergable in [True, False]:
+            assert _identify(AUTOMATON_ENGINE, segments, merge_mergable) == _identify(
+                STRATEGY_ENGINE, segments, merge_mergable
+            )
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        Mapalyzr(engine="regex")
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from musemapalyzr import pattern_multipliers
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.pattern_multipliers import CURVES, curve_values, get_curve_table
+
+# The scalar function of each curve
+SCALAR_CURVES = {
+    "nothing_but_theory_curve": pattern_multipliers.nothing_but_theory_multiplier,
+    "varying_streams_curve": pattern_multipliers.varying_streams,
+    "zig_zag_curve": pattern_multipliers.zig_zag_multiplier,
+    "even_circle_curve": pattern_multipliers.even_circle_multiplier,
+    "skewed_circle_curve": pattern_multipliers.skewed_circle_multiplier,
+    "stream_curve": pattern_multipliers.stream_multiplier,
+    "pattern_stream_length_curve": pattern_multipliers.pattern_stream_length_multiplier,
+    "zig_zag_length_curve": pattern_multipliers.zig_zag_length_multiplier,
+    "four_stack_curve": pattern_multipliers.four_stack_multiplier,
+    "three_stack_curve": pattern_multipliers.three_stack_multiplier,
+    "two_stack_curve": pattern_multipliers.two_stack_multiplier,
+    "varying_stacks_curve": pattern_multipliers.varying_stacks_multiplier,
+}
+
+values = np.concatenate([np.linspace(-5, 120, 2001), [0, 1, 2.5, 30, 200]])
+
+
+def test_every_curve_is_vectorised():
+    assert set(CURVES) == set(SCALAR_CURVES)
+
+
+@pytest.mark.parametrize("curve_name", sorted(SCALAR_CURVES))
+def test_matches_scalar(curve_name):
+    config = get_analysis_config()
+    curve = getattr(config, curve_name)
+    expected = [SCALAR_CURVES[curve_name](float(value), *curve) for value in values]
+    np.testing.assert_allclose(curve_values(curve_name, values, config), expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("curve_name", sorted(SCALAR_CURVES))
+def test_table_interpolates(curve_name):
+    config = get_analysis_config()
+    table = get_curve_table(curve_name, config)
+    assert get_curve_table(curve_name, config) is table
+    np.testing.assert_allclose(table(values), curve_values(curve_name, values, config), atol=1e-6)
+
+
+def test_unknown_curve():
+    with pytest.raises(ValueError):
+        curve_values("nope_curve", values, get_analysis_config())
+    with pytest.raises(ValueError):
+        get_curve_table("nope_curve", get_analysis_config())
@@ -0,0 +1,108 @@
+import pickle
+import random
+
+import pytest
+
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.constants import (
+    LONG_INTERVAL,
+    MED_INTERVAL,
+    SHORT_INTERVAL,
+    SWITCH,
+    TWO_STACK,
+    VARYING_STACKS,
+    ZIG_ZAG,
+)
+from musemapalyzr.entities import Note, Segment
+from musemapalyzr.map_pattern_analysis import VaryingStacksPattern
+from patterns.pattern import PatternSegments
+
+KINDS = [SHORT_INTERVAL, MED_INTERVAL, LONG_INTERVAL, SWITCH, TWO_STACK, ZIG_ZAG]
+config = get_analysis_config()
+
+
+def _random_segments(rng, count):
+    segments = []
+    sample_time = 0
+    for _ in range(count):
+        notes = [Note(rng.randint(0, 1), sample_time)]
+        for _ in range(rng.randint(1, 4)):
+            sample_time += rng.randint(1, 3) * 1000
+            notes.append(Note(rng.randint(0, 1), sample_time))
+        segments.append(Segment(rng.choice(KINDS), notes, 0, 0))
+    return segments
+
+
+def _assert_counted(segments):
+    recounted = PatternSegments(
+        list(segments), config.interval_debuffs, config.extra_int_end_debuff
+    )
+    for name in [
+        "n_stack_count",
+        "interval_count",
+        "kind_counts",
+        "kind_note_counts",
+        "note_count",
+        "lane_counts",
+        "first_sample",
+        "last_sample",
+    ]:
+        assert getattr(segments, name) == getattr(recounted, name), name
+    assert list(segments.kind_counts) == list(recounted.kind_counts)
+    assert segments.kind_entropy_counts() == recounted.kind_entropy_counts()
+    assert segments.interval_debuff_total() == pytest.approx(recounted.interval_debuff_total())
+
+
+def test_aggregates_match_recount():
+    rng = random.Random(18)
+    for _ in range(50):
+        segments = PatternSegments((), config.interval_debuffs, config.extra_int_end_debuff)
+        for segment in _random_segments(rng, rng.randint(0, 12)):
+            if rng.random() < 0.5:
+                segments.append(segment)
+            else:
+                segments += [segment]
+            _assert_counted(segments)
+        if segments:
+            segments.pop(rng.randrange(len(segments)))
+            _assert_counted(segments)
+            segments[:1] = []
+            _assert_counted(segments)
+        _assert_counted(pickle.loads(pickle.dumps(segments)))
+
+
+def test_aggregates():
+    notes = [Note(0, 0), Note(1, 1000), Note(1, 2000), Note(0, 3000)]
+    segments = PatternSegments(
+        [
+            Segment(SHORT_INTERVAL, notes[:2], 0, 0),
+            Segment(TWO_STACK, notes[1:3], 0, 0),
+            Segment(MED_INTERVAL, notes[2:], 0, 0),
+        ],
+        config.interval_debuffs,
+        config.extra_int_end_debuff,
+    )
+    assert segments.n_stack_count == 1
+    assert segments.interval_count == 2
+    assert segments.note_count == 4
+    assert segments.lane_counts == {0: 2, 1: 2}
+    assert (segments.first_sample, segments.last_sample) == (0, 3000)
+    # Intervals at either end are left out of the entropy
+    assert segments.kind_entropy_counts() == [1]
+    assert segments.interval_debuff_total() == (
+        (config.short_int_debuff + config.med_int_debuff) * config.extra_int_end_debuff,
+        2,
+    )
+
+
+def test_appendable_reads_n_stack_count():
+    group = VaryingStacksPattern(VARYING_STACKS, [])
+    group.segments.append(Segment(TWO_STACK, [], 0, 0))
+    group.segments.append(Segment(SHORT_INTERVAL, [], 0, 0))
+    assert not group.is_appendable()
+    group.segments += [Segment(TWO_STACK, [], 0, 0)]
+    assert group.is_appendable()
+
+    group.segments.append(Segment(SWITCH, [], 0, 0))
+    with pytest.raises(ValueError):
+        group.is_appendable()
@@ -0,0 +1,83 @@
+import pytest
+
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.constants import OTHER, SHORT_INTERVAL, SLOW_STRETCH, SWITCH
+from musemapalyzr.difficulty_calculation import get_pattern_weighting
+from musemapalyzr.entities import MuseSwiprMap, Segment
+from musemapalyzr.map_pattern_analysis import AUTOMATON_ENGINE, STRATEGY_ENGINE, Mapalyzr
+from musemapalyzr.pattern_views import (
+    PatternScorer,
+    PatternView,
+    merge_pattern_views,
+    to_spans,
+    view_length,
+    view_segments,
+)
+from musemapalyzr.utils import PatternScore, analyse_segments
+from patterns.other import OtherPattern
+from patterns.slow_stretch import SlowStretchPattern
+
+ASSETS = [
+    "data/Billie Eilish - bad guy - Easy.asset",
+    "data/Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+]
+
+
+def test_to_spans():
+    assert to_spans([]) == ()
+    assert to_spans([3, 4, 5]) == ((3, 6),)
+    assert to_spans([0, 1, 3, 4, 7]) == ((0, 2), (3, 5), (7, 8))
+    assert view_length(PatternView(OTHER, ((0, 2), (3, 5)))) == 4
+
+
+def test_view_segments_share_the_segments():
+    segments = [Segment(SWITCH, []) for _ in range(5)]
+    view = PatternView(OTHER, ((0, 2), (3, 5)))
+    assert view_segments(view, segments) == [segments[i] for i in [0, 1, 3, 4]]
+
+
+def test_merge_matches_return_final_patterns():
+    segments = [Segment(SWITCH, []) for _ in range(6)] + [Segment(SHORT_INTERVAL, [])] * 3
+    pattern_classes = {OTHER: OtherPattern, SLOW_STRETCH: SlowStretchPattern}
+    views = [
+        PatternView(OTHER, ((0, 3),)),
+        PatternView(OTHER, ((1, 4),)),
+        PatternView(SLOW_STRETCH, ((6, 8),)),
+        PatternView(OTHER, ((5, 6),)),
+        PatternView(SLOW_STRETCH, ((7, 9),)),
+        PatternView(OTHER, ((2, 5),)),
+    ]
+
+    mp = Mapalyzr()
+    mp.patterns = [
+        pattern_classes[view.pattern_name](view.pattern_name, view_segments(view, segments))
+        for view in views
+    ]
+    expected = mp._return_final_patterns()
+    merged = merge_pattern_views(views, segments)
+
+    assert [view.pattern_name for view in merged] == [p.pattern_name for p in expected]
+    assert [view_segments(view, segments) for view in merged] == [p.segments for p in expected]
+
+
+@pytest.mark.parametrize("asset", ASSETS)
+def test_scorer_matches_patterns(asset):
+    config = get_analysis_config()
+    m_map = MuseSwiprMap.from_koreograph_asset(asset)
+    segments = analyse_segments(m_map.notes, m_map.sample_rate, config=config)
+
+    mp = Mapalyzr(config)
+    views = mp.identify_pattern_views(segments)
+    patterns = Mapalyzr(config, STRATEGY_ENGINE).identify_patterns(segments)
+    pattern_scores = PatternScorer(mp.pattern_classes, config).score_all(views, segments)
+
+    assert pattern_scores == [
+        PatternScore(
+            p.pattern_name, p.calc_pattern_difficulty(), p.has_interval_segment, p.total_notes
+        )
+        for p in patterns
+        if p.segments
+    ]
+    assert get_pattern_weighting(
+        m_map.notes, config=config, pattern_engine=AUTOMATON_ENGINE
+    ) == get_pattern_weighting(m_map.notes, config=config, pattern_engine=STRATEGY_ENGINE)
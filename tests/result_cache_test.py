@@ -0,0 +1,48 @@
+import pytest
+
+from musemapalyzr import result_cache
+from musemapalyzr.result_cache import CacheStats, ResultCache, config_hash
+from musemapalyzr.utils import MapScore, Weighting
+
+SCORE = MapScore(Weighting(1.0123456789, 4.2, 4.25185185138), [0.1, 0.2 + 1e-17, 1 / 3])
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "results.sqlite")
+
+
+def test_round_trip(db_path):
+    with ResultCache(db_path) as cache:
+        assert cache.get_many(["a"]) == {}
+        cache.put("a", SCORE)
+    with ResultCache(db_path) as cache:
+        assert cache.get_many(["a", "b", "a"]) == {"a": SCORE}
+        assert cache.stats() == CacheStats(hits=1, misses=1, entries=1, hit_rate=0.5)
+
+
+def test_keyed_by_config_and_engine_version(db_path, monkeypatch):
+    settings = {"sample_window_secs": 1, "moving_avg_window": 5}
+    assert config_hash(settings) == config_hash(dict(reversed(settings.items())))
+
+    with ResultCache(db_path, settings=settings) as cache:
+        cache.put("a", SCORE)
+    with ResultCache(db_path, settings=dict(settings, moving_avg_window=6)) as cache:
+        assert cache.get_many(["a"]) == {}
+
+    monkeypatch.setattr(result_cache, "ENGINE_VERSION", result_cache.ENGINE_VERSION + 1)
+    with ResultCache(db_path, settings=settings) as cache:
+        assert cache.get_many(["a"]) == {}
+
+
+def test_evicts_least_recently_used(db_path):
+    with ResultCache(db_path, max_entries=2) as cache:
+        cache.put("a", SCORE)
+        cache.put("b", SCORE)
+        cache.get_many(["a"])
+        cache.put("c", SCORE)
+        assert len(cache) == 2
+        assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+
+    with pytest.raises(ValueError):
+        ResultCache(db_path, max_entries=0)
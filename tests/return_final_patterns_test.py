@@ -1,18 +1,21 @@
-from musemapalyzr.constants import EVEN_CIRCLES, OTHER, SLOW_STRETCH
+from musemapalyzr.constants import EVEN_CIRCLES, OTHER, SLOW_STRETCH, SWITCH
 from musemapalyzr.entities import Segment
 from musemapalyzr.map_pattern_analysis import Mapalyzr
 from patterns.even_circles import EvenCirclesGroup
 from patterns.other import OtherPattern
 from patterns.slow_stretch import SlowStretchPattern
 
+# Distinct Segments to follow where each one ends up after merging
+A, B, C, D, E, F, G, H, I, J, K, L, M, N = (Segment(SWITCH, []) for _ in range(14))
+
 
 def test_merges_others_together():
     mp = Mapalyzr()
 
     # B, C overlapped. C, D overlapped.
-    o2 = OtherPattern(OTHER, [Segment("B", []), Segment("C", []), Segment("D", [])])
-    o3 = OtherPattern(OTHER, [Segment("C", []), Segment("D", []), Segment("E", [])])
-    o1 = OtherPattern(OTHER, [Segment("A", []), Segment("B", []), Segment("C", [])])
+    o2 = OtherPattern(OTHER, [B, C, D])
+    o3 = OtherPattern(OTHER, [C, D, E])
+    o1 = OtherPattern(OTHER, [A, B, C])
     mp.patterns = [o1, o2, o3]
     results = mp._return_final_patterns()
     assert len(results) == 1
@@ -24,9 +27,9 @@ def test_does_not_merge_with_patterns_between():
     mp = Mapalyzr()
 
     # B, C overlapped. C, D overlapped.
-    o1 = OtherPattern(OTHER, [Segment("A", []), Segment("B", []), Segment("C", [])])
-    o2 = EvenCirclesGroup(EVEN_CIRCLES, [Segment("B", []), Segment("C", []), Segment("D", [])])
-    o3 = OtherPattern(OTHER, [Segment("C", []), Segment("D", []), Segment("E", [])])
+    o1 = OtherPattern(OTHER, [A, B, C])
+    o2 = EvenCirclesGroup(EVEN_CIRCLES, [B, C, D])
+    o3 = OtherPattern(OTHER, [C, D, E])
     mp.patterns = [o1, o2, o3]
     results = mp._return_final_patterns()
     assert len(results) == 3
@@ -36,19 +39,19 @@ def test_does_not_merge_with_patterns_between():
     assert len(results[0].segments) == 2  # A, B
     assert len(results[1].segments) == 3  # B, C, D
     assert len(results[2].segments) == 3  # C, D, E
-    assert results[2].segments[0].segment_name == "C"
-    assert results[2].segments[1].segment_name == "D"
-    assert results[2].segments[2].segment_name == "E"
+    assert results[2].segments[0] is C
+    assert results[2].segments[1] is D
+    assert results[2].segments[2] is E
 
 
 def test_merges_with_patterns_either_side():
     mp = Mapalyzr()
 
     # B, C overlapped. C, D overlapped. E overlapped.
-    o1 = EvenCirclesGroup(EVEN_CIRCLES, [Segment("A", []), Segment("B", []), Segment("C", [])])
-    o2 = OtherPattern(OTHER, [Segment("B", []), Segment("C", []), Segment("D", [])])
-    o3 = OtherPattern(OTHER, [Segment("C", []), Segment("D", []), Segment("E", [])])
-    o4 = EvenCirclesGroup(EVEN_CIRCLES, [Segment("E", []), Segment("F", []), Segment("G", [])])
+    o1 = EvenCirclesGroup(EVEN_CIRCLES, [A, B, C])
+    o2 = OtherPattern(OTHER, [B, C, D])
+    o3 = OtherPattern(OTHER, [C, D, E])
+    o4 = EvenCirclesGroup(EVEN_CIRCLES, [E, F, G])
     mp.patterns = [o1, o2, o3, o4]
     results = mp._return_final_patterns()
     assert len(results) == 3
@@ -57,18 +60,18 @@ def test_merges_with_patterns_either_side():
     assert results[2].pattern_name == EVEN_CIRCLES
     assert len(results[0].segments) == 3  # A, B, C
     assert len(results[1].segments) == 3  # B, C, D
-    assert results[1].segments[0].segment_name == "B"
-    assert results[1].segments[1].segment_name == "C"
-    assert results[1].segments[2].segment_name == "D"
+    assert results[1].segments[0] is B
+    assert results[1].segments[1] is C
+    assert results[1].segments[2] is D
     assert len(results[2].segments) == 3  # E, F, G
 
 
 def test_merges_slow_stretches():
     mp = Mapalyzr()
 
-    o1 = SlowStretchPattern(SLOW_STRETCH, [Segment("A", []), Segment("B", [])])
-    o2 = SlowStretchPattern(SLOW_STRETCH, [Segment("B", []), Segment("C", []), Segment("D", [])])
-    o3 = SlowStretchPattern(SLOW_STRETCH, [Segment("D", []), Segment("E", [])])
+    o1 = SlowStretchPattern(SLOW_STRETCH, [A, B])
+    o2 = SlowStretchPattern(SLOW_STRETCH, [B, C, D])
+    o3 = SlowStretchPattern(SLOW_STRETCH, [D, E])
     mp.patterns = [o1, o2, o3]
     results = mp._return_final_patterns()
     assert len(results) == 1
@@ -79,29 +82,29 @@ def test_merges_slow_stretches():
 def test_merges_slow_stretches_and_others():
     mp = Mapalyzr()
 
-    o1 = SlowStretchPattern(SLOW_STRETCH, [Segment("A", []), Segment("B", [])])
-    o2 = SlowStretchPattern(SLOW_STRETCH, [Segment("B", []), Segment("C", []), Segment("D", [])])
-    o3 = OtherPattern(OTHER, [Segment("D", []), Segment("E", []), Segment("F", [])])
-    o4 = OtherPattern(OTHER, [Segment("E", []), Segment("F", []), Segment("G", [])])
+    o1 = SlowStretchPattern(SLOW_STRETCH, [A, B])
+    o2 = SlowStretchPattern(SLOW_STRETCH, [B, C, D])
+    o3 = OtherPattern(OTHER, [D, E, F])
+    o4 = OtherPattern(OTHER, [E, F, G])
     mp.patterns = [o1, o2, o3, o4]
     results = mp._return_final_patterns()
     assert len(results) == 2
     assert results[0].pattern_name == SLOW_STRETCH
     assert len(results[0].segments) == 4  # A, B, C, D
     assert results[1].pattern_name == OTHER
-    assert results[1].segments[0].segment_name == "D"
-    assert results[1].segments[-1].segment_name == "G"
+    assert results[1].segments[0] is D
+    assert results[1].segments[-1] is G
 
 
 def test_merges_slow_stretches_and_ignores_others_with_1_segment_only():
     # Weird race condition. See we luv lama for a real example of 1 Other between slow stretches
     mp = Mapalyzr()
 
-    o1 = SlowStretchPattern(SLOW_STRETCH, [Segment("A", []), Segment("B", [])])
-    o2 = OtherPattern(OTHER, [Segment("B", [])])
-    o3 = SlowStretchPattern(SLOW_STRETCH, [Segment("B", []), Segment("C", []), Segment("D", [])])
-    o4 = OtherPattern(OTHER, [Segment("D", [])])
-    o5 = SlowStretchPattern(SLOW_STRETCH, [Segment("D", []), Segment("E", []), Segment("F", [])])
+    o1 = SlowStretchPattern(SLOW_STRETCH, [A, B])
+    o2 = OtherPattern(OTHER, [B])
+    o3 = SlowStretchPattern(SLOW_STRETCH, [B, C, D])
+    o4 = OtherPattern(OTHER, [D])
+    o5 = SlowStretchPattern(SLOW_STRETCH, [D, E, F])
 
     mp.patterns = [o1, o2, o3, o4, o5]
     results = mp._return_final_patterns()
@@ -113,19 +116,19 @@ def test_merges_slow_stretches_and_ignores_others_with_1_segment_only():
 def test_merges_slow_stretches_with_many_patterns():
     mp = Mapalyzr()
 
-    o0 = EvenCirclesGroup(EVEN_CIRCLES, [Segment("A", []), Segment("B", []), Segment("C", [])])
+    o0 = EvenCirclesGroup(EVEN_CIRCLES, [A, B, C])
 
-    o1 = SlowStretchPattern(SLOW_STRETCH, [Segment("C", []), Segment("D", [])])
-    o2 = SlowStretchPattern(SLOW_STRETCH, [Segment("D", []), Segment("E", []), Segment("F", [])])
-    o3 = SlowStretchPattern(SLOW_STRETCH, [Segment("F", []), Segment("G", [])])
+    o1 = SlowStretchPattern(SLOW_STRETCH, [C, D])
+    o2 = SlowStretchPattern(SLOW_STRETCH, [D, E, F])
+    o3 = SlowStretchPattern(SLOW_STRETCH, [F, G])
 
-    o4 = OtherPattern(OTHER, [Segment("G", []), Segment("H", []), Segment("I", [])])
-    o5 = OtherPattern(OTHER, [Segment("H", []), Segment("I", []), Segment("J", [])])
+    o4 = OtherPattern(OTHER, [G, H, I])
+    o5 = OtherPattern(OTHER, [H, I, J])
 
-    o6 = EvenCirclesGroup(EVEN_CIRCLES, [Segment("J", []), Segment("K", []), Segment("L", [])])
+    o6 = EvenCirclesGroup(EVEN_CIRCLES, [J, K, L])
 
-    o7 = SlowStretchPattern(SLOW_STRETCH, [Segment("L", []), Segment("M", [])])
-    o8 = SlowStretchPattern(SLOW_STRETCH, [Segment("M", []), Segment("N", [])])
+    o7 = SlowStretchPattern(SLOW_STRETCH, [L, M])
+    o8 = SlowStretchPattern(SLOW_STRETCH, [M, N])
 
     mp.patterns = [o0, o1, o2, o3, o4, o5, o6, o7, o8]
 
@@ -0,0 +1,71 @@
+import pytest
+
+from musemapalyzr.constants import DEFAULT_SAMPLE_RATE
+from musemapalyzr.entities import MuseSwiprMap, Note, NoteArray
+from musemapalyzr.utils import PYTHON_ENGINE, VECTORISED_ENGINE, analyse_segments
+
+ASSETS = [
+    "data/Billie Eilish - bad guy - Easy.asset",
+    "data/Camellia - Play With Fire - Hiasobi (feat. Hatsune Miku) - Expert.asset",
+]
+
+
+def _describe(segments):
+    return [
+        (
+            s.kind,
+            s.required_notes,
+            s.time_difference,
+            s.sample_rate,
+            [(n.lane, n.sample_time) for n in s.notes],
+        )
+        for s in segments
+    ]
+
+
+def _notes(lanes_and_seconds):
+    return [Note(lane, int(seconds * DEFAULT_SAMPLE_RATE)) for lane, seconds in lanes_and_seconds]
+
+
+@pytest.mark.parametrize(
+    "notes",
+    [
+        [],
+        _notes([(0, 0)]),
+        _notes([(0, 0), (1, 0.1)]),
+        # Stream speeding up past the tolerance, then a stack, intervals and a switch
+        _notes([(0, 0), (0, 0.1), (0, 0.2), (0, 0.3), (0, 0.35), (0, 0.4), (0, 0.45)])
+        + _notes([(1, 1.0), (1, 1.1), (1, 1.2), (0, 2.5), (1, 3.0), (0, 6.0), (1, 6.05)]),
+        # Intervals whose gaps drift a little each time
+        _notes([(i % 2, 0.5 * i + 0.004 * i * i) for i in range(12)]),
+    ],
+)
+def test_engines_match(notes):
+    expected = analyse_segments(notes, engine=PYTHON_ENGINE)
+    assert _describe(analyse_segments(notes, engine=VECTORISED_ENGINE)) == _describe(expected)
+
+
+@pytest.mark.parametrize("asset", ASSETS)
+def test_engines_match_on_maps(asset):
+    m_map = MuseSwiprMap.from_koreograph_asset(asset)
+    expected = analyse_segments(m_map.notes, m_map.sample_rate, PYTHON_ENGINE)
+    segments = analyse_segments(m_map.notes, m_map.sample_rate, VECTORISED_ENGINE)
+    assert _describe(segments) == _describe(expected)
+
+
+def test_vectorised_segments_are_views():
+    m_map = MuseSwiprMap.from_koreograph_asset(ASSETS[0])
+    segments = analyse_segments(m_map.notes, m_map.sample_rate, VECTORISED_ENGINE)
+    assert segments and all(isinstance(s.notes, NoteArray) for s in segments)
+    assert all(s.notes.sample_times.base is not None for s in segments)
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        analyse_segments(_notes([(0, 0), (1, 0.1)]), engine="rust")
+
+
+@pytest.mark.parametrize("engine", [PYTHON_ENGINE, VECTORISED_ENGINE])
+def test_notes_on_the_same_sample(engine):
+    with pytest.raises(ZeroDivisionError):
+        analyse_segments(_notes([(0, 0), (1, 0)]), engine=engine)
@@ -0,0 +1,36 @@
+import pytest
+
+from musemapalyzr.tempo import TICKS_PER_BEAT, TempoIndex
+
+# 120 BPM at 44100 Hz until sample 441000, then 150 BPM
+tempo_index = TempoIndex([0, 441000], [22050, 17640])
+
+
+def test_section_indices():
+    assert tempo_index.section_indices([-5, 0, 440999, 441000, 10**7]).tolist() == [0, 0, 0, 1, 1]
+
+
+def test_last_section_on_the_same_sample_wins():
+    index = TempoIndex([0, 100, 100], [1000, 2000, 3000])
+    assert index.beats([3100]).tolist() == [1.0]
+
+
+def test_beats_restart_each_section():
+    assert tempo_index.beats([0, 11025, 441000, 441000 + 17640]).tolist() == [0, 0.5, 0, 1]
+
+
+def test_ticks_keep_counting_across_sections():
+    ticks = tempo_index.ticks([22050, 441000, 441000 + 4410])
+    assert ticks.tolist() == [TICKS_PER_BEAT, 20 * TICKS_PER_BEAT, 20 * TICKS_PER_BEAT + 12]
+
+
+def test_snap_divisors():
+    beat = 22050
+    sample_times = [0, beat // 2, beat // 3, beat // 4, beat // 4 + 400, beat + 7350 + 200]
+    snaps = tempo_index.snap_divisors(sample_times, tolerance_ms=5)
+    assert snaps.tolist() == [4, 8, 12, 16, 0, 12]
+
+
+def test_needs_a_tempo_section():
+    with pytest.raises(ValueError):
+        TempoIndex([], [])
@@ -0,0 +1,79 @@
+from musemapalyzr import tracing
+from musemapalyzr.analysis_config import get_analysis_config
+from musemapalyzr.difficulty_calculation import get_pattern_weighting
+from musemapalyzr.entities import MuseSwiprMap
+from musemapalyzr.map_pattern_analysis import Mapalyzr
+from musemapalyzr.pattern_automaton import run_pattern_automaton
+from musemapalyzr.pattern_views import PatternScorer
+from musemapalyzr.tracing import (
+    ChunkMultiplied,
+    GroupRejected,
+    LoggingTraceSink,
+    PatternAppended,
+    PatternsMerged,
+    ScoreComponents,
+    SegmentFormed,
+    TraceSink,
+    trace_to,
+)
+from musemapalyzr.utils import analyse_segments
+
+ASSET = "data/Billie Eilish - bad guy - Easy.asset"
+
+
+def test_traces_the_analysis():
+    config = get_analysis_config()
+    notes = MuseSwiprMap.from_koreograph_asset(ASSET).notes
+    segments = analyse_segments(notes, config=config)
+    mapalyzr = Mapalyzr(config)
+    views = run_pattern_automaton(mapalyzr.groups, segments, config)
+    merged = mapalyzr.identify_pattern_views(segments)
+    pattern_scores = PatternScorer(mapalyzr.pattern_classes, config).score_all(merged, segments)
+
+    with trace_to() as sink:
+        get_pattern_weighting(notes, config=config)
+
+    formed = sink.query(SegmentFormed)
+    assert [(event.kind, event.note_count) for event in formed] == [
+        (segment.kind, len(segment.notes)) for segment in segments
+    ]
+    # The automaton's last views are appended after the run, not at a segment
+    appended = sink.query(PatternAppended)
+    assert [(event.pattern_name, event.spans) for event in appended] == [
+        (view.pattern_name, view.spans) for view in views[: len(appended)]
+    ]
+    assert sink.query(GroupRejected)
+    assert sink.query(PatternsMerged) == [PatternsMerged(len(views), len(merged))]
+    assert [(event.pattern_name, event.score) for event in sink.query(ScoreComponents)] == [
+        (pattern_score.pattern_name, pattern_score.score) for pattern_score in pattern_scores
+    ]
+    assert sum(event.pattern_count for event in sink.query(ChunkMultiplied)) <= len(pattern_scores)
+
+
+def test_tracing_is_off_outside_trace_to():
+    assert tracing.sink is None
+    outer = TraceSink()
+    with trace_to(outer):
+        with trace_to() as inner:
+            assert tracing.sink is inner
+        assert tracing.sink is outer
+    assert tracing.sink is None
+
+    with trace_to(outer):
+        pass
+    analyse_segments(MuseSwiprMap.from_koreograph_asset(ASSET).notes)
+    assert outer.events == []
+
+
+def test_query():
+    sink = LoggingTraceSink()
+    sink.emit(GroupRejected("Even Circles", 3, 2))
+    sink.emit(GroupRejected("Skewed Circles", 4, 5))
+    sink.emit(PatternAppended("Even Circles", ((0, 3),), 3))
+    assert sink.query(pattern_name="Even Circles") == [
+        GroupRejected("Even Circles", 3, 2),
+        PatternAppended("Even Circles", ((0, 3),), 3),
+    ]
+    assert sink.query(GroupRejected, segment_index=4) == [GroupRejected("Skewed Circles", 4, 5)]
+    sink.clear()
+    assert sink.query() == []
@@ -66,4 +66,4 @@ def test_valid_stack_when_ends_with_interval_returns_False_but_adds():
     group = VaryingStacksPattern(VARYING_STACKS, patterns)
     added = group.check_segment(current_pattern)
     assert added is False
-    assert group.segments[-1].segment_name == LONG_INTERVAL
+    assert group.segments[-1].kind == LONG_INTERVAL
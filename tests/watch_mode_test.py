@@ -0,0 +1,102 @@
+import shutil
+
+import pytest
+import yaml
+
+import config.config
+import main
+from config.config import get_config
+from musemapalyzr import note_cache
+from musemapalyzr.difficulty_export import DifficultyExport
+from musemapalyzr.watcher import ChangeSet, MapWatcher
+
+ASSETS = [
+    "Billie Eilish - bad guy - Easy.asset",
+    "CRIM3S - lost - The Devil Is Here.asset",
+]
+
+
+@pytest.fixture
+def watched(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for asset in ASSETS:
+        shutil.copy(f"data/{asset}", data_dir / asset)
+    (tmp_path / "analysis").mkdir()
+    config_path = tmp_path / "config.yaml"
+    shutil.copy(config.config.CONFIG_PATH, config_path)
+
+    monkeypatch.setattr(config.config, "CONFIG_PATH", str(config_path))
+    monkeypatch.setattr(note_cache, "NOTE_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(main, "RESULT_CACHE_PATH", str(tmp_path / "results.sqlite"))
+    # The density curves are written to analysis/
+    monkeypatch.chdir(tmp_path)
+
+    previous = dict(get_config())
+    watcher = MapWatcher(str(data_dir), str(config_path))
+    export = DifficultyExport(str(tmp_path / "export.txt"))
+    main._export_maps(watcher.filenames, watcher.data_dir, export, max_workers=1)
+    yield watcher, export, config_path
+    get_config().clear()
+    get_config().update(previous)
+
+
+def _rows(export):
+    with open(export.path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_config_change_rescores_every_map(watched):
+    watcher, export, config_path = watched
+    rows = _rows(export)
+    assert len(rows) == 2
+
+    settings = dict(get_config(), moving_avg_window=get_config()["moving_avg_window"] + 4)
+    config_path.write_text(yaml.safe_dump(settings))
+    main._apply_changes(watcher.poll(), watcher, export, max_workers=1)
+    assert get_config() == settings
+    new_rows = _rows(export)
+    assert len(new_rows) == 2 and new_rows != rows
+
+
+@pytest.mark.parametrize("broken", ["half-saved", "missing key", "empty"])
+def test_invalid_config_is_ignored(watched, broken):
+    watcher, export, config_path = watched
+    previous = dict(get_config())
+    rows = _rows(export)
+
+    if broken == "half-saved":
+        config_path.write_text("moving_avg_window: [5,\n")
+    elif broken == "missing key":
+        settings = dict(previous)
+        del settings["moving_avg_window"]
+        config_path.write_text(yaml.safe_dump(settings))
+    else:
+        config_path.write_text("")
+    changes = watcher.poll()
+    assert changes.config_changed
+    main._apply_changes(changes, watcher, export, max_workers=1)
+
+    assert get_config() == previous
+    assert _rows(export) == rows
+
+    # The next save is picked up
+    config_path.write_text(yaml.safe_dump(dict(previous, moving_avg_window=9)))
+    main._apply_changes(watcher.poll(), watcher, export, max_workers=1)
+    assert get_config()["moving_avg_window"] == 9
+
+
+def test_removed_maps_are_dropped(watched):
+    watcher, export, _ = watched
+    main._apply_changes(ChangeSet([], [ASSETS[0]], False), watcher, export, max_workers=1)
+    assert [row.split("||")[0] for row in _rows(export)] == ["CRIM3S - lost - The Devil Is Here"]
+
+
+def test_maps_that_fail_are_dropped(watched):
+    watcher, export, _ = watched
+    with open(f"{watcher.data_dir}/{ASSETS[0]}", "w", encoding="utf-8") as f:
+        f.write("not a Koreography asset")
+    changes = watcher.poll()
+    assert changes.changed == [ASSETS[0]]
+    main._apply_changes(changes, watcher, export, max_workers=1)
+    assert [row.split("||")[0] for row in _rows(export)] == ["CRIM3S - lost - The Devil Is Here"]
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+
+import pytest
+
+from musemapalyzr.watcher import ChangeSet, MapWatcher, merge_changes
+
+
+@pytest.fixture
+def watched(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.asset").write_text("a")
+    (data_dir / "b.asset").write_text("b")
+    (data_dir / "notes.txt").write_text("not a map")
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("moving_avg_window: 5\n")
+    return data_dir, config_path
+
+
+def _touch(path, text):
+    stat = os.stat(path) if os.path.exists(path) else None
+    path.write_text(text)
+    if stat is not None:
+        # Make sure the mtime changes, whatever the file system's resolution
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_poll(watched):
+    data_dir, config_path = watched
+    watcher = MapWatcher(str(data_dir), str(config_path))
+    assert watcher.filenames == ["a.asset", "b.asset"]
+    assert watcher.poll() == ChangeSet([], [], False)
+
+    _touch(data_dir / "a.asset", "a2")
+    _touch(data_dir / "c.asset", "c")
+    os.remove(data_dir / "b.asset")
+    assert watcher.poll() == ChangeSet(["a.asset", "c.asset"], ["b.asset"], False)
+    assert watcher.poll() == ChangeSet([], [], False)
+
+    _touch(config_path, "moving_avg_window: 6\n")
+    assert watcher.poll() == ChangeSet([], [], True)
+    assert watcher.filenames == ["a.asset", "c.asset"]
+
+
+def test_missing_data_dir_has_no_maps(watched):
+    data_dir, config_path = watched
+    watcher = MapWatcher(str(data_dir), str(config_path))
+    os.rename(data_dir, f"{data_dir}.moved")
+    assert watcher.poll() == ChangeSet([], ["a.asset", "b.asset"], False)
+    os.rename(f"{data_dir}.moved", data_dir)
+    assert watcher.poll() == ChangeSet(["a.asset", "b.asset"], [], False)
+    assert MapWatcher(str(data_dir / "missing"), str(config_path)).filenames == []
+
+
+def test_merge_changes():
+    earlier = ChangeSet(["a.asset", "b.asset"], ["c.asset"], False)
+    later = ChangeSet(["c.asset"], ["a.asset"], True)
+    assert merge_changes(earlier, later) == ChangeSet(["b.asset", "c.asset"], ["a.asset"], True)
+
+
+def test_wait_for_changes_debounces(watched):
+    data_dir, config_path = watched
+    watcher = MapWatcher(str(data_dir), str(config_path), poll_interval=0.01, debounce_secs=0.2)
+    assert watcher.wait_for_changes(timeout=0.05) is None
+
+    def burst():
+        for i in range(5):
+            _touch(data_dir / f"new{i}.asset", "new")
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=burst)
+    thread.start()
+    changes = watcher.wait_for_changes(timeout=1)
+    thread.join()
+    assert changes == ChangeSet([f"new{i}.asset" for i in range(5)], [], False)
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from musemapalyzr.utils import weighted_average_of_values, weighted_averages_of_values
+
+
+def _sorted_weighted_average(values, top_percentage=0.3, top_weight=0.7, bottom_weight=0.3):
+    # The original definition: fully sort, then weight every value >= the threshold as top
+    values_sorted = sorted(values, reverse=True)
+    threshold_index = min(int(len(values) * (1 - top_percentage)), len(values) - 1)
+    threshold = values_sorted[threshold_index]
+    weights = [top_weight if value >= threshold else bottom_weight for value in values]
+    weighted_sum = 0
+    for value, weight in zip(values, weights):
+        weighted_sum += value * weight
+    total_weight = 0
+    for weight in weights:
+        total_weight += weight
+    return weighted_sum / total_weight
+
+
+def _value_lists():
+    rng = random.Random(7)
+    lists = [[1], [2, 2, 2], [3, 1, 2, 2], [0.5, 1, 1, 1, 1, 0.5]]
+    for length in [10, 255, 256, 300, 2000]:
+        # Few distinct values, so there are plenty of ties with the threshold
+        lists.append([rng.choice([0.5, 1, 1.25, rng.random()]) for _ in range(length)])
+    return lists
+
+
+@pytest.mark.parametrize("top_percentage", [0.3, 0.5, 0, 1])
+def test_matches_sorting(top_percentage):
+    for values in _value_lists():
+        assert weighted_average_of_values(
+            values, top_percentage, 0.6, 0.4
+        ) == _sorted_weighted_average(values, top_percentage, 0.6, 0.4)
+
+
+def test_ties_with_the_threshold_are_top_values():
+    # The threshold is 2, so both 2s get the top weight
+    assert weighted_average_of_values([1, 2, 2, 3], 0.5, 1, 0) == pytest.approx(7 / 3)
+
+
+def test_batch_matches_one_at_a_time():
+    value_lists = _value_lists()
+    averages = weighted_averages_of_values(value_lists, 0.3, 0.6, 0.4)
+    assert averages.tolist() == [
+        weighted_average_of_values(values, 0.3, 0.6, 0.4) for values in value_lists
+    ]
+    assert len(weighted_averages_of_values([])) == 0
+
+
+def test_empty_values():
+    with pytest.raises(ValueError):
+        weighted_average_of_values([])
+    with pytest.raises(ValueError):
+        weighted_averages_of_values([[1], []])